@@ -1,6 +1,15 @@
-"""Flask应用模块"""
+"""
+Flask应用模块
 
-from app.main import app
+app 对象在首次访问时才创建（from app import app）：计算进程、离线批量运行等只导入
+app.services / app.models 的进程不会创建 Flask 应用（初始化数据库、检查迁移、注册蓝图）。
+"""
 
 __all__ = ['app']
 
+
+def __getattr__(name):
+    if name == 'app':
+        from app.main import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -29,12 +29,18 @@ def create_app():
     # 应用配置
     app.config.update({
         'SECRET_KEY': app_config.secret_key,  # 从配置文件读取，支持环境变量
-        'JSON_AS_ASCII': False,  # 支持中文JSON响应
-        'JSONIFY_PRETTYPRINT_REGULAR': True,  # 美化JSON输出
         'DATABASE_URL': db_config.database_url,
         'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,  # 16MB最大请求大小
     })
     
+    # 监控指标（请求耗时、连接池等），在响应压缩之前安装以便耗时包含压缩
+    from app.utils.metrics import install_metrics
+    install_metrics(app)
+    
+    # JSON编码器（支持中文、默认紧凑输出）与响应压缩
+    from app.utils.encoding import install_encoding
+    install_encoding(app)
+    
     # 注册蓝图
     register_blueprints(app)
     
@@ -55,11 +61,13 @@ def register_blueprints(app):
     from app.routes.stock_info import stock_info_bp
     from app.routes.health import health_bp
     from app.routes.custom_calculation import custom_calculation_bp
+    from app.routes.universe import universe_bp
     
     app.register_blueprint(health_bp, url_prefix='/api')
     app.register_blueprint(stock_price_bp, url_prefix='/api/stock-price')
     app.register_blueprint(stock_info_bp, url_prefix='/api/stock-info')
     app.register_blueprint(custom_calculation_bp, url_prefix='/api/custom-calculations')
+    app.register_blueprint(universe_bp, url_prefix='/api/universes')
 
 
 def register_error_handlers(app):
@@ -91,6 +99,12 @@ def init_app_context(app):
     # 测试数据库连接
     try:
         from database.connection import db_manager
+        from app.utils.cancellation import install_db_cancellation_hooks
+        
+        # 客户端断开时可中断正在执行的SQL（主库和只读副本）
+        for engine in db_manager.engines:
+            install_db_cancellation_hooks(engine)
+        
         if db_manager.test_connection():
             logger.info("✅ 数据库连接正常")
         else:
@@ -108,10 +122,14 @@ def init_app_context(app):
     except Exception as e:
         logger.error(f"❌ 股票清单加载错误: {e}")
     
-    # 自动运行数据库迁移（创建 custom_scripts 表）
+    # 自动运行数据库迁移（创建 custom_scripts、calculation_tasks 等表；
+    # 行情表触发器在部署时执行 run_migrations.py 创建，缺失时启动失败）
+    from database.migrations.run_migrations import MarketDataTablesMissing, run_app_migrations
     try:
-        from database.migrations.run_migrations import create_custom_scripts_table
-        create_custom_scripts_table()
+        run_app_migrations()
+    except MarketDataTablesMissing as e:
+        logger.error(f"❌ {e}")
+        raise
     except Exception as e:
         logger.warning(f"⚠️ 数据库迁移跳过: {e}")
     
@@ -133,6 +151,7 @@ def index():
         "description": "纯净的数据库查询服务",
         "endpoints": {
             "健康检查": "/api/health",
+            "监控指标": "/api/metrics",
             "版本信息": "/api/version",
             "股票行情查询": {
                 "查询行情数据": "/api/stock-price/query",
@@ -142,7 +161,8 @@ def index():
             "股票信息查询": {
                 "本地JSON查询": "/api/stock-info/local",
                 "统计信息": "/api/stock-info/statistics"
-            }
+            },
+            "股票范围": "/api/universes"
         },
         "note": "本服务仅提供查询功能，数据同步请使用同步服务(端口7777)"
     }
@@ -0,0 +1,231 @@
+"""
+计算任务队列模型
+
+基于 PostgreSQL 表实现的本地持久化任务队列：
+Web进程只负责入队和读取结果，后台计算进程（start_worker.py）
+使用 FOR UPDATE SKIP LOCKED 抢占任务并写回结果。
+
+所有时间戳（创建、开始、心跳、完成）都取数据库时钟（CURRENT_TIMESTAMP），
+排队时长和心跳超时的计算不混用应用进程与数据库的时钟和时区。
+"""
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from typing import Any, Dict, Optional
+from database.connection import Base
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# 任务状态
+TASK_PENDING = 'pending'
+TASK_RUNNING = 'running'
+TASK_SUCCEEDED = 'succeeded'
+TASK_FAILED = 'failed'
+
+
+class CalculationTask(Base):
+    """计算任务模型"""
+
+    __tablename__ = 'calculation_tasks'
+
+    # 主键
+    id = Column(Integer, primary_key=True, autoincrement=True, comment='主键ID')
+
+    # 任务状态（pending/running/succeeded/failed）
+    status = Column(String(20), nullable=False, default=TASK_PENDING, comment='任务状态')
+
+    # 请求参数与计算结果
+    payload = Column(JSONB, nullable=False, comment='任务参数')
+    result = Column(JSONB, nullable=True, comment='计算结果')
+    error = Column(Text, nullable=True, comment='错误信息')
+
+    # 执行信息
+    worker_id = Column(String(100), nullable=True, comment='执行任务的计算进程')
+    attempts = Column(Integer, nullable=False, default=0, comment='已尝试次数')
+
+    # 时间戳
+    created_at = Column(DateTime, server_default=func.now(), nullable=False, comment='创建时间')
+    started_at = Column(DateTime, nullable=True, comment='开始执行时间')
+    heartbeat_at = Column(DateTime, nullable=True, comment='最近心跳时间')
+    finished_at = Column(DateTime, nullable=True, comment='完成时间')
+
+    # 索引
+    __table_args__ = (
+        Index('idx_calculation_tasks_status', 'status', 'id'),
+        {'comment': '脚本计算任务队列'}
+    )
+
+    def __repr__(self) -> str:
+        return f"<CalculationTask(id={self.id}, status='{self.status}')>"
+
+    def to_dict(self) -> dict:
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'payload': self.payload,
+            'result': self.result,
+            'error': self.error,
+            'worker_id': self.worker_id,
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class CalculationTaskService:
+    """计算任务队列服务类"""
+
+    @staticmethod
+    def enqueue(payload: Dict[str, Any]) -> dict:
+        """
+        提交计算任务
+
+        Args:
+            payload: 任务参数（script, stock_symbols 等）
+
+        Returns:
+            dict: 新任务信息
+        """
+        from database.connection import db_manager
+
+        with db_manager.get_session() as session:
+            task = CalculationTask(payload=payload, status=TASK_PENDING)
+            session.add(task)
+            session.commit()
+            session.refresh(task)
+            return task.to_dict()
+
+    @staticmethod
+    def get_by_id(task_id: int) -> Optional[dict]:
+        """
+        根据ID获取任务
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            dict: 任务信息，不存在则返回None
+        """
+        from database.connection import db_manager
+
+        with db_manager.get_session() as session:
+            task = session.query(CalculationTask).filter(
+                CalculationTask.id == task_id
+            ).first()
+            return task.to_dict() if task else None
+
+    @staticmethod
+    def claim_next(worker_id: str) -> Optional[dict]:
+        """
+        抢占下一个待执行任务
+
+        SKIP LOCKED 保证多个计算进程并发抢占时互不阻塞、不重复执行。
+
+        Args:
+            worker_id: 计算进程标识
+
+        Returns:
+            dict: 包含 id 和 payload 的任务，队列为空时返回None
+        """
+        from database.connection import db_manager
+
+        with db_manager.get_session() as session:
+            row = session.execute(text("""
+                UPDATE calculation_tasks
+                SET status = :running,
+                    worker_id = :worker_id,
+                    attempts = attempts + 1,
+                    started_at = CURRENT_TIMESTAMP,
+                    heartbeat_at = CURRENT_TIMESTAMP
+                WHERE id = (
+                    SELECT id FROM calculation_tasks
+                    WHERE status = :pending
+                    ORDER BY id
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING id, payload
+            """), {
+                'running': TASK_RUNNING,
+                'pending': TASK_PENDING,
+                'worker_id': worker_id
+            }).fetchone()
+
+            if row is None:
+                return None
+            return {'id': row.id, 'payload': row.payload}
+
+    @staticmethod
+    def heartbeat(task_id: int, worker_id: str):
+        """更新运行中任务的心跳时间"""
+        from database.connection import db_manager
+
+        with db_manager.get_session() as session:
+            session.execute(text("""
+                UPDATE calculation_tasks SET heartbeat_at = CURRENT_TIMESTAMP
+                WHERE id = :task_id AND status = :running AND worker_id = :worker_id
+            """), {'task_id': task_id, 'running': TASK_RUNNING, 'worker_id': worker_id})
+
+    @staticmethod
+    def complete(task_id: int, worker_id: str, result: Dict[str, Any]):
+        """写回计算结果"""
+        CalculationTaskService._finish(task_id, worker_id, TASK_SUCCEEDED, result=result)
+
+    @staticmethod
+    def fail(task_id: int, worker_id: str, error: str):
+        """标记任务失败"""
+        CalculationTaskService._finish(task_id, worker_id, TASK_FAILED, error=error)
+
+    @staticmethod
+    def requeue_stale(stale_seconds: int, max_attempts: int) -> int:
+        """
+        回收心跳超时的任务（计算进程崩溃或被强制终止）
+
+        未超过最大尝试次数的任务重新入队，否则标记为失败。
+
+        Returns:
+            int: 回收的任务数
+        """
+        from database.connection import db_manager
+
+        with db_manager.get_session() as session:
+            result = session.execute(text("""
+                UPDATE calculation_tasks
+                SET status = CASE WHEN attempts >= :max_attempts THEN :failed ELSE :pending END,
+                    error = CASE WHEN attempts >= :max_attempts THEN '计算进程心跳超时，超过最大尝试次数' ELSE error END,
+                    finished_at = CASE WHEN attempts >= :max_attempts THEN CURRENT_TIMESTAMP ELSE NULL END,
+                    worker_id = NULL
+                WHERE status = :running
+                  AND heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => :stale_seconds)
+            """), {
+                'max_attempts': max_attempts,
+                'failed': TASK_FAILED,
+                'pending': TASK_PENDING,
+                'running': TASK_RUNNING,
+                'stale_seconds': stale_seconds
+            })
+            return result.rowcount
+
+    @staticmethod
+    def _finish(task_id: int, worker_id: str, status: str, result: Dict[str, Any] = None, error: str = None):
+        from database.connection import db_manager
+
+        with db_manager.get_session() as session:
+            task = session.query(CalculationTask).filter(
+                CalculationTask.id == task_id,
+                CalculationTask.worker_id == worker_id
+            ).first()
+
+            # 任务已被回收并交给其他计算进程时，丢弃本次结果
+            if not task or task.status != TASK_RUNNING:
+                logger.warning(f"任务 {task_id} 已不属于计算进程 {worker_id}，丢弃结果")
+                return
+
+            task.status = status
+            task.result = result
+            task.error = error
+            task.finished_at = func.now()
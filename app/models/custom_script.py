@@ -42,6 +42,9 @@ class CustomScript(Base):
     # Python脚本代码
     code = Column(Text, nullable=False, comment='Python脚本代码')
     
+    # 单只股票的估算计算成本（保存时静态分析得出，供准入控制使用）
+    cost_estimate = Column(Integer, nullable=True, comment='单只股票的估算计算成本')
+    
     # 时间戳
     created_at = Column(DateTime, default=get_china_time, nullable=False, comment='创建时间')
     updated_at = Column(DateTime, default=get_china_time, onupdate=get_china_time, nullable=False, comment='更新时间')
@@ -63,6 +66,7 @@ class CustomScript(Base):
             'name': self.name,
             'description': self.description,
             'code': self.code,
+            'cost_estimate': self.cost_estimate,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -72,7 +76,7 @@ class CustomScriptService:
     """自定义脚本服务类"""
     
     @staticmethod
-    def save(name: str, code: str, description: str = None) -> 'CustomScript':
+    def save(name: str, code: str, description: str = None, cost_estimate: int = None) -> 'CustomScript':
         """
         保存新脚本
         
@@ -80,6 +84,7 @@ class CustomScriptService:
             name: 脚本名称
             code: 脚本代码
             description: 脚本描述
+            cost_estimate: 估算计算成本
             
         Returns:
             CustomScript: 保存的脚本对象
@@ -90,7 +95,8 @@ class CustomScriptService:
             script = CustomScript(
                 name=name,
                 code=code,
-                description=description
+                description=description,
+                cost_estimate=cost_estimate
             )
             session.add(script)
             session.commit()
@@ -101,6 +107,7 @@ class CustomScriptService:
             script_name = script.name
             script_code = script.code
             script_description = script.description
+            script_cost_estimate = script.cost_estimate
             script_created_at = script.created_at
             script_updated_at = script.updated_at
         
@@ -110,6 +117,7 @@ class CustomScriptService:
         result.name = script_name
         result.code = script_code
         result.description = script_description
+        result.cost_estimate = script_cost_estimate
         result.created_at = script_created_at
         result.updated_at = script_updated_at
         return result
@@ -155,6 +163,7 @@ class CustomScriptService:
                     'name': script.name,
                     'description': script.description,
                     'code': script.code,
+                    'cost_estimate': script.cost_estimate,
                     'created_at': script.created_at.isoformat() if script.created_at else None,
                     'updated_at': script.updated_at.isoformat() if script.updated_at else None
                 }
@@ -163,7 +172,8 @@ class CustomScriptService:
             return result
     
     @staticmethod
-    def update(script_id: int, name: str = None, code: str = None, description: str = None) -> 'CustomScript':
+    def update(script_id: int, name: str = None, code: str = None, description: str = None,
+               cost_estimate: int = None) -> 'CustomScript':
         """
         更新脚本
         
@@ -172,6 +182,7 @@ class CustomScriptService:
             name: 新名称
             code: 新代码
             description: 新描述
+            cost_estimate: 新代码的估算计算成本
             
         Returns:
             CustomScript: 更新后的脚本对象
@@ -190,6 +201,7 @@ class CustomScriptService:
                 script.name = name
             if code:
                 script.code = code
+                script.cost_estimate = cost_estimate
             if description is not None:
                 script.description = description
             
@@ -202,6 +214,7 @@ class CustomScriptService:
             script_name = script.name
             script_code = script.code
             script_description = script.description
+            script_cost_estimate = script.cost_estimate
             script_created_at = script.created_at
             script_updated_at = script.updated_at
         
@@ -211,6 +224,7 @@ class CustomScriptService:
         result.name = script_name
         result.code = script_code
         result.description = script_description
+        result.cost_estimate = script_cost_estimate
         result.created_at = script_created_at
         result.updated_at = script_updated_at
         return result
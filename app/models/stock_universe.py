@@ -0,0 +1,294 @@
+"""
+股票范围模型
+
+服务端保存的命名股票范围（自选股/股票池）：
+- static: 固定股票列表
+- rule:   基于 stock_info（及最新行情）的筛选规则（UniverseFilter）
+
+成员列表预先计算并保存在表中，members_version 记录计算时的数据版本，
+stock_info 发生变化（新增、更新）后下次使用时自动重新计算。
+"""
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from typing import Any, Dict, List, Optional
+from database.connection import Base
+from app.models.custom_script import get_china_time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# 范围类型
+UNIVERSE_STATIC = 'static'
+UNIVERSE_RULE = 'rule'
+
+
+class StockUniverse(Base):
+    """股票范围模型"""
+
+    __tablename__ = 'stock_universes'
+
+    # 主键
+    id = Column(Integer, primary_key=True, autoincrement=True, comment='主键ID')
+
+    # 范围名称与描述
+    name = Column(String(100), nullable=False, comment='范围名称')
+    description = Column(Text, nullable=True, comment='范围描述')
+
+    # 范围类型（static/rule）
+    kind = Column(String(10), nullable=False, comment='范围类型')
+
+    # 定义：静态股票列表 或 筛选规则
+    symbols = Column(JSONB, nullable=True, comment='静态范围的股票列表')
+    rules = Column(JSONB, nullable=True, comment='规则范围的筛选条件')
+
+    # 预计算的成员列表
+    members = Column(JSONB, nullable=True, comment='预计算的成员股票列表')
+    members_version = Column(String(100), nullable=True, comment='计算成员时的数据版本')
+    members_refreshed_at = Column(DateTime, nullable=True, comment='成员计算时间')
+
+    # 时间戳
+    created_at = Column(DateTime, default=get_china_time, nullable=False, comment='创建时间')
+    updated_at = Column(DateTime, default=get_china_time, onupdate=get_china_time, nullable=False, comment='更新时间')
+
+    # 索引
+    __table_args__ = (
+        Index('idx_stock_universes_name', 'name'),
+        {'comment': '服务端保存的股票范围'}
+    )
+
+    def __repr__(self) -> str:
+        return f"<StockUniverse(id={self.id}, name='{self.name}', kind='{self.kind}')>"
+
+    def to_dict(self, include_members: bool = True) -> dict:
+        """转换为字典"""
+        result = {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'kind': self.kind,
+            'symbols': self.symbols,
+            'rules': self.rules,
+            'member_count': len(self.members) if self.members is not None else None,
+            'members_version': self.members_version,
+            'members_refreshed_at': self.members_refreshed_at.isoformat() if self.members_refreshed_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+        if include_members:
+            result['members'] = self.members
+        return result
+
+
+class StockUniverseService:
+    """股票范围服务类"""
+
+    @staticmethod
+    def create(name: str, description: str = None, symbols: List[str] = None,
+               rules: Dict[str, Any] = None) -> dict:
+        """
+        保存新股票范围并计算成员
+
+        Args:
+            name: 范围名称
+            description: 范围描述
+            symbols: 静态股票列表（与 rules 二选一）
+            rules: 筛选规则（UniverseFilter 格式，与 symbols 二选一）
+
+        Returns:
+            dict: 保存的股票范围（含成员列表）
+        """
+        from database.connection import db_manager
+
+        with db_manager.get_session() as session:
+            universe = StockUniverse(
+                name=name,
+                description=description,
+                kind=UNIVERSE_RULE if rules else UNIVERSE_STATIC,
+                symbols=None if rules else symbols,
+                rules=rules or None
+            )
+            StockUniverseService._refresh_members(session, universe)
+            session.add(universe)
+            session.commit()
+            session.refresh(universe)
+            return universe.to_dict()
+
+    @staticmethod
+    def get_all() -> list:
+        """
+        获取所有股票范围（不含成员列表）
+
+        Returns:
+            List[dict]: 股票范围列表
+        """
+        from database.connection import db_manager
+
+        with db_manager.get_session() as session:
+            universes = session.query(StockUniverse).order_by(
+                StockUniverse.created_at.desc()
+            ).all()
+            return [universe.to_dict(include_members=False) for universe in universes]
+
+    @staticmethod
+    def get_by_id(universe_id: int, refresh: bool = False) -> Optional[dict]:
+        """
+        获取股票范围，成员列表过期时重新计算
+
+        数据版本变化后只由一个请求重新计算：先锁定范围行（SKIP LOCKED），
+        其他进程的并发请求不等待，直接返回现有成员；拿到锁后重新读取，
+        版本已被其他请求更新时不再重复计算。
+
+        Args:
+            universe_id: 范围ID
+            refresh: 是否强制重新计算成员
+
+        Returns:
+            dict: 股票范围（含成员列表），不存在则返回None
+        """
+        from database.connection import db_manager
+
+        with db_manager.get_session() as session:
+            universe = session.query(StockUniverse).filter(
+                StockUniverse.id == universe_id
+            ).first()
+
+            if not universe:
+                return None
+
+            version = StockUniverseService._data_version(session, universe)
+            if not refresh and universe.members is not None and universe.members_version == version:
+                return universe.to_dict()
+
+            # 尚无成员列表或强制刷新时必须等待锁；否则正在被其他请求刷新时返回现有成员
+            wait = refresh or universe.members is None
+            locked = session.query(StockUniverse).filter(
+                StockUniverse.id == universe_id
+            ).populate_existing().with_for_update(skip_locked=not wait).first()
+
+            if locked is None:
+                return universe.to_dict()
+            if refresh or locked.members is None or locked.members_version != version:
+                StockUniverseService._refresh_members(session, locked, version)
+                session.commit()
+                session.refresh(locked)
+
+            return locked.to_dict()
+
+    @staticmethod
+    def update(universe_id: int, name: str = None, description: str = None,
+               symbols: List[str] = None, rules: Dict[str, Any] = None) -> Optional[dict]:
+        """
+        更新股票范围，定义变化时重新计算成员
+
+        Returns:
+            dict: 更新后的股票范围，不存在则返回None
+        """
+        from database.connection import db_manager
+
+        with db_manager.get_session() as session:
+            universe = session.query(StockUniverse).filter(
+                StockUniverse.id == universe_id
+            ).first()
+
+            if not universe:
+                return None
+
+            if name:
+                universe.name = name
+            if description is not None:
+                universe.description = description
+            if symbols is not None:
+                universe.kind = UNIVERSE_STATIC
+                universe.symbols = symbols
+                universe.rules = None
+            if rules is not None:
+                universe.kind = UNIVERSE_RULE
+                universe.rules = rules
+                universe.symbols = None
+            if symbols is not None or rules is not None:
+                StockUniverseService._refresh_members(session, universe)
+
+            universe.updated_at = get_china_time()
+            session.commit()
+            session.refresh(universe)
+            return universe.to_dict()
+
+    @staticmethod
+    def delete(universe_id: int) -> bool:
+        """
+        删除股票范围
+
+        Returns:
+            bool: 是否删除成功
+        """
+        from database.connection import db_manager
+
+        with db_manager.get_session() as session:
+            universe = session.query(StockUniverse).filter(
+                StockUniverse.id == universe_id
+            ).first()
+
+            if not universe:
+                return False
+
+            session.delete(universe)
+            session.commit()
+            return True
+
+    @staticmethod
+    def _data_version(session, universe: StockUniverse) -> str:
+        """
+        计算成员列表依赖的数据版本
+
+        stock_info 的行数和最近更新时间；规则包含成交量/收盘价条件时，
+        再加上最新交易日期（每日行情同步后成员可能变化）
+        """
+        from app.services.universe_filter import UniverseFilter
+
+        count, last_updated = session.execute(
+            text("SELECT COUNT(*), MAX(updated_at) FROM stock_info")
+        ).fetchone()
+        version = f"{count}:{last_updated.isoformat() if last_updated else ''}"
+
+        if universe.kind == UNIVERSE_RULE:
+            prefilter = UniverseFilter.from_dict(universe.rules)
+            if prefilter is not None and prefilter.needs_latest_price:
+                latest = session.execute(text("SELECT MAX(trade_date) FROM stock_daily_data")).scalar()
+                version += f":{latest.strftime('%Y-%m-%d') if latest else ''}"
+
+        return version
+
+    @staticmethod
+    def _refresh_members(session, universe: StockUniverse, version: str = None):
+        """
+        重新计算成员列表（静态范围保留列表中活跃的股票，规则范围执行筛选）
+
+        筛选在传入的主库会话中执行，与 members_version 读取同一份数据；查询失败时异常向上抛出，
+        不记录本次更新（避免把空列表或副本上的旧数据保存为当前版本的成员）。
+        """
+        from app.services.universe_filter import UniverseFilter
+        from app.services.stock_data_service import StockDataService
+
+        if version is None:
+            version = StockUniverseService._data_version(session, universe)
+
+        if universe.kind == UNIVERSE_RULE:
+            members = StockDataService().get_filtered_active_stocks(
+                session, UniverseFilter.from_dict(universe.rules)
+            )
+        else:
+            symbols = universe.symbols or []
+            active = {
+                row[0] for row in session.execute(text("""
+                    SELECT symbol FROM stock_info
+                    WHERE symbol = ANY(:symbols) AND is_active = 'Y'
+                """), {'symbols': symbols}).fetchall()
+            }
+            members = [symbol for symbol in symbols if symbol in active]
+
+        universe.members = members
+        universe.members_version = version
+        universe.members_refreshed_at = get_china_time()
+        logger.info(f"股票范围成员已更新: name={universe.name}, 成员数={len(members)}")
@@ -5,7 +5,15 @@
 """
 
 from flask import Blueprint, request
-from app.utils.responses import create_success_response, create_error_response
+from app.utils.responses import create_success_response, create_error_response, create_overload_response
+from app.utils.conditional import conditional_get
+from app.utils.columnar import FORMAT_ARROW, NotAcceptable, create_arrow_response, negotiate_format, value_array
+from app.utils.continuation import (
+    parse_deadline_ms,
+    request_fingerprint,
+    make_continuation_token,
+    parse_continuation_token
+)
 import logging
 from typing import Dict, Any, List, Optional
 
@@ -19,6 +27,12 @@ custom_calculation_bp = Blueprint('custom_calculation', __name__)
 def execute_script():
     """执行自定义Python脚本"""
     try:
+        # 响应格式（Accept: application/vnd.apache.arrow.stream 时计算结果以 Arrow IPC 返回）
+        try:
+            response_format = negotiate_format()
+        except NotAcceptable as e:
+            return create_error_response(406, "不支持的响应格式", str(e))
+        
         # 获取请求参数
         data = request.get_json() or {}
         
@@ -29,6 +43,21 @@ def execute_script():
         script_id = data.get('script_id')
         column_name = data.get('column_name', '')
         stock_symbols = data.get('stock_symbols', [])
+        universe_id = data.get('universe_id')
+        continuation_token = data.get('continuation_token')
+        profile = data.get('profile', False)
+        sample_size = data.get('sample')
+        
+        try:
+            deadline_ms = parse_deadline_ms(data.get('deadline_ms'))
+            # 股票范围预筛选（仅在 stock_symbols 为空时生效）
+            from app.services.universe_filter import UniverseFilter
+            prefilter = UniverseFilter.from_dict(data.get('prefilter'))
+        except ValueError as e:
+            return create_error_response(400, "参数错误", str(e))
+        
+        if profile and sample_size is not None:
+            return create_error_response(400, "参数错误", "profile和sample只能提供一个")
         
         logger.info(f"解析参数: script长度={len(script)}, script_id={script_id}, column_name={column_name}, stock_symbols类型={type(stock_symbols)}, stock_symbols值={stock_symbols}")
         
@@ -41,6 +70,19 @@ def execute_script():
             script = saved_script.code
             logger.info(f"加载保存的脚本: ID={script_id}, name={saved_script.name}")
         
+        # 如果提供了universe_id，使用服务端保存的股票范围（成员过期时自动重新计算）
+        universe = None
+        if universe_id is not None:
+            if stock_symbols:
+                return create_error_response(400, "参数错误", "universe_id和stock_symbols只能提供一个")
+            if isinstance(universe_id, bool) or not isinstance(universe_id, int):
+                return create_error_response(400, "参数错误", "universe_id必须是整数")
+            from app.models.stock_universe import StockUniverseService
+            universe = StockUniverseService.get_by_id(universe_id)
+            if not universe:
+                return create_error_response(404, "未找到股票范围", f"股票范围ID {universe_id} 不存在")
+            logger.info(f"使用股票范围: ID={universe_id}, name={universe['name']}, 成员数={universe['member_count']}")
+        
         # 验证参数
         if not script:
             error_msg = f"script或script_id不能为空（缺少Python脚本代码）"
@@ -59,35 +101,20 @@ def execute_script():
             logger.error(f"参数验证失败: stock_symbols不是数组, 类型={type(stock_symbols)}, 值={stock_symbols}")
             return create_error_response(400, "参数错误", f"stock_symbols必须是数组类型，当前是 {type(stock_symbols).__name__}")
         
-        # 处理空数组情况：获取所有活跃股票
-        if len(stock_symbols) == 0:
-            from app.services.stock_data_service import StockDataService
-            service = StockDataService()
-            all_stocks = service.get_all_active_stocks()
-            stock_symbols = all_stocks
-            
-            if not stock_symbols:
-                return create_error_response(404, "未找到股票", "数据库中没有活跃股票")
-            logger.info(f"自动获取 {len(stock_symbols)} 只活跃股票")
-        
         # 限制：只对用户手动指定的股票进行200个限制
         # 自动获取的所有股票不受此限制
-        user_specified_count = len(data.get('stock_symbols', []))
+        user_specified_count = len(stock_symbols)
         if user_specified_count > 200:
             logger.error(f"用户手动指定了超过200个股票: {user_specified_count}")
             return create_error_response(400, "参数错误", f"stock_symbols最多支持200个，当前指定了 {user_specified_count} 个")
         
-        logger.info(f"准备执行计算: column_name={column_name}, 处理股票数量={len(stock_symbols)}")
-        
-        # 调试日志：记录参数信息
-        logger.info(f"DEBUG: script长度={len(script)}, column_name={column_name}, stock_symbols数量={len(stock_symbols)}")
-        
         # 导入服务
         from app.services.sandbox_executor import SandboxExecutor
+        from app.services.calculation_service import CalculationService
         executor = SandboxExecutor()
         
-        # 验证脚本语法
-        is_valid, syntax_error = executor.validate_syntax(script)
+        # 验证脚本语法并做静态性能分析
+        is_valid, syntax_error, analysis = executor.validate_script(script)
         if not is_valid:
             logger.error(f"脚本语法验证失败: {syntax_error}")
             logger.error(f"问题脚本的前100个字符: {script[:100] if script else 'empty'}")
@@ -97,63 +124,131 @@ def execute_script():
                 f"Script validation failed: {syntax_error}"
             )
         
-        # 获取股票数据（TODO: 从数据库获取）
-        results = []
-        successful = 0
-        failed = 0
+        # 异步模式：只入队，由后台计算进程（start_worker.py）执行
+        from config.settings import worker_config
+        run_async = data.get('async', worker_config.calculation_mode == 'queue') and not profile and sample_size is None
+        if run_async:
+            from app.models.calculation_task import CalculationTaskService
+            task = CalculationTaskService.enqueue({
+                'script': script,
+                'script_id': script_id,
+                'column_name': column_name,
+                'stock_symbols': stock_symbols,
+                'universe_id': universe_id,
+                'prefilter': prefilter.to_dict() if prefilter else None
+            })
+            logger.info(f"计算任务已入队: task_id={task['id']}")
+            return create_success_response(
+                data=task,
+                message="计算任务已提交",
+                code=202
+            )
+        
+        service = CalculationService(executor)
+        requested_symbols = stock_symbols
+        panel = None
+        if universe is not None:
+            # 股票范围：复用该范围缓存的最新行情与历史数据面板
+            from app.services.universe_cache import universe_panel_cache
+            stock_symbols = universe['members']
+            requested_symbols = [universe_id, universe['members_version']]
+            panel = universe_panel_cache.get(universe_id, universe['members_version'], stock_symbols)
+        else:
+            # 处理空数组情况：获取所有活跃股票
+            stock_symbols = service.resolve_symbols(stock_symbols, prefilter)
+        if not stock_symbols:
+            if universe is not None:
+                return create_error_response(404, "未找到股票", "股票范围中没有活跃股票")
+            if prefilter is not None:
+                return create_error_response(404, "未找到股票", "没有满足筛选条件的活跃股票")
+            return create_error_response(404, "未找到股票", "数据库中没有活跃股票")
+        
+        # 逐行性能分析：在抽样股票上跟踪执行，返回每行耗时和 get_history 耗时
+        if profile:
+            return _profile_script(script, analysis, stock_symbols, panel, data.get('profile_sample'))
+        
+        # 抽样试运行：按板块分层抽样执行，外推全量耗时、读取行数和内存
+        if sample_size is not None:
+            return _dry_run_script(script, analysis, stock_symbols, panel, sample_size, data.get('sample_seed'))
+        
+        # 续传：跳过上次请求已完成的股票
+        fingerprint = request_fingerprint(
+            script, requested_symbols, prefilter.to_dict() if prefilter else None, len(stock_symbols)
+        )
+        try:
+            offset = parse_continuation_token(continuation_token, fingerprint)
+        except ValueError as e:
+            return create_error_response(400, "参数错误", str(e))
+        stock_symbols = stock_symbols[offset:]
+        
+        logger.info(f"准备执行计算: column_name={column_name}, 处理股票数量={len(stock_symbols)}")
         
-        # 对每个股票执行脚本
-        for symbol in stock_symbols:
+        from app.utils.cancellation import cancellation_scope, RequestCancelled
+        from app.services.admission_control import admission_controller, AdmissionRejected
+        cost = admission_controller.estimate_scripts_cost(len(stock_symbols), [analysis.cost_estimate])
+        
+        # 分布式计算：按股票代码哈希分片到对等实例并合并结果
+        # （股票范围面板缓存按整个范围加载，不适合分片，此时在本机计算）
+        # 协调者等待分片期间占用工作进程，按重请求准入
+        from app.services.scatter_gather import scatter_gather_coordinator, ShardFailed
+        if (deadline_ms is None and panel is None and data.get('distributed', True)
+                and scatter_gather_coordinator.should_scatter(len(stock_symbols))):
             try:
-                # 获取股票数据
-                stock_row = _get_stock_data(symbol)
-                
-                if stock_row is None:
-                    results.append({
-                        "symbol": symbol,
-                        "value": None,
-                        "error": "股票数据不存在"
-                    })
-                    failed += 1
-                    continue
-                
-                # 执行脚本
-                result, error = executor.execute(script, {"row": stock_row})
-                
-                results.append({
-                    "symbol": symbol,
-                    "value": result,
-                    "error": error
-                })
-                
-                if error:
-                    failed += 1
-                else:
-                    successful += 1
-                
-            except Exception as e:
-                logger.error(f"执行脚本失败，股票: {symbol}, 错误: {e}")
-                results.append({
-                    "symbol": symbol,
-                    "value": None,
-                    "error": str(e)
-                })
-                failed += 1
-        
-        # 准备响应数据
-        response_data = {"results": results}
-        
-        # 添加执行摘要（当处理多只股票时）
-        if len(results) > 1:
-            response_data["summary"] = {
-                "total": len(results),
-                "successful": successful,
-                "failed": failed
-            }
+                with admission_controller.admit(cost, heavy=True), cancellation_scope(request.environ) as token:
+                    response_data = scatter_gather_coordinator.run_script(script, stock_symbols, token=token)
+            except AdmissionRejected as e:
+                return create_overload_response(
+                    e.retry_after,
+                    f"{e.reason}（估算成本 {e.cost}），请缩小股票范围或稍后重试"
+                )
+            except ShardFailed as e:
+                logger.error(f"分布式计算失败: {e}")
+                return create_error_response(502, "分布式计算失败", str(e))
+            except RequestCancelled as e:
+                logger.warning(f"脚本计算已中止: {e.reason}")
+                return create_error_response(499, "请求已取消", e.reason)
+            
+            if analysis.warnings:
+                response_data['warnings'] = [warning.to_dict() for warning in analysis.warnings]
+            return _execute_response(
+                response_format,
+                response_data,
+                message=f"执行成功，处理 {len(response_data['results'])} 只股票"
+            )
         
-        return create_success_response(
-            data=response_data,
-            message=f"执行成功，处理 {len(results)} 只股票"
+        # 准入控制：按估算成本限制重请求并发
+        try:
+            with admission_controller.admit(cost), cancellation_scope(request.environ, deadline_ms) as token:
+                response_data = service.run_script(script, stock_symbols, token=token, panel=panel)
+        except AdmissionRejected as e:
+            return create_overload_response(
+                e.retry_after,
+                f"{e.reason}（估算成本 {e.cost}），请缩小股票范围或稍后重试"
+            )
+        except RequestCancelled as e:
+            logger.warning(f"脚本计算已中止: {e.reason}")
+            return create_error_response(499, "请求已取消", e.reason)
+        
+        if analysis.warnings:
+            response_data['warnings'] = [warning.to_dict() for warning in analysis.warnings]
+        
+        # 达到截止时间：返回已完成部分和续传令牌
+        if response_data.get('pending'):
+            response_data['continuation_token'] = make_continuation_token(
+                offset + len(response_data['results']), fingerprint
+            )
+            return _execute_response(
+                response_format,
+                response_data,
+                message=f"达到截止时间，已完成 {len(response_data['results'])} 只股票，"
+                        f"剩余 {len(response_data['pending'])} 只",
+                partial=True
+            )
+        
+        return _execute_response(
+            response_format,
+            response_data,
+            message=f"执行成功，处理 {len(response_data['results'])} 只股票"
         )
         
     except Exception as e:
@@ -161,9 +256,114 @@ def execute_script():
         return create_error_response(500, "执行失败", str(e))
 
 
+def _execute_response(response_format: str, response_data: Dict[str, Any], **kwargs) -> Any:
+    """
+    /execute 计算结果响应：JSON，或 Arrow（results 转为 symbol / value / error 三列，
+    summary、pending、warnings 等其他字段放入响应元数据）
+    """
+    if response_format != FORMAT_ARROW:
+        return create_success_response(data=response_data, **kwargs)
+    
+    results = response_data['results']
+    columns = {
+        'symbol': [item['symbol'] for item in results],
+        'value': value_array([item.get('value') for item in results]),
+        'error': [item.get('error') for item in results]
+    }
+    extra = {key: value for key, value in response_data.items() if key != 'results'}
+    return create_arrow_response(columns, {'symbol': 'string', 'error': 'string'}, **extra, **kwargs)
+
+
+def _profile_script(script: str, analysis, stock_symbols: List[str], panel, sample_size) -> Any:
+    """在抽样股票上逐行分析脚本性能（/execute 的 profile 选项）"""
+    from config.settings import execution_config
+    from app.services.script_profiler import ScriptProfiler, sample_symbols
+    from app.services.admission_control import admission_controller, AdmissionRejected
+    from app.utils.cancellation import cancellation_scope, RequestCancelled
+    
+    if sample_size is None:
+        sample_size = execution_config.profile_sample_size
+    if isinstance(sample_size, bool) or not isinstance(sample_size, int) or sample_size < 1:
+        return create_error_response(400, "参数错误", "profile_sample必须是正整数")
+    if sample_size > execution_config.profile_max_sample_size:
+        return create_error_response(
+            400, "参数错误", f"profile_sample最多为 {execution_config.profile_max_sample_size}"
+        )
+    
+    sample = sample_symbols(stock_symbols, sample_size)
+    logger.info(f"脚本性能分析: 从 {len(stock_symbols)} 只股票中抽样 {len(sample)} 只")
+    
+    profiler = ScriptProfiler(history_provider=panel.get_history if panel is not None else None)
+    cost = admission_controller.estimate_scripts_cost(len(sample), [analysis.cost_estimate])
+    try:
+        with admission_controller.admit(cost), cancellation_scope(request.environ) as token:
+            response_data = profiler.profile(script, sample, data_source=panel, token=token)
+    except AdmissionRejected as e:
+        return create_overload_response(e.retry_after, f"{e.reason}（估算成本 {e.cost}），请稍后重试")
+    except RequestCancelled as e:
+        return create_error_response(499, "请求已取消", e.reason)
+    
+    if analysis.warnings:
+        response_data['warnings'] = [warning.to_dict() for warning in analysis.warnings]
+    profile = response_data['profile']
+    return create_success_response(
+        data=response_data,
+        message=f"性能分析完成，抽样 {profile['sample_size']} 只股票，脚本耗时 {profile['script_ms']} 毫秒"
+                f"（get_history {profile['history_ms']} 毫秒）"
+    )
+
+
+def _dry_run_script(script: str, analysis, stock_symbols: List[str], panel, sample_size, seed) -> Any:
+    """抽样试运行，估算全量执行成本（/execute 的 sample 选项）"""
+    from config.settings import execution_config
+    from app.services.dry_run import DryRunEstimator
+    from app.services.admission_control import admission_controller, AdmissionRejected
+    from app.utils.cancellation import cancellation_scope, RequestCancelled
+    
+    if isinstance(sample_size, bool) or not isinstance(sample_size, int) or sample_size < 1:
+        return create_error_response(400, "参数错误", "sample必须是正整数")
+    if sample_size > execution_config.dry_run_max_sample_size:
+        return create_error_response(
+            400, "参数错误", f"sample最多为 {execution_config.dry_run_max_sample_size}"
+        )
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int)):
+        return create_error_response(400, "参数错误", "sample_seed必须是整数")
+    
+    estimator = DryRunEstimator(history_provider=panel.get_history if panel is not None else None)
+    cost = admission_controller.estimate_scripts_cost(min(sample_size, len(stock_symbols)), [analysis.cost_estimate])
+    try:
+        with admission_controller.admit(cost), cancellation_scope(request.environ) as token:
+            response_data = estimator.run(script, stock_symbols, sample_size, seed=seed, data_source=panel, token=token)
+    except AdmissionRejected as e:
+        return create_overload_response(e.retry_after, f"{e.reason}（估算成本 {e.cost}），请稍后重试")
+    except RequestCancelled as e:
+        return create_error_response(499, "请求已取消", e.reason)
+    
+    # 全量执行时的准入成本（超过阈值时同步执行会受重请求并发限制）
+    estimate = response_data['estimate']
+    full_cost = admission_controller.estimate_scripts_cost(len(stock_symbols), [analysis.cost_estimate])
+    estimate['admission_cost'] = full_cost
+    estimate['heavy'] = admission_controller.is_heavy(full_cost)
+    if analysis.warnings:
+        response_data['warnings'] = [warning.to_dict() for warning in analysis.warnings]
+    
+    return create_success_response(
+        data=response_data,
+        message=f"抽样试运行完成，样本 {estimate['sample_size']}/{estimate['universe_size']} 只股票，"
+                f"外推全量耗时约 {estimate['estimated_seconds']} 秒"
+    )
+
+
 # ==================== Script Management Endpoints ====================
 
 
+def _with_lint_summary(message: str, analysis) -> str:
+    """在响应消息后附加性能提示数量"""
+    if analysis is None or not analysis.warnings:
+        return message
+    return f"{message}（{len(analysis.warnings)} 条性能提示）"
+
+
 @custom_calculation_bp.route('/scripts', methods=['POST'])
 def create_script():
     """创建新脚本"""
@@ -181,20 +381,22 @@ def create_script():
         if not code:
             return create_error_response(400, "参数错误", "code不能为空")
         
-        # 验证脚本语法
+        # 验证脚本语法并做静态性能分析
         from app.services.sandbox_executor import SandboxExecutor
         executor = SandboxExecutor()
-        is_valid, syntax_error = executor.validate_syntax(code)
+        is_valid, syntax_error, analysis = executor.validate_script(code)
         if not is_valid:
             return create_error_response(400, "脚本语法错误", syntax_error)
         
-        # 保存脚本
+        # 保存脚本（同时记录估算成本，供准入控制使用）
         from app.models.custom_script import CustomScriptService
-        script = CustomScriptService.save(name, code, description)
+        script = CustomScriptService.save(name, code, description, analysis.cost_estimate)
         
+        script_data = script.to_dict()
+        script_data['analysis'] = analysis.to_dict()
         return create_success_response(
-            data=script.to_dict(),
-            message="脚本创建成功"
+            data=script_data,
+            message=_with_lint_summary("脚本创建成功", analysis)
         )
         
     except Exception as e:
@@ -254,23 +456,34 @@ def update_script(script_id: int):
         code = data.get('code', '').strip() or None
         description = data.get('description', '').strip() or None
         
-        # 如果更新代码，验证语法
+        # 如果更新代码，验证语法并重新做静态性能分析
+        analysis = None
         if code:
             from app.services.sandbox_executor import SandboxExecutor
             executor = SandboxExecutor()
-            is_valid, syntax_error = executor.validate_syntax(code)
+            is_valid, syntax_error, analysis = executor.validate_script(code)
             if not is_valid:
                 return create_error_response(400, "脚本语法错误", syntax_error)
         
         from app.models.custom_script import CustomScriptService
-        script = CustomScriptService.update(script_id, name, code, description)
+        script = CustomScriptService.update(
+            script_id, name, code, description,
+            analysis.cost_estimate if analysis else None
+        )
         
         if not script:
             return create_error_response(404, "未找到脚本", f"脚本ID {script_id} 不存在")
         
+        # 使 /list?script_ids= 的 ETag 立即失效
+        from app.services.data_freshness import data_freshness_tracker
+        data_freshness_tracker.invalidate('scripts')
+        
+        script_data = script.to_dict()
+        if analysis:
+            script_data['analysis'] = analysis.to_dict()
         return create_success_response(
-            data=script.to_dict(),
-            message="更新成功"
+            data=script_data,
+            message=_with_lint_summary("更新成功", analysis)
         )
         
     except Exception as e:
@@ -289,6 +502,9 @@ def delete_script(script_id: int):
         if not success:
             return create_error_response(404, "未找到脚本", f"脚本ID {script_id} 不存在")
         
+        from app.services.data_freshness import data_freshness_tracker
+        data_freshness_tracker.invalidate('scripts')
+        
         return create_success_response(
             data=None,
             message="删除成功"
@@ -299,45 +515,92 @@ def delete_script(script_id: int):
         return create_error_response(500, "删除失败", str(e))
 
 
-def _get_stock_data(symbol: str) -> Optional[Dict[str, Any]]:
-    """从TimescaleDB获取最新的股票数据"""
+@custom_calculation_bp.route('/tasks/<int:task_id>', methods=['GET'])
+def get_task(task_id: int):
+    """查询异步计算任务状态及结果"""
     try:
-        from database.connection import db_manager
-        from models.stock_data import StockDailyData
-        from sqlalchemy import desc
-        
-        with db_manager.get_session() as session:
-            # 查询指定股票的最近一条行情数据
-            stock_data = session.query(StockDailyData).filter(
-                StockDailyData.symbol == symbol
-            ).order_by(desc(StockDailyData.trade_date)).first()
-            
-            if stock_data is None:
-                return None
-            
-            # 构建stock_row字典
-            return {
-                "symbol": str(stock_data.symbol),
-                "stock_name": str(stock_data.stock_name),
-                "trade_date": stock_data.trade_date.strftime('%Y-%m-%d') if stock_data.trade_date else None,
-                "open_price": float(stock_data.open_price) if stock_data.open_price is not None else None,
-                "high_price": float(stock_data.high_price) if stock_data.high_price is not None else None,
-                "low_price": float(stock_data.low_price) if stock_data.low_price is not None else None,
-                "close_price": float(stock_data.close_price),
-                "volume": int(stock_data.volume),
-                "turnover": float(stock_data.turnover),
-                "price_change": float(stock_data.price_change) if stock_data.price_change is not None else None,
-                "price_change_pct": float(stock_data.price_change_pct) if stock_data.price_change_pct is not None else None,
-                "premium_rate": float(stock_data.premium_rate) if stock_data.premium_rate is not None else None,
-                "market_code": str(stock_data.market_code)
-            }
-            
+        from app.models.calculation_task import CalculationTaskService
+        
+        task = CalculationTaskService.get_by_id(task_id)
+        
+        if not task:
+            return create_error_response(404, "未找到任务", f"任务ID {task_id} 不存在")
+        
+        return create_success_response(
+            data=task,
+            message="查询成功"
+        )
+        
     except Exception as e:
-        logger.error(f"获取股票数据失败: {symbol}, 错误: {e}")
-        return None
+        logger.error(f"查询计算任务失败: {e}")
+        return create_error_response(500, "查询失败", str(e))
+
+
+@custom_calculation_bp.route('/shard', methods=['POST'])
+def execute_shard():
+    """计算分布式请求的一个分片（内部接口，仅供协调者实例调用）"""
+    try:
+        import hmac
+        from config.settings import cluster_config
+        from app.services.scatter_gather import CLUSTER_TOKEN_HEADER
+        
+        provided_token = request.headers.get(CLUSTER_TOKEN_HEADER, '')
+        if not cluster_config.cluster_token or not hmac.compare_digest(provided_token, cluster_config.cluster_token):
+            return create_error_response(403, "禁止访问", "分片请求令牌无效")
+        
+        data = request.get_json() or {}
+        kind = data.get('kind')
+        
+        from app.services.calculation_service import CalculationService
+        from app.services.admission_control import admission_controller, AdmissionRejected
+        from app.services.script_linter import script_cost_estimate
+        from app.utils.cancellation import cancellation_scope, RequestCancelled
+        
+        if kind == 'execute':
+            script = data.get('script') or ''
+            symbols = data.get('symbols') or []
+            scripts = [script]
+        elif kind == 'list':
+            scripts_dict = data.get('scripts') or {}
+            stocks = data.get('stocks') or []
+            scripts = list(scripts_dict.values())
+            symbols = stocks
+        else:
+            return create_error_response(400, "参数错误", f"不支持的分片类型: {kind}")
+        
+        if not all(scripts):
+            return create_error_response(400, "参数错误", "分片缺少脚本代码")
+        
+        # 各实例独立做准入控制，过载时返回429，由协调者换其他实例重试
+        cost = admission_controller.estimate_scripts_cost(
+            len(symbols), [script_cost_estimate(code) for code in scripts]
+        )
+        service = CalculationService()
+        try:
+            with admission_controller.admit(cost), cancellation_scope(request.environ) as token:
+                if kind == 'execute':
+                    response_data = service.run_script(script, symbols, token=token)
+                else:
+                    service.run_scripts_for_stocks(scripts_dict, stocks, token=token)
+                    response_data = {'script_results': [stock.get('script_results') for stock in stocks]}
+        except AdmissionRejected as e:
+            return create_overload_response(e.retry_after, f"{e.reason}（估算成本 {e.cost}）")
+        except RequestCancelled as e:
+            return create_error_response(499, "请求已取消", e.reason)
+        
+        logger.info(f"分片计算完成: kind={kind}, 股票数={len(symbols)}")
+        return create_success_response(
+            data=response_data,
+            message=f"分片计算完成，处理 {len(symbols)} 只股票"
+        )
+        
+    except Exception as e:
+        logger.error(f"分片计算失败: {e}")
+        return create_error_response(500, "分片计算失败", str(e))
 
 
 @custom_calculation_bp.route('/functions', methods=['GET'])
+@conditional_get()
 def list_available_functions():
     """获取可用于脚本的函数和模块列表（用于前端显示帮助）"""
     try:
@@ -346,8 +609,8 @@ def list_available_functions():
             "functions": [
                 {
                     "name": "get_history",
-                    "signature": "get_history(symbol: str, days: int) -> list",
-                    "description": "获取股票的历史价格数据",
+                    "signature": "get_history(symbol: str, days: int, interval: str = '1d') -> list",
+                    "description": "获取股票的历史价格数据（日线、周线或月线）",
                     "parameters": [
                         {
                             "name": "symbol",
@@ -357,11 +620,17 @@ def list_available_functions():
                         {
                             "name": "days",
                             "type": "int",
-                            "description": "获取的交易天数（1-1000，默认250）"
+                            "description": "获取的交易天数（1-1000，默认250）；周线、月线时为K线根数"
+                        },
+                        {
+                            "name": "interval",
+                            "type": "str",
+                            "description": "K线周期：'1d' 日线（默认）/ '1w' 周线 / '1M' 月线，其他取值报错"
                         }
                     ],
-                    "returns": "历史价格数据列表，每个元素包含 close_price, trade_date, volume, price_change_pct",
-                    "example": "history = get_history('SH.600519', 250)"
+                    "returns": "历史价格数据列表，每个元素包含 close_price, trade_date, volume, price_change_pct"
+                               "（周线、月线的 trade_date 为该周期最后一个交易日）",
+                    "example": "history = get_history('SH.600519', 250)\nweekly = get_history('SH.600519', 52, '1w')"
                 }
             ],
             "modules": [
@@ -2,7 +2,7 @@
 健康检查路由模块
 """
 
-from flask import Blueprint
+from flask import Blueprint, Response
 from app.utils.responses import create_success_response, create_error_response
 from datetime import datetime
 import logging
@@ -37,6 +37,7 @@ def health_check():
             "status": status,
             "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             "database": db_status,
+            "replicas": db_manager.replica_status(),
             "version": "1.0.0 (查询服务)",
             "api_server": "running"
         }
@@ -85,3 +86,19 @@ def version_info():
         message="版本信息查询成功"
     )
 
+
+@health_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """监控指标接口（Prometheus 文本格式）"""
+    from app.utils.metrics import render_metrics
+    
+    payload = render_metrics()
+    if payload is None:
+        return create_error_response(
+            code=503,
+            message="监控指标不可用",
+            detail="未安装 prometheus-client 或 METRICS_ENABLED=false"
+        )
+    
+    body, content_type = payload
+    return Response(body, content_type=content_type)
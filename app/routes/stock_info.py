@@ -6,6 +6,7 @@
 
 from flask import Blueprint, request
 from app.utils.responses import create_success_response, create_error_response, create_data_response
+from app.utils.conditional import conditional_get
 import logging
 
 logger = logging.getLogger(__name__)
@@ -63,6 +64,7 @@ def query_from_local():
 
 
 @stock_info_bp.route('/statistics', methods=['GET'])
+@conditional_get(sources=('stock_lists',))
 def get_statistics():
     """获取股票清单统计信息"""
     try:
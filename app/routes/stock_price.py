@@ -9,11 +9,37 @@ from app.utils.responses import (
     create_stock_data_response, 
     create_error_response,
     create_success_response,
-    format_stock_price_data,
+    create_overload_response,
     validate_date_range,
     validate_symbol_format
 )
+from app.services.admission_control import AdmissionRejected
+from app.services.scatter_gather import ShardFailed
+from app.utils.cancellation import cancellation_scope, RequestCancelled
+from app.utils.continuation import (
+    parse_deadline_ms,
+    request_fingerprint,
+    make_continuation_token,
+    parse_continuation_token
+)
+from app.utils.columnar import (
+    FORMAT_ARROW,
+    NotAcceptable,
+    create_arrow_response,
+    negotiate_format,
+    rows_to_columns,
+    value_array
+)
+from app.utils.conditional import conditional_get
+from app.utils.query_timeout import with_statement_timeout
+from app.utils.pagination import (
+    TOTAL_NONE,
+    make_cursor,
+    parse_cursor,
+    parse_include_total
+)
 from datetime import datetime
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,10 +48,47 @@ logger = logging.getLogger(__name__)
 stock_price_bp = Blueprint('stock_price', __name__)
 
 
+def _page_fields(endpoint: str, result: dict) -> dict:
+    """分页响应字段：has_more、next_cursor（还有下一页时）和 total_estimated（估算总数时）"""
+    fields = {'has_more': result['has_more']}
+    if result['has_more']:
+        fields['next_cursor'] = make_cursor(endpoint, result['next_key'])
+    if result.get('total') is not None and result.get('total_estimated'):
+        fields['total_estimated'] = True
+    return fields
+
+
+def _listing_response(response_format: str, stocks, script_ids: list, **kwargs):
+    """/list 响应：JSON，或 Arrow（每个脚本一列 script_<id>，部分结果时附加 script_pending 列）"""
+    if response_format != FORMAT_ARROW:
+        return create_success_response(data=stocks, **kwargs)
+    
+    from app.services.stock_data_service import LISTING_COLUMN_TYPES
+    if isinstance(stocks, dict):
+        return create_arrow_response(stocks, LISTING_COLUMN_TYPES, **kwargs)
+    
+    columns = rows_to_columns(stocks, LISTING_COLUMN_TYPES)
+    for script_id in script_ids:
+        columns[f'script_{script_id}'] = value_array([
+            (stock.get('script_results') or {}).get(str(script_id)) for stock in stocks
+        ])
+    if kwargs.get('partial'):
+        columns['script_pending'] = [bool(stock.get('script_pending')) for stock in stocks]
+    return create_arrow_response(columns, LISTING_COLUMN_TYPES, **kwargs)
+
+
 @stock_price_bp.route('/query', methods=['GET', 'POST'])
+@with_statement_timeout('query')
+@conditional_get(sources=('market',))
 def query_from_database():
     """从TimescaleDB查询股票行情数据"""
     try:
+        # 响应格式（Accept: application/vnd.apache.arrow.stream 时返回 Arrow IPC）
+        try:
+            response_format = negotiate_format()
+        except NotAcceptable as e:
+            return create_error_response(406, "不支持的响应格式", str(e))
+        
         # 获取请求参数
         if request.method == 'POST':
             data = request.get_json() or {}
@@ -33,11 +96,17 @@ def query_from_database():
             start_date = data.get('start_date')
             end_date = data.get('end_date')
             limit = data.get('limit', 100)
+            after_token = data.get('after')
+            include_total_param = data.get('include_total')
+            interval_param = data.get('interval')
         else:
             symbol = request.args.get('symbol', '')
             start_date = request.args.get('start_date')
             end_date = request.args.get('end_date')
             limit = request.args.get('limit', 100, type=int)
+            after_token = request.args.get('after')
+            include_total_param = request.args.get('include_total')
+            interval_param = request.args.get('interval')
         
         # 验证参数
         if not symbol:
@@ -49,15 +118,24 @@ def query_from_database():
         if limit <= 0 or limit > 10000:
             return create_error_response(400, "数据条数限制应在1-10000之间")
         
+        # 游标分页与总数（默认不计算总数）
+        after = parse_cursor(after_token, 'query')
+        include_total = parse_include_total(include_total_param)
+        
         # 查询数据库
-        from app.services.stock_data_service import StockDataService
+        from app.services.stock_data_service import StockDataService, parse_interval
+        interval = parse_interval(interval_param)
         service = StockDataService()
         
         db_result = service.query_stock_data_from_db(
             symbol=symbol,
             start_date=date_range['start_date'],
             end_date=date_range['end_date'],
-            limit=limit
+            limit=limit,
+            after=after,
+            include_total=include_total,
+            columnar=response_format == FORMAT_ARROW,
+            interval=interval
         )
         
         if not db_result['success']:
@@ -67,8 +145,21 @@ def query_from_database():
                 db_result.get('error', '未知错误')
             )
         
-        # 格式化响应
-        stock_data = [format_stock_price_data(record) for record in db_result['data']]
+        if response_format == FORMAT_ARROW:
+            from app.services.stock_data_service import STOCK_PRICE_COLUMN_TYPES
+            return create_arrow_response(
+                db_result['data'],
+                STOCK_PRICE_COLUMN_TYPES,
+                message="查询成功",
+                total=db_result['total'],
+                symbol=symbol,
+                source="database",
+                count=db_result['count'],
+                interval=interval,
+                **_page_fields('query', db_result)
+            )
+        
+        stock_data = db_result['data']
         
         # 计算日期范围
         actual_date_range = None
@@ -85,7 +176,9 @@ def query_from_database():
             symbol=symbol,
             source="database",
             date_range=actual_date_range,
-            total=db_result['total']
+            total=db_result['total'],
+            interval=interval,
+            **_page_fields('query', db_result)
         )
         
     except ValueError as e:
@@ -95,7 +188,138 @@ def query_from_database():
         return create_error_response(500, "查询失败", str(e))
 
 
+@stock_price_bp.route('/query-batch', methods=['POST'])
+@with_statement_timeout('batch')
+def query_batch():
+    """
+    批量查询多只股票的行情，返回按交易日期对齐的列式面板
+    
+    请求体:
+        symbols: 股票代码数组（必填）
+        start_date / end_date: 日期范围（YYYY-MM-DD，可选）
+        fields: 字段数组（默认 ["close_price"]）
+        fill: "ffill" 时缺失值沿用上一个交易日的值（包括开始日期之前的最近一行）
+    """
+    try:
+        from app.services.batch_panel import build_panel, parse_fields, parse_fill, FILL_FORWARD
+        from config.settings import batch_query_config
+        
+        data = request.get_json() or {}
+        symbols = data.get('symbols')
+        if not symbols or not isinstance(symbols, list):
+            return create_error_response(400, "参数错误", "symbols必须是非空数组")
+        if len(symbols) > batch_query_config.batch_query_max_symbols:
+            return create_error_response(
+                400, "参数错误",
+                f"symbols不能超过{batch_query_config.batch_query_max_symbols}只"
+            )
+        
+        symbols = list(dict.fromkeys(validate_symbol_format(str(symbol)) for symbol in symbols))
+        date_range = validate_date_range(data.get('start_date'), data.get('end_date'))
+        fields = parse_fields(data.get('fields'))
+        fill = parse_fill(data.get('fill'))
+        
+        from app.services.stock_data_service import StockDataService
+        result = StockDataService().get_batch_history(
+            symbols,
+            fields,
+            start_date=date_range['start_date'],
+            end_date=date_range['end_date'],
+            max_rows=batch_query_config.batch_query_max_rows,
+            with_seed=fill == FILL_FORWARD
+        )
+        if result['truncated']:
+            return create_error_response(
+                400, "结果过大",
+                f"超过{batch_query_config.batch_query_max_rows}行，请缩小日期范围或分批请求"
+            )
+        
+        panel = build_panel(result['rows'], symbols, fields, fill, result['seed_rows'])
+        return create_success_response(
+            data=panel,
+            message=f"查询到 {len(symbols) - len(panel['missing'])} 只股票、{len(panel['dates'])} 个交易日",
+            count=len(panel['dates'])
+        )
+        
+    except ValueError as e:
+        return create_error_response(400, "参数错误", str(e))
+    except Exception as e:
+        logger.error(f"批量查询异常: {e}")
+        return create_error_response(500, "查询失败", str(e))
+
+
+@stock_price_bp.route('/export', methods=['GET', 'POST'])
+def export_stock_data():
+    """
+    流式导出行情数据（CSV / Parquet）
+    
+    参数（GET 查询参数或 POST 请求体）:
+        symbols: 股票代码（GET 逗号分隔，POST 数组；不提供时导出全部股票）
+        start_date / end_date: 日期范围（YYYY-MM-DD，可选）
+        fields: 字段（默认全部行情字段）
+        format: csv（默认）或 parquet
+    
+    不指定股票或数据量大的导出按重请求准入，槽位保持到传输结束；
+    单次导出最长 EXPORT_MAX_SECONDS 秒，超过后中断连接，应按股票或日期范围分批导出。
+    """
+    try:
+        from flask import Response
+        from app.services.data_export import DataExporter, EXPORT_FORMATS, estimate_export_cost, parse_export_params
+        from app.services.admission_control import admission_controller, AdmissionRejected
+        from config.settings import export_config
+        
+        if request.method == 'POST':
+            data = request.get_json() or {}
+            symbols = data.get('symbols')
+            if symbols is not None and not isinstance(symbols, list):
+                return create_error_response(400, "参数错误", "symbols必须是数组")
+        else:
+            data = request.args
+            symbols_param = request.args.get('symbols')
+            symbols = [s.strip() for s in symbols_param.split(',') if s.strip()] if symbols_param else None
+        
+        if symbols is not None:
+            if len(symbols) > export_config.export_max_symbols:
+                return create_error_response(
+                    400, "参数错误", f"symbols不能超过{export_config.export_max_symbols}只"
+                )
+            symbols = list(dict.fromkeys(validate_symbol_format(str(symbol)) for symbol in symbols))
+        
+        date_range = validate_date_range(data.get('start_date'), data.get('end_date'))
+        fmt, fields = parse_export_params(data.get('format'), data.get('fields'))
+        
+        logger.info(f"导出行情数据: format={fmt}, 股票数={len(symbols) if symbols is not None else '全部'}, "
+                    f"日期范围={date_range['start_date']}~{date_range['end_date']}")
+        
+        # 准入控制：导出全部股票时按重请求处理；槽位在响应传输结束（或客户端断开）时释放
+        cost = estimate_export_cost(symbols, date_range['start_date'], date_range['end_date'])
+        try:
+            ticket = admission_controller.acquire(cost or 0, heavy=True if cost is None else None)
+        except AdmissionRejected as e:
+            return create_overload_response(e.retry_after, f"{e.reason}，请指定股票或缩小日期范围后重试")
+        
+        try:
+            body = DataExporter().stream(fmt, symbols, fields, date_range['start_date'], date_range['end_date'])
+            response = Response(
+                body,
+                mimetype=EXPORT_FORMATS[fmt],
+                headers={'Content-Disposition': f'attachment; filename=stock_daily_data.{fmt}'}
+            )
+        except Exception:
+            admission_controller.release(ticket)
+            raise
+        response.call_on_close(lambda: admission_controller.release(ticket))
+        return response
+        
+    except ValueError as e:
+        return create_error_response(400, "参数错误", str(e))
+    except Exception as e:
+        logger.error(f"导出行情数据异常: {e}")
+        return create_error_response(500, "导出失败", str(e))
+
+
 @stock_price_bp.route('/info/<symbol>', methods=['GET'])
+@with_statement_timeout('query')
 def get_stock_info(symbol: str):
     """获取股票基础信息"""
     try:
@@ -126,9 +350,17 @@ def get_stock_info(symbol: str):
 
 
 @stock_price_bp.route('/list', methods=['GET'])
+@with_statement_timeout('list')
+@conditional_get(sources=('market', 'scripts', 'universes'), skip_params=('deadline_ms', 'continuation_token'))
 def list_stocks():
     """列出所有股票（包含最新价格信息和可选的脚本计算结果）"""
     try:
+        # 响应格式（Accept: application/vnd.apache.arrow.stream 时返回 Arrow IPC）
+        try:
+            response_format = negotiate_format()
+        except NotAcceptable as e:
+            return create_error_response(406, "不支持的响应格式", str(e))
+        
         market_code_param = request.args.get('market_code')
         # 支持逗号分隔的多个市场代码
         market_codes = None
@@ -171,17 +403,53 @@ def list_stocks():
         if offset < 0:
             return create_error_response(400, "参数错误", "offset不能为负数")
         
-        from app.services.stock_data_service import StockDataService
-        service = StockDataService()
+        # 游标分页（after 为上一页返回的 next_cursor）与总数（默认不计算）
+        try:
+            after = parse_cursor(request.args.get('after'), 'list')
+            include_total = parse_include_total(request.args.get('include_total'))
+        except ValueError as e:
+            return create_error_response(400, "参数错误", str(e))
+        if after and offset:
+            return create_error_response(400, "参数错误", "after与offset不能同时使用")
+        
+        # 脚本计算截止时间与续传令牌
+        continuation_token = request.args.get('continuation_token')
+        try:
+            deadline_ms = parse_deadline_ms(request.args.get('deadline_ms'))
+        except ValueError as e:
+            return create_error_response(400, "参数错误", str(e))
+        
+        # 限定为服务端保存的股票范围成员
+        universe_id = request.args.get('universe_id', type=int)
+        universe = None
+        if universe_id is not None:
+            from app.models.stock_universe import StockUniverseService
+            universe = StockUniverseService.get_by_id(universe_id)
+            if not universe:
+                return create_error_response(404, "未找到股票范围", f"股票范围ID {universe_id} 不存在")
         
-        # 使用新方法获取包含价格数据的股票列表
-        result = service.list_stocks_with_latest_price(
+        # 解析 script_ids 参数（无脚本的 Arrow 响应直接取快照的列）
+        script_ids_param = request.args.getlist('script_ids')
+        columnar = response_format == FORMAT_ARROW and not script_ids_param
+        
+        # 优先使用进程内最新行情快照，未启用或不可用时查询数据库
+        from app.services.listing_snapshot import listing_snapshot_cache
+        list_params = dict(
             market_codes=market_codes,
             is_active=is_active,
             is_etf=is_etf,
             limit=limit,
-            offset=offset
+            offset=offset,
+            symbols=universe['members'] if universe else None,
+            after=after,
+            include_total=include_total
         )
+        result = listing_snapshot_cache.list_stocks(**list_params, columnar=columnar)
+        if result is None:
+            from app.services.stock_data_service import StockDataService, LISTING_COLUMN_TYPES
+            result = StockDataService().list_stocks_with_latest_price(**list_params)
+            if columnar and result['success']:
+                result['data'] = rows_to_columns(result['data'], LISTING_COLUMN_TYPES)
         
         if not result['success']:
             return create_error_response(
@@ -190,9 +458,13 @@ def list_stocks():
                 result.get('error', '未知错误')
             )
         
-        # 解析并处理 script_ids 参数
-        script_ids_param = request.args.getlist('script_ids')
+        # 快照总数总是精确的，但只在请求时返回
+        total = result['total'] if include_total != TOTAL_NONE else None
+        page_fields = _page_fields('list', result)
+        
+        # 处理 script_ids 参数
         stocks = result['data']
+        script_ids = []
         
         if script_ids_param:
             try:
@@ -205,6 +477,7 @@ def list_stocks():
                 
                 # 执行脚本
                 from app.services.sandbox_executor import SandboxExecutor
+                from app.services.calculation_service import CalculationService
                 from app.models.custom_script import CustomScript
                 from database.connection import db_manager
                 
@@ -225,43 +498,91 @@ def list_stocks():
                         )
                     
                     scripts_dict = {s.id: s.code for s in scripts}
+                    stored_costs = {s.id: s.cost_estimate for s in scripts}
                 
-                # 为每只股票执行脚本
-                executor = SandboxExecutor()
-                for stock in stocks:
-                    script_results = {}
-                    
-                    for script_id, script_code in scripts_dict.items():
-                        try:
-                            logger.info(f"Executing script {script_id} for stock {stock.get('symbol')}")
-                            script_result, error = executor.execute(script_code, context={'row': stock})
-                            logger.info(f"Script {script_id} result: {script_result}, error: {error}")
-                            script_results[str(script_id)] = script_result if error is None else None
-                        except Exception as e:
-                            logger.error(f"Script {script_id} execution error for {stock.get('symbol')}: {e}")
-                            import traceback
-                            logger.error(f"Traceback: {traceback.format_exc()}")
-                            script_results[str(script_id)] = None
+                # 续传：只计算上次请求未完成的股票
+                fingerprint = request_fingerprint(
+                    sorted(scripts_dict), market_codes, is_active, is_etf, limit, offset, after, len(stocks),
+                    [universe_id, universe['members_version']] if universe else None
+                )
+                resume_offset = parse_continuation_token(continuation_token, fingerprint)
+                stocks = stocks[resume_offset:]
+                
+                # 准入控制：按估算成本限制重请求并发
+                # （脚本成本优先使用保存时记录的估算值）
+                from app.services.admission_control import admission_controller
+                from app.services.script_linter import script_cost_estimate
+                cost = admission_controller.estimate_scripts_cost(len(stocks), [
+                    script_cost_estimate(code, stored_costs[script_id])
+                    for script_id, code in scripts_dict.items()
+                ])
+                
+                # 分布式计算：按股票代码哈希分片到对等实例
+                # （协调者本机不计算，但等待分片期间占用工作进程，按重请求准入）
+                from app.services.scatter_gather import scatter_gather_coordinator
+                if deadline_ms is None and scatter_gather_coordinator.should_scatter(len(stocks)):
+                    with admission_controller.admit(cost, heavy=True), cancellation_scope(request.environ) as token:
+                        completed = scatter_gather_coordinator.run_list_scripts(scripts_dict, stocks, token=token)
+                else:
+                    # 股票范围：脚本中的 get_history 复用该范围缓存的历史数据面板
+                    executor = SandboxExecutor()
+                    if universe is not None:
+                        from app.services.universe_cache import universe_panel_cache
+                        panel = universe_panel_cache.get(universe_id, universe['members_version'], universe['members'])
+                        if panel is not None:
+                            executor = SandboxExecutor(history_provider=panel.get_history)
                     
-                    stock['script_results'] = script_results
+                    with admission_controller.admit(cost), cancellation_scope(request.environ, deadline_ms) as token:
+                        completed = CalculationService(executor).run_scripts_for_stocks(scripts_dict, stocks, token=token)
+                
+                logger.info(f"Executed {len(scripts_dict)} scripts for {completed}/{len(stocks)} stocks")
                 
-                logger.info(f"Executed {len(scripts_dict)} scripts for {len(stocks)} stocks")
+                # 达到截止时间：未计算的股票标记为 pending，并返回续传令牌
+                if completed < len(stocks):
+                    for stock in stocks[completed:]:
+                        stock['script_results'] = None
+                        stock['script_pending'] = True
+                    
+                    return _listing_response(
+                        response_format,
+                        stocks,
+                        script_ids,
+                        total=total,
+                        message=f"达到截止时间，已计算 {completed} 只股票，剩余 {len(stocks) - completed} 只",
+                        partial=True,
+                        pending_count=len(stocks) - completed,
+                        continuation_token=make_continuation_token(resume_offset + completed, fingerprint),
+                        **page_fields
+                    )
             
+            except RequestCancelled as e:
+                logger.warning(f"脚本计算已中止: {e.reason}")
+                return create_error_response(499, "请求已取消", e.reason)
+            except AdmissionRejected as e:
+                return create_overload_response(
+                    e.retry_after,
+                    f"{e.reason}（估算成本 {e.cost}），请减少股票数量或脚本数量后重试"
+                )
+            except ShardFailed as e:
+                logger.error(f"分布式计算失败: {e}")
+                return create_error_response(502, "分布式计算失败", str(e))
             except json.JSONDecodeError:
                 return create_error_response(400, "参数错误", "Invalid script_ids JSON format")
             except ValueError as e:
-                return create_error_response(400, "参数错误", f"Invalid script_ids: {str(e)}")
+                return create_error_response(400, "参数错误", f"Invalid script_ids or continuation_token: {str(e)}")
             except Exception as e:
                 logger.error(f"Script execution error: {e}")
                 return create_error_response(500, "脚本执行失败", str(e))
         
-        return create_success_response(
-            data=stocks,
-            total=result['total'],
-            message=f"查询到 {result['count']} 只股票"
+        return _listing_response(
+            response_format,
+            stocks,
+            script_ids,
+            total=total,
+            message=f"查询到 {result['count']} 只股票",
+            **page_fields
         )
             
     except Exception as e:
         logger.error(f"列出股票异常: {e}")
         return create_error_response(500, "查询失败", str(e))
-
@@ -0,0 +1,214 @@
+"""
+股票范围路由模块
+
+管理服务端保存的命名股票范围（静态股票列表或筛选规则），
+/execute 和 /list 通过 universe_id 引用，无需每次发送股票列表
+"""
+
+from flask import Blueprint, request
+from app.utils.responses import create_success_response, create_error_response
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 创建蓝图
+universe_bp = Blueprint('universe', __name__)
+
+
+def _parse_definition(data: Dict[str, Any], required: bool) -> Tuple[Optional[List[str]], Optional[Dict[str, Any]]]:
+    """
+    解析股票范围定义（symbols 与 rules 二选一）
+
+    Returns:
+        Tuple[静态股票列表, 筛选规则]
+
+    Raises:
+        ValueError: 参数格式错误
+    """
+    from config.settings import universe_config
+    from app.services.universe_filter import UniverseFilter
+
+    symbols = data.get('symbols')
+    rules = data.get('rules')
+
+    if symbols is not None and rules is not None:
+        raise ValueError("symbols和rules只能提供一个")
+    if required and symbols is None and rules is None:
+        raise ValueError("symbols或rules不能为空")
+
+    if symbols is not None:
+        if not isinstance(symbols, list) or not all(isinstance(s, str) and s.strip() for s in symbols):
+            raise ValueError("symbols必须是股票代码数组")
+        # 去重并保持顺序
+        symbols = list(dict.fromkeys(s.strip().upper() for s in symbols))
+        if not symbols:
+            raise ValueError("symbols不能为空")
+        if len(symbols) > universe_config.universe_max_symbols:
+            raise ValueError(f"symbols最多支持{universe_config.universe_max_symbols}个，当前 {len(symbols)} 个")
+
+    if rules is not None:
+        prefilter = UniverseFilter.from_dict(rules)
+        if prefilter is None:
+            raise ValueError("rules不能为空")
+        rules = prefilter.to_dict()
+
+    return symbols, rules
+
+
+@universe_bp.route('', methods=['POST'])
+def create_universe():
+    """创建股票范围"""
+    try:
+        data = request.get_json() or {}
+
+        name = (data.get('name') or '').strip()
+        description = (data.get('description') or '').strip()
+
+        if not name:
+            return create_error_response(400, "参数错误", "name不能为空")
+
+        try:
+            symbols, rules = _parse_definition(data, required=True)
+        except ValueError as e:
+            return create_error_response(400, "参数错误", str(e))
+
+        from app.models.stock_universe import StockUniverseService
+        universe = StockUniverseService.create(name, description, symbols=symbols, rules=rules)
+
+        return create_success_response(
+            data=universe,
+            message=f"股票范围创建成功，包含 {universe['member_count']} 只股票"
+        )
+
+    except Exception as e:
+        logger.error(f"创建股票范围失败: {e}")
+        return create_error_response(500, "创建失败", str(e))
+
+
+@universe_bp.route('', methods=['GET'])
+def list_universes():
+    """获取所有股票范围（不含成员列表）"""
+    try:
+        from app.models.stock_universe import StockUniverseService
+
+        universes = StockUniverseService.get_all()
+
+        return create_success_response(
+            data=universes,
+            message=f"查询到 {len(universes)} 个股票范围"
+        )
+
+    except Exception as e:
+        logger.error(f"获取股票范围列表失败: {e}")
+        return create_error_response(500, "查询失败", str(e))
+
+
+@universe_bp.route('/<int:universe_id>', methods=['GET'])
+def get_universe(universe_id: int):
+    """获取股票范围及成员列表（成员过期时自动重新计算）"""
+    try:
+        from app.models.stock_universe import StockUniverseService
+
+        universe = StockUniverseService.get_by_id(universe_id)
+
+        if not universe:
+            return create_error_response(404, "未找到股票范围", f"股票范围ID {universe_id} 不存在")
+
+        return create_success_response(
+            data=universe,
+            message="查询成功"
+        )
+
+    except Exception as e:
+        logger.error(f"获取股票范围失败: {e}")
+        return create_error_response(500, "查询失败", str(e))
+
+
+@universe_bp.route('/<int:universe_id>', methods=['PUT'])
+def update_universe(universe_id: int):
+    """更新股票范围"""
+    try:
+        data = request.get_json() or {}
+
+        name = (data.get('name') or '').strip() or None
+        description = data.get('description')
+
+        try:
+            symbols, rules = _parse_definition(data, required=False)
+        except ValueError as e:
+            return create_error_response(400, "参数错误", str(e))
+
+        from app.models.stock_universe import StockUniverseService
+        from app.services.universe_cache import universe_panel_cache
+        from app.services.data_freshness import data_freshness_tracker
+        universe = StockUniverseService.update(
+            universe_id, name, description, symbols=symbols, rules=rules
+        )
+
+        if not universe:
+            return create_error_response(404, "未找到股票范围", f"股票范围ID {universe_id} 不存在")
+
+        universe_panel_cache.invalidate(universe_id)
+        data_freshness_tracker.invalidate('universes')
+
+        return create_success_response(
+            data=universe,
+            message="更新成功"
+        )
+
+    except Exception as e:
+        logger.error(f"更新股票范围失败: {e}")
+        return create_error_response(500, "更新失败", str(e))
+
+
+@universe_bp.route('/<int:universe_id>', methods=['DELETE'])
+def delete_universe(universe_id: int):
+    """删除股票范围"""
+    try:
+        from app.models.stock_universe import StockUniverseService
+        from app.services.universe_cache import universe_panel_cache
+        from app.services.data_freshness import data_freshness_tracker
+
+        success = StockUniverseService.delete(universe_id)
+
+        if not success:
+            return create_error_response(404, "未找到股票范围", f"股票范围ID {universe_id} 不存在")
+
+        universe_panel_cache.invalidate(universe_id)
+        data_freshness_tracker.invalidate('universes')
+
+        return create_success_response(
+            data=None,
+            message="删除成功"
+        )
+
+    except Exception as e:
+        logger.error(f"删除股票范围失败: {e}")
+        return create_error_response(500, "删除失败", str(e))
+
+
+@universe_bp.route('/<int:universe_id>/refresh', methods=['POST'])
+def refresh_universe(universe_id: int):
+    """强制重新计算股票范围成员"""
+    try:
+        from app.models.stock_universe import StockUniverseService
+        from app.services.universe_cache import universe_panel_cache
+        from app.services.data_freshness import data_freshness_tracker
+
+        universe = StockUniverseService.get_by_id(universe_id, refresh=True)
+
+        if not universe:
+            return create_error_response(404, "未找到股票范围", f"股票范围ID {universe_id} 不存在")
+
+        universe_panel_cache.invalidate(universe_id)
+        data_freshness_tracker.invalidate('universes')
+
+        return create_success_response(
+            data=universe,
+            message=f"成员已更新，包含 {universe['member_count']} 只股票"
+        )
+
+    except Exception as e:
+        logger.error(f"刷新股票范围失败: {e}")
+        return create_error_response(500, "刷新失败", str(e))
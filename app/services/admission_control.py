@@ -0,0 +1,241 @@
+"""
+请求准入控制模块
+
+按估算成本（股票数 × 各脚本的单只股票成本之和）将请求划分为轻量/重量两类。
+脚本成本由保存时的静态性能分析给出（回看天数 × 复杂度系数，见 script_linter）。
+重请求在单进程内和跨进程（gunicorn多个工作进程）范围内都有并发上限，
+超出预算时立即拒绝（429 + Retry-After），而不是排队占住工作进程，
+从而保证健康检查和轻量查询始终有可用的工作进程。
+"""
+
+import ast
+import os
+import threading
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import IO, Iterable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows 不支持 fcntl，跨进程限制退化为仅单进程限制
+    fcntl = None
+
+from config.settings import admission_config
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """重请求超出并发预算"""
+
+    def __init__(self, cost: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.cost = cost
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+@dataclass
+class AdmissionTicket:
+    """准入凭证，请求结束时必须释放"""
+    cost: int
+    heavy: bool
+    slot_file: Optional[IO] = None
+    holds_local_slot: bool = False
+
+
+class AdmissionController:
+    """重请求准入控制器"""
+
+    def __init__(self, config=None):
+        self.config = config or admission_config
+        self._local_slots = threading.BoundedSemaphore(max(1, self.config.admission_heavy_slots_per_process))
+        self._lock = threading.Lock()
+        self._heavy_in_flight = 0
+        self._rejected_total = 0
+
+    @staticmethod
+    def estimate_cost(symbol_count: int, script_count: int, lookback_days: int) -> int:
+        """估算请求成本：股票数 × 脚本数 × 回看天数"""
+        return max(0, symbol_count) * max(1, script_count) * max(1, lookback_days)
+
+    @staticmethod
+    def estimate_scripts_cost(symbol_count: int, script_costs: Iterable[int]) -> int:
+        """估算请求成本：股票数 × 各脚本的单只股票成本之和"""
+        return max(0, symbol_count) * max(1, sum(max(1, cost) for cost in script_costs))
+
+    def recommend_mode(self, estimated_seconds: float) -> str:
+        """
+        按外推的全量耗时建议执行方式
+
+        Returns:
+            str: interactive（同步执行）/ background（提交后台任务）/ reject（不建议执行）
+        """
+        if estimated_seconds <= self.config.admission_interactive_max_seconds:
+            return 'interactive'
+        if estimated_seconds <= self.config.admission_background_max_seconds:
+            return 'background'
+        return 'reject'
+
+    def is_heavy(self, cost: int) -> bool:
+        """判断是否为重请求"""
+        return cost >= self.config.admission_heavy_cost_threshold
+
+    def acquire(self, cost: int, heavy: Optional[bool] = None) -> AdmissionTicket:
+        """
+        申请执行许可
+
+        轻量请求直接放行；重请求需同时获得进程内槽位和跨进程槽位。
+
+        Args:
+            cost: 估算成本
+            heavy: 为空时按成本判断；为True时按重请求处理
+                （如分布式计算的协调者：本机不计算，但等待分片期间一直占用工作进程）
+
+        Raises:
+            AdmissionRejected: 重请求超出并发预算
+        """
+        if heavy is None:
+            heavy = self.is_heavy(cost)
+        if not self.config.admission_enabled or not heavy:
+            return AdmissionTicket(cost=cost, heavy=False)
+
+        if not self._local_slots.acquire(blocking=False):
+            self._reject(cost, "当前进程重请求并发已满")
+
+        ticket = AdmissionTicket(cost=cost, heavy=True, holds_local_slot=True)
+        try:
+            ticket.slot_file = self._acquire_global_slot()
+        except Exception:
+            self._local_slots.release()
+            raise
+
+        if ticket.slot_file is None and fcntl is not None:
+            self._local_slots.release()
+            self._reject(cost, "全局重请求并发已满")
+
+        with self._lock:
+            self._heavy_in_flight += 1
+        logger.info(f"重请求准入: cost={cost}")
+        return ticket
+
+    def release(self, ticket: AdmissionTicket):
+        """释放执行许可"""
+        if not ticket.heavy:
+            return
+
+        if ticket.slot_file is not None:
+            try:
+                fcntl.flock(ticket.slot_file, fcntl.LOCK_UN)
+            finally:
+                ticket.slot_file.close()
+                ticket.slot_file = None
+
+        if ticket.holds_local_slot:
+            ticket.holds_local_slot = False
+            self._local_slots.release()
+            with self._lock:
+                self._heavy_in_flight -= 1
+
+    @contextmanager
+    def admit(self, cost: int, heavy: Optional[bool] = None) -> Iterator[AdmissionTicket]:
+        """准入上下文管理器，退出时自动释放许可"""
+        ticket = self.acquire(cost, heavy)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> dict:
+        """当前进程的准入统计"""
+        with self._lock:
+            return {
+                'heavy_in_flight': self._heavy_in_flight,
+                'rejected_total': self._rejected_total,
+                'heavy_cost_threshold': self.config.admission_heavy_cost_threshold,
+                'heavy_slots_per_process': self.config.admission_heavy_slots_per_process,
+                'heavy_slots_global': self.config.admission_heavy_slots_global
+            }
+
+    def _acquire_global_slot(self) -> Optional[IO]:
+        """
+        尝试获取跨进程槽位
+
+        每个槽位对应一个锁文件，使用非阻塞 flock 抢占；进程异常退出时
+        操作系统会自动释放文件锁，不会遗留僵尸槽位。
+        """
+        if fcntl is None:
+            return None
+
+        os.makedirs(self.config.admission_lock_dir, exist_ok=True)
+        for slot in range(max(1, self.config.admission_heavy_slots_global)):
+            path = os.path.join(self.config.admission_lock_dir, f"heavy_slot_{slot}.lock")
+            slot_file = open(path, 'a+')
+            try:
+                fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return slot_file
+            except OSError:
+                slot_file.close()
+        return None
+
+    def _reject(self, cost: int, reason: str):
+        with self._lock:
+            self._rejected_total += 1
+        logger.warning(f"重请求被拒绝: cost={cost}, 原因={reason}")
+        raise AdmissionRejected(cost, self.config.admission_retry_after_seconds, reason)
+
+
+def estimate_script_lookback(script_code: str, default_days: Optional[int] = None) -> int:
+    """
+    静态估算脚本的历史数据回看天数
+
+    解析 get_history(symbol, days) 调用：days 为整数字面量或模块级常量时取其值，
+    无法解析时使用默认值；脚本不调用 get_history 时只需最新一行数据，返回1。
+
+    Args:
+        script_code: 脚本代码
+        default_days: 无法解析时的默认天数
+
+    Returns:
+        int: 估算的回看天数
+    """
+    if default_days is None:
+        default_days = admission_config.admission_default_lookback_days
+
+    try:
+        tree = ast.parse(script_code)
+    except SyntaxError:
+        return default_days
+
+    constants = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, int):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    constants[target.id] = node.value.value
+
+    lookback = 0
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'get_history'):
+            continue
+
+        days_arg = node.args[1] if len(node.args) >= 2 else None
+        for keyword in node.keywords:
+            if keyword.arg == 'days':
+                days_arg = keyword.value
+
+        if isinstance(days_arg, ast.Constant) and isinstance(days_arg.value, int):
+            days = days_arg.value
+        elif isinstance(days_arg, ast.Name) and days_arg.id in constants:
+            days = constants[days_arg.id]
+        else:
+            days = default_days
+
+        lookback = max(lookback, min(max(days, 1), 1000))
+
+    return lookback or 1
+
+
+# 全局准入控制器实例
+admission_controller = AdmissionController()
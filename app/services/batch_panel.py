@@ -0,0 +1,129 @@
+"""
+多股票历史行情面板模块
+
+POST /api/stock-price/query-batch 一次查询多只股票同一日期范围的行情，
+返回按交易日期对齐的列式面板：日期数组只出现一次，每个字段、每只股票各一个数值数组，
+与日期数组一一对应（当天无行情为 null，可选前向填充）。
+
+代替客户端逐只股票请求 /query 拼装面板，省去数百次HTTP和数据库往返，
+JSON 中也不再重复每一行的键名。
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 可查询的字段 → SQL表达式（数值列在SQL中转换为 float8，不经过 Decimal）
+PANEL_FIELDS = {
+    'open_price': 'open_price::float8',
+    'high_price': 'high_price::float8',
+    'low_price': 'low_price::float8',
+    'close_price': 'close_price::float8',
+    'volume': 'volume',
+    'turnover': 'turnover::float8',
+    'price_change': 'price_change::float8',
+    'price_change_pct': 'price_change_pct::float8',
+    'premium_rate': 'premium_rate::float8'
+}
+
+DEFAULT_FIELDS = ['close_price']
+
+# 填充方式
+FILL_NONE = None
+FILL_FORWARD = 'ffill'
+
+
+def parse_fields(fields: Any) -> List[str]:
+    """
+    解析字段列表（为空时默认只查询收盘价）
+
+    Raises:
+        ValueError: 字段不是列表或包含不支持的字段
+    """
+    if not fields:
+        return list(DEFAULT_FIELDS)
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+    if not isinstance(fields, list):
+        raise ValueError("fields必须是字段名数组")
+
+    invalid = [f for f in fields if f not in PANEL_FIELDS]
+    if invalid:
+        raise ValueError(f"不支持的字段: {', '.join(map(str, invalid))}，可选: {', '.join(PANEL_FIELDS)}")
+
+    # 去重并保持顺序
+    return list(dict.fromkeys(fields))
+
+
+def parse_fill(fill: Any) -> Optional[str]:
+    """
+    解析填充方式
+
+    Raises:
+        ValueError: 不支持的填充方式
+    """
+    if fill in (None, '', False, 'none'):
+        return FILL_NONE
+    if fill == FILL_FORWARD:
+        return FILL_FORWARD
+    raise ValueError("fill必须是 ffill 或 none")
+
+
+def build_panel(rows: Sequence[Tuple],
+                symbols: List[str],
+                fields: List[str],
+                fill: Optional[str] = FILL_NONE,
+                seed_rows: Optional[Sequence[Tuple]] = None) -> Dict[str, Any]:
+    """
+    将行情行对齐为列式面板
+
+    Args:
+        rows: (symbol, trade_date, 字段值...) 元组，字段顺序同 fields，按交易日期升序
+        symbols: 请求的股票代码（决定输出顺序）
+        fields: 字段列表
+        fill: 填充方式（ffill 时缺失值沿用该股票上一个有值的交易日）
+        seed_rows: 开始日期之前每只股票最近一行（格式同 rows），作为前向填充的初始值
+
+    Returns:
+        Dict: {dates, symbols, fields: {字段: {股票代码: 数值数组}}, missing}
+    """
+    dates: List[str] = []
+    date_index: Dict[str, int] = {}
+    for row in rows:
+        if row[1] not in date_index:
+            date_index[row[1]] = len(dates)
+            dates.append(row[1])
+
+    # 日期乱序时重新排序（SQL 已按日期排序时不会发生）
+    if any(dates[i] > dates[i + 1] for i in range(len(dates) - 1)):
+        dates.sort()
+        date_index = {d: i for i, d in enumerate(dates)}
+
+    columns: Dict[str, Dict[str, List[Any]]] = {
+        field: {symbol: [None] * len(dates) for symbol in symbols} for field in fields
+    }
+    found = set()
+    for row in rows:
+        symbol = row[0]
+        if symbol not in columns[fields[0]]:
+            continue
+        found.add(symbol)
+        i = date_index[row[1]]
+        for k, field in enumerate(fields):
+            columns[field][symbol][i] = row[2 + k]
+
+    if fill == FILL_FORWARD:
+        seeds = {row[0]: row[2:] for row in seed_rows or ()}
+        for k, field in enumerate(fields):
+            for symbol, values in columns[field].items():
+                last = seeds[symbol][k] if symbol in seeds else None
+                for i, value in enumerate(values):
+                    if value is None:
+                        values[i] = last
+                    else:
+                        last = value
+
+    return {
+        'dates': dates,
+        'symbols': symbols,
+        'fields': columns,
+        'missing': [symbol for symbol in symbols if symbol not in found]
+    }
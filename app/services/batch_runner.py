@@ -0,0 +1,307 @@
+"""
+离线批量计算模块
+
+在服务进程之外对全市场股票执行脚本（研究用途，入口为 run_batch.py）：
+股票列表按固定大小分块，多进程并行计算；每个分块一次性批量加载
+最新行情和历史数据面板，复用 SandboxExecutor 与 CalculationService。
+
+完成的分块结果立即写入 <output>.parts/ 目录，中断或失败后使用相同参数
+重新运行会跳过已完成的分块；全部完成后合并为 CSV 或 Parquet 文件。
+"""
+
+import csv
+import json
+import os
+import shutil
+import signal
+import time
+import logging
+import multiprocessing
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+OUTPUT_FORMATS = {'.csv': 'csv', '.parquet': 'parquet'}
+
+
+def run_chunk(task: Tuple[int, str, List[str]]) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    计算一个分块（在子进程中执行）
+
+    Args:
+        task: (分块序号, 脚本代码, 股票代码列表)
+
+    Returns:
+        Tuple[分块序号, 每只股票的结果列表]
+    """
+    from app.services.calculation_service import CalculationService
+    from app.services.universe_cache import UniversePanel
+
+    chunk_index, script, symbols = task
+    panel = UniversePanel(None, symbols)
+    result = CalculationService().run_script(script, symbols, panel=panel)
+    return chunk_index, result['results']
+
+
+def _init_worker():
+    """子进程初始化：由主进程处理 Ctrl+C；丢弃从父进程继承的数据库连接"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from database.connection import db_manager
+    for engine in db_manager.engines:
+        engine.dispose(close=False)
+
+
+class BatchRunner:
+    """离线批量计算执行器"""
+
+    def __init__(self, script: str, symbols: List[str], output: str,
+                 workers: Optional[int] = None, chunk_size: int = 200,
+                 chunk_func: Callable = run_chunk):
+        """
+        Args:
+            script: 脚本代码
+            symbols: 股票代码列表
+            output: 输出文件路径（.csv 或 .parquet）
+            workers: 进程数，默认使用全部CPU核心
+            chunk_size: 每个分块的股票数
+            chunk_func: 分块计算函数（需可被子进程导入）
+
+        Raises:
+            ValueError: 输出格式不支持或缺少 pyarrow
+        """
+        self.output = Path(output)
+        self.format = OUTPUT_FORMATS.get(self.output.suffix.lower())
+        if self.format is None:
+            raise ValueError(f"不支持的输出格式: {self.output.suffix}（支持 .csv / .parquet）")
+        if self.format == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("输出Parquet格式需要安装 pyarrow: pip install pyarrow")
+
+        if chunk_size <= 0:
+            raise ValueError("chunk_size必须大于0")
+
+        self.script = script
+        self.symbols = list(symbols)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.chunk_func = chunk_func
+        self.parts_dir = Path(f"{self.output}.parts")
+        self.chunks = [
+            self.symbols[start:start + chunk_size]
+            for start in range(0, len(self.symbols), chunk_size)
+        ]
+
+    def run(self, restart: bool = False, keep_parts: bool = False) -> Dict[str, Any]:
+        """
+        执行批量计算
+
+        Args:
+            restart: 丢弃已有的中间结果重新计算
+            keep_parts: 合并后保留中间结果目录
+
+        Returns:
+            Dict: 执行摘要（total, successful, failed, output, elapsed_seconds）
+
+        Raises:
+            ValueError: 已有中间结果与当前参数不匹配
+        """
+        started = time.monotonic()
+        self._prepare_parts_dir(restart)
+
+        completed = self._completed_chunks()
+        pending = [
+            (index, self.script, chunk)
+            for index, chunk in enumerate(self.chunks)
+            if index not in completed
+        ]
+        if completed:
+            logger.info(f"续传：跳过已完成的 {len(completed)} 个分块，剩余 {len(pending)} 个")
+
+        done_symbols = sum(len(self.chunks[index]) for index in completed)
+        progress = _Progress(len(self.symbols), done_symbols, len(self.chunks), len(completed))
+
+        if pending:
+            self._run_pending(pending, progress)
+
+        summary = self._merge()
+        summary['elapsed_seconds'] = round(time.monotonic() - started, 2)
+
+        if not keep_parts:
+            shutil.rmtree(self.parts_dir, ignore_errors=True)
+
+        logger.info(
+            f"✅ 批量计算完成: {summary['total']} 只股票，成功 {summary['successful']}，"
+            f"失败 {summary['failed']}，输出 {summary['output']}"
+        )
+        return summary
+
+    def _run_pending(self, pending: List[Tuple[int, str, List[str]]], progress: '_Progress'):
+        """计算未完成的分块，每完成一个分块立即写入中间结果"""
+        workers = min(self.workers, len(pending))
+
+        if workers <= 1:
+            for task in pending:
+                chunk_index, results = self.chunk_func(task)
+                self._write_part(chunk_index, results)
+                progress.update(len(results))
+            return
+
+        logger.info(f"🚀 使用 {workers} 个进程计算 {len(pending)} 个分块")
+        pool = multiprocessing.Pool(workers, initializer=_init_worker)
+        try:
+            for chunk_index, results in pool.imap_unordered(self.chunk_func, pending):
+                self._write_part(chunk_index, results)
+                progress.update(len(results))
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            logger.warning("批量计算中断，已完成的分块已保存，使用相同参数重新运行即可继续")
+            raise
+        finally:
+            pool.join()
+
+    def _fingerprint(self) -> str:
+        """中间结果对应的参数指纹（脚本、股票列表、分块大小）"""
+        from app.utils.continuation import request_fingerprint
+        return request_fingerprint(self.script, self.symbols, self.chunk_size)
+
+    def _prepare_parts_dir(self, restart: bool):
+        """创建中间结果目录；已存在时校验参数一致"""
+        manifest_path = self.parts_dir / MANIFEST_FILE
+        fingerprint = self._fingerprint()
+
+        if restart and self.parts_dir.exists():
+            shutil.rmtree(self.parts_dir)
+
+        if manifest_path.exists():
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('fingerprint') != fingerprint:
+                raise ValueError(
+                    f"{self.parts_dir} 中的中间结果与当前参数不匹配，使用 --restart 重新开始"
+                )
+            return
+
+        self.parts_dir.mkdir(parents=True, exist_ok=True)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'fingerprint': fingerprint,
+                'symbols': len(self.symbols),
+                'chunk_size': self.chunk_size,
+                'chunks': len(self.chunks)
+            }, f)
+
+    def _part_path(self, chunk_index: int) -> Path:
+        return self.parts_dir / f"chunk_{chunk_index:06d}.jsonl"
+
+    def _completed_chunks(self) -> Set[int]:
+        """已完成的分块序号"""
+        return {
+            index for index in range(len(self.chunks))
+            if self._part_path(index).exists()
+        }
+
+    def _write_part(self, chunk_index: int, results: List[Dict[str, Any]]):
+        """写入分块结果（先写临时文件再重命名，中断时不会留下不完整的分块）"""
+        path = self._part_path(chunk_index)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for item in results:
+                f.write(json.dumps(item, ensure_ascii=False, default=str))
+                f.write('\n')
+        os.replace(tmp_path, path)
+
+    def _read_results(self) -> List[Dict[str, Any]]:
+        """按分块顺序读取全部结果"""
+        results = []
+        for index in range(len(self.chunks)):
+            with open(self._part_path(index), 'r', encoding='utf-8') as f:
+                results.extend(json.loads(line) for line in f if line.strip())
+        return results
+
+    def _merge(self) -> Dict[str, Any]:
+        """合并中间结果为输出文件"""
+        results = self._read_results()
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+
+        if self.format == 'parquet':
+            _write_parquet(self.output, results)
+        else:
+            _write_csv(self.output, results)
+
+        failed = sum(1 for item in results if item.get('error'))
+        return {
+            'total': len(results),
+            'successful': len(results) - failed,
+            'failed': failed,
+            'output': str(self.output)
+        }
+
+
+def _format_value(value: Any) -> Any:
+    """列表、字典等结果以JSON字符串输出"""
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+def _write_csv(path: Path, results: List[Dict[str, Any]]):
+    """写出CSV（symbol, value, error）"""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['symbol', 'value', 'error'])
+        for item in results:
+            writer.writerow([item['symbol'], _format_value(item.get('value')), item.get('error') or ''])
+
+
+def _write_parquet(path: Path, results: List[Dict[str, Any]]):
+    """写出Parquet（结果全部为数值时 value 列为 float64，否则为字符串）"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    values = [item.get('value') for item in results]
+    if all(value is None or isinstance(value, (int, float)) for value in values):
+        value_array = pa.array([None if value is None else float(value) for value in values], type=pa.float64())
+    else:
+        value_array = pa.array(
+            [None if value is None else str(_format_value(value)) for value in values], type=pa.string()
+        )
+
+    table = pa.table({
+        'symbol': pa.array([item['symbol'] for item in results], type=pa.string()),
+        'value': value_array,
+        'error': pa.array([item.get('error') for item in results], type=pa.string())
+    })
+    pq.write_table(table, str(path))
+
+
+class _Progress:
+    """进度报告（完成股票数、速度、预计剩余时间）"""
+
+    def __init__(self, total_symbols: int, done_symbols: int, total_chunks: int, done_chunks: int):
+        self.total_symbols = total_symbols
+        self.done_symbols = done_symbols
+        self.total_chunks = total_chunks
+        self.done_chunks = done_chunks
+        self._start_symbols = done_symbols
+        self._started = time.monotonic()
+
+    def update(self, symbols: int):
+        self.done_symbols += symbols
+        self.done_chunks += 1
+
+        elapsed = time.monotonic() - self._started
+        rate = (self.done_symbols - self._start_symbols) / elapsed if elapsed > 0 else 0.0
+        remaining = (self.total_symbols - self.done_symbols) / rate if rate > 0 else 0.0
+        percent = self.done_symbols * 100 / self.total_symbols if self.total_symbols else 100.0
+
+        logger.info(
+            f"进度: {self.done_chunks}/{self.total_chunks} 块，"
+            f"{self.done_symbols}/{self.total_symbols} 只股票 ({percent:.1f}%)，"
+            f"速度 {rate:.1f} 只/秒，预计剩余 {remaining:.0f} 秒"
+        )
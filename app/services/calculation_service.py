@@ -0,0 +1,188 @@
+"""
+脚本计算服务模块
+
+封装"解析股票范围 → 获取行情 → 沙箱执行脚本"的计算流程，
+供Web进程（同步执行）和后台计算进程（start_worker.py）共用
+"""
+
+from typing import Dict, List, Any, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CalculationService:
+    """脚本计算服务类"""
+
+    def __init__(self, executor=None):
+        from app.services.sandbox_executor import SandboxExecutor
+        self.executor = executor or SandboxExecutor()
+
+    def resolve_symbols(self, stock_symbols: Optional[List[str]], prefilter=None) -> List[str]:
+        """
+        解析待计算的股票范围
+
+        Args:
+            stock_symbols: 用户指定的股票列表，为空时使用所有活跃股票
+            prefilter: 股票范围筛选条件（UniverseFilter），仅在使用所有活跃股票时生效
+
+        Returns:
+            List[str]: 股票代码列表
+        """
+        if stock_symbols:
+            return stock_symbols
+
+        from app.services.stock_data_service import StockDataService
+        all_stocks = StockDataService().get_all_active_stocks(prefilter=prefilter)
+        if prefilter is not None:
+            logger.info(f"按筛选条件 {prefilter.to_dict()} 获取 {len(all_stocks)} 只活跃股票")
+        else:
+            logger.info(f"自动获取 {len(all_stocks)} 只活跃股票")
+        return all_stocks
+
+    def run_script(self, script: str, stock_symbols: List[str], token=None, panel=None) -> Dict[str, Any]:
+        """
+        对每只股票执行脚本
+
+        Args:
+            script: 脚本代码
+            stock_symbols: 股票代码列表
+            token: 取消令牌（CancellationToken），取消后不再执行剩余股票；
+                超过截止时间后停止计算，未执行的股票列入 pending
+            panel: 股票范围面板（UniversePanel），提供时从缓存读取最新行情和历史数据
+
+        Returns:
+            Dict: 包含 results、（多只股票时）summary 和（超时时）pending 的响应数据
+
+        Raises:
+            RequestCancelled: 请求已被取消
+        """
+        from config.settings import execution_config
+        batch_size = execution_config.latest_row_batch_size
+
+        if panel is not None:
+            from app.services.sandbox_executor import SandboxExecutor
+            data_source = panel
+            executor = SandboxExecutor(history_provider=panel.get_history)
+        else:
+            from app.services.stock_data_service import StockDataService
+            data_source = StockDataService()
+            executor = self.executor
+
+        results = []
+        successful = 0
+        failed = 0
+        pending = []
+        stock_rows = {}
+
+        for index, symbol in enumerate(stock_symbols):
+            if token is not None:
+                token.raise_if_cancelled()
+                if token.expired:
+                    pending = stock_symbols[index:]
+                    logger.info(f"达到截止时间，已完成 {index} 只股票，剩余 {len(pending)} 只")
+                    break
+
+            # 按批一次性获取最新行情，循环内只执行脚本
+            if index % batch_size == 0:
+                stock_rows = self._load_stock_rows(
+                    data_source, stock_symbols[index:index + batch_size], token
+                )
+
+            try:
+                stock_row = stock_rows.get(symbol)
+
+                if stock_row is None:
+                    results.append({
+                        "symbol": symbol,
+                        "value": None,
+                        "error": "股票数据不存在"
+                    })
+                    failed += 1
+                    continue
+
+                # 执行脚本
+                result, error = executor.execute(script, {"row": stock_row})
+
+                results.append({
+                    "symbol": symbol,
+                    "value": result,
+                    "error": error
+                })
+
+                if error:
+                    failed += 1
+                else:
+                    successful += 1
+
+            except Exception as e:
+                logger.error(f"执行脚本失败，股票: {symbol}, 错误: {e}")
+                results.append({
+                    "symbol": symbol,
+                    "value": None,
+                    "error": str(e)
+                })
+                failed += 1
+
+        response_data = {"results": results}
+
+        # 添加执行摘要（当处理多只股票时）
+        if len(results) > 1 or pending:
+            response_data["summary"] = {
+                "total": len(results),
+                "successful": successful,
+                "failed": failed
+            }
+
+        if pending:
+            response_data["pending"] = pending
+            response_data["summary"]["pending"] = len(pending)
+
+        return response_data
+
+    def run_scripts_for_stocks(self, scripts_dict: Dict[Any, str], stocks: List[Dict[str, Any]], token=None) -> int:
+        """
+        为每只股票执行多个脚本（/list），结果写入 stock['script_results']
+
+        令牌取消后抛出 RequestCancelled；超过截止时间后停止，剩余股票不计算。
+
+        Args:
+            scripts_dict: 脚本ID → 脚本代码
+            stocks: 股票行（脚本的 row 上下文）
+
+        Returns:
+            int: 已完成计算的股票数
+        """
+        for index, stock in enumerate(stocks):
+            if token is not None:
+                token.raise_if_cancelled()
+                if token.expired:
+                    return index
+
+            script_results = {}
+
+            for script_id, script_code in scripts_dict.items():
+                try:
+                    logger.info(f"Executing script {script_id} for stock {stock.get('symbol')}")
+                    script_result, error = self.executor.execute(script_code, context={'row': stock})
+                    logger.info(f"Script {script_id} result: {script_result}, error: {error}")
+                    script_results[str(script_id)] = script_result if error is None else None
+                except Exception as e:
+                    logger.error(f"Script {script_id} execution error for {stock.get('symbol')}: {e}")
+                    import traceback
+                    logger.error(f"Traceback: {traceback.format_exc()}")
+                    script_results[str(script_id)] = None
+
+            stock['script_results'] = script_results
+
+        return len(stocks)
+
+    @staticmethod
+    def _load_stock_rows(data_source, symbols: List[str], token=None) -> Dict[str, Dict[str, Any]]:
+        """批量获取最新行情（查询因请求取消被中断时抛出 RequestCancelled）"""
+        try:
+            return data_source.get_latest_stock_rows(symbols)
+        except Exception:
+            if token is not None:
+                token.raise_if_cancelled()
+            raise
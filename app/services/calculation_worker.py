@@ -0,0 +1,135 @@
+"""
+后台计算进程模块
+
+从 calculation_tasks 队列抢占任务、执行脚本计算并写回结果。
+计算容量与HTTP容量解耦：可按需启动多个计算进程（python start_worker.py），
+重启Web进程不会丢失计算中的任务；计算进程异常退出时，
+心跳超时的任务会被其他计算进程回收重新执行。
+"""
+
+import os
+import socket
+import threading
+import logging
+from typing import Optional
+
+from config.settings import worker_config
+
+logger = logging.getLogger(__name__)
+
+
+class CalculationWorker:
+    """后台计算进程"""
+
+    def __init__(self, worker_id: Optional[str] = None, config=None):
+        self.config = config or worker_config
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """请求停止（当前任务完成后退出）"""
+        logger.info(f"计算进程 {self.worker_id} 收到停止请求")
+        self._stop_event.set()
+
+    def run_forever(self):
+        """主循环：回收超时任务 → 抢占任务 → 执行，队列为空时休眠"""
+        logger.info(f"🚀 计算进程启动: {self.worker_id}")
+
+        while not self._stop_event.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                logger.error(f"计算进程循环异常: {e}")
+                processed = False
+
+            if not processed:
+                self._stop_event.wait(self.config.worker_poll_interval_seconds)
+
+        logger.info(f"计算进程已停止: {self.worker_id}")
+
+    def run_once(self) -> bool:
+        """
+        处理一个任务
+
+        Returns:
+            bool: 是否处理了任务（队列为空时返回False）
+        """
+        from app.models.calculation_task import CalculationTaskService
+
+        requeued = CalculationTaskService.requeue_stale(
+            self.config.worker_stale_timeout_seconds,
+            self.config.worker_max_attempts
+        )
+        if requeued:
+            logger.warning(f"回收 {requeued} 个心跳超时的任务")
+
+        task = CalculationTaskService.claim_next(self.worker_id)
+        if task is None:
+            return False
+
+        task_id = task['id']
+        payload = task['payload'] or {}
+        logger.info(f"开始执行任务: task_id={task_id}")
+
+        heartbeat_stop = threading.Event()
+        heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop,
+            args=(task_id, heartbeat_stop),
+            daemon=True
+        )
+        heartbeat_thread.start()
+
+        try:
+            result = self._execute(payload)
+            CalculationTaskService.complete(task_id, self.worker_id, result)
+            logger.info(f"任务完成: task_id={task_id}, 处理 {len(result['results'])} 只股票")
+        except Exception as e:
+            logger.error(f"任务执行失败: task_id={task_id}, 错误: {e}")
+            CalculationTaskService.fail(task_id, self.worker_id, str(e))
+        finally:
+            heartbeat_stop.set()
+            heartbeat_thread.join()
+
+        return True
+
+    def _execute(self, payload: dict) -> dict:
+        """执行任务参数描述的计算"""
+        from app.services.calculation_service import CalculationService
+        from app.services.universe_filter import UniverseFilter
+
+        script = payload.get('script')
+        if not script:
+            raise ValueError("任务缺少脚本代码")
+
+        service = CalculationService()
+
+        universe_id = payload.get('universe_id')
+        if universe_id is not None:
+            from app.models.stock_universe import StockUniverseService
+            from app.services.universe_cache import universe_panel_cache
+            universe = StockUniverseService.get_by_id(universe_id)
+            if not universe:
+                raise ValueError(f"股票范围ID {universe_id} 不存在")
+            if not universe['members']:
+                raise ValueError("股票范围中没有活跃股票")
+            panel = universe_panel_cache.get(universe_id, universe['members_version'], universe['members'])
+            return service.run_script(script, universe['members'], panel=panel)
+
+        stock_symbols = service.resolve_symbols(
+            payload.get('stock_symbols') or [],
+            UniverseFilter.from_dict(payload.get('prefilter'))
+        )
+        if not stock_symbols:
+            raise ValueError("数据库中没有活跃股票")
+
+        return service.run_script(script, stock_symbols)
+
+    def _heartbeat_loop(self, task_id: int, stop_event: threading.Event):
+        """任务执行期间定期更新心跳"""
+        from app.models.calculation_task import CalculationTaskService
+
+        while not stop_event.wait(self.config.worker_heartbeat_interval_seconds):
+            try:
+                CalculationTaskService.heartbeat(task_id, self.worker_id)
+            except Exception as e:
+                logger.warning(f"任务心跳更新失败: task_id={task_id}, 错误: {e}")
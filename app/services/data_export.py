@@ -0,0 +1,238 @@
+"""
+行情数据导出模块
+
+GET/POST /api/stock-price/export 按股票集合和日期范围流式导出 stock_daily_data：
+查询使用服务端游标（psycopg2 命名游标，每次取 EXPORT_CHUNK_ROWS 行），
+每批行编码为 CSV 文本或一个 Parquet 行组后立即发送，进程内只保留一批数据，
+内存占用与导出总行数无关。客户端断开时生成器关闭，游标和连接随之释放。
+
+导出在同步工作进程上执行：不指定股票或数据量大的导出按重请求准入（占用重请求槽位直到传输结束），
+单次导出超过 EXPORT_MAX_SECONDS 时中断连接，避免被 gunicorn 的请求超时强制终止。
+"""
+
+import csv
+import io
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.services.batch_panel import PANEL_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# 导出格式 → 响应类型
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# 每行固定包含的列（字段列在其后）
+KEY_COLUMNS = ('trade_date', 'symbol')
+
+# Parquet 列类型（字段列除 volume 外均为 float64）
+PARQUET_TYPES = {'trade_date': 'date32', 'symbol': 'string', 'volume': 'int64'}
+
+# 未指定开始日期时估算导出成本使用的天数
+EXPORT_HISTORY_DAYS = 3650
+
+
+def parse_export_params(fmt: Optional[str], fields: Any) -> Tuple[str, List[str]]:
+    """
+    解析导出格式和字段（默认 CSV、全部字段）
+
+    Raises:
+        ValueError: 格式不支持、缺少 pyarrow 或字段无效
+    """
+    from app.services.batch_panel import parse_fields
+
+    fmt = (fmt or 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}（支持 csv / parquet）")
+    if fmt == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("导出Parquet格式需要安装 pyarrow: pip install pyarrow")
+
+    return fmt, parse_fields(fields) if fields else list(PANEL_FIELDS)
+
+
+class ExportTimeout(Exception):
+    """导出超过最长时间"""
+
+
+def estimate_export_cost(symbols: Optional[List[str]], start_date: Optional[str],
+                         end_date: Optional[str]) -> Optional[int]:
+    """
+    估算导出成本：股票数 × 日期范围天数（未指定开始日期时按 EXPORT_HISTORY_DAYS 计）
+
+    Returns:
+        Optional[int]: 不指定股票（导出全部股票）时返回None，调用方按重请求处理
+    """
+    if symbols is None:
+        return None
+    end = datetime.strptime(end_date, '%Y-%m-%d') if end_date else datetime.now()
+    days = (end - datetime.strptime(start_date, '%Y-%m-%d')).days + 1 if start_date else EXPORT_HISTORY_DAYS
+    return len(symbols) * max(1, days)
+
+
+def iter_with_time_limit(chunks: Iterator[Sequence[Tuple]], max_seconds: float,
+                         clock=time.monotonic) -> Iterator[Sequence[Tuple]]:
+    """
+    逐批传递，累计耗时超过 max_seconds 时抛出 ExportTimeout
+
+    响应状态码已经发出，只能中断连接：客户端收到不完整的分块传输，不会把截断的数据当作完整文件。
+    """
+    started = clock()
+    for rows in chunks:
+        if clock() - started > max_seconds:
+            raise ExportTimeout(f"导出超过 {max_seconds} 秒，已中断，请按股票或日期范围分批导出")
+        yield rows
+
+
+def iter_csv(chunks: Iterator[Sequence[Tuple]], columns: List[str]) -> Iterator[bytes]:
+    """逐批编码为CSV（首行为列名，日期为 YYYY-MM-DD）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+
+    for rows in chunks:
+        writer.writerows((row[0].strftime('%Y-%m-%d'),) + tuple(row[1:]) for row in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """ParquetWriter 的输出：缓存写入的字节，由调用方逐批取走"""
+
+    def __init__(self):
+        super().__init__()
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def iter_parquet(chunks: Iterator[Sequence[Tuple]], columns: List[str]) -> Iterator[bytes]:
+    """逐批编码为Parquet（每批一个行组，文件尾在最后一批之后写出）"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (name, getattr(pa, PARQUET_TYPES.get(name, 'float64'))()) for name in columns
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for rows in chunks:
+            values = list(zip(*rows))
+            writer.write_table(pa.table(
+                [pa.array(values[i], type=schema.field(i).type) for i in range(len(columns))],
+                schema=schema
+            ), row_group_size=len(rows))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+class DataExporter:
+    """行情数据流式导出"""
+
+    def __init__(self, chunk_rows: Optional[int] = None, timeout_ms: Optional[int] = None,
+                 max_seconds: Optional[float] = None):
+        from config.settings import export_config
+        from app.utils.query_timeout import timeout_for
+        self.chunk_rows = chunk_rows or export_config.export_chunk_rows
+        self.max_seconds = max_seconds or export_config.export_max_seconds
+        # 导出在响应返回后才执行，不在接口的语句超时作用域内；每批读取（FETCH）单独计时
+        self.timeout_ms = timeout_ms if timeout_ms is not None else timeout_for('export')
+
+    def iter_rows(self,
+                  symbols: Optional[List[str]],
+                  fields: List[str],
+                  start_date: Optional[str] = None,
+                  end_date: Optional[str] = None) -> Iterator[Sequence[Tuple]]:
+        """
+        按股票代码、交易日期顺序逐批读取行情（服务端游标）
+
+        Args:
+            symbols: 股票代码列表，为None时导出全部股票
+            fields: 字段列表（见 batch_panel.PANEL_FIELDS）
+            start_date: 开始日期（YYYY-MM-DD）
+            end_date: 结束日期（YYYY-MM-DD）
+
+        Yields:
+            每批最多 chunk_rows 个 (trade_date, symbol, 字段值...) 元组
+        """
+        from sqlalchemy import text
+        from database.connection import db_manager
+
+        conditions = []
+        params: Dict[str, Any] = {}
+        if symbols is not None:
+            conditions.append("symbol = ANY(:symbols)")
+            params['symbols'] = list(symbols)
+        if start_date:
+            conditions.append("trade_date >= :start_date")
+            params['start_date'] = datetime.strptime(start_date, '%Y-%m-%d')
+        if end_date:
+            conditions.append("trade_date <= :end_date")
+            params['end_date'] = datetime.strptime(end_date, '%Y-%m-%d')
+
+        query = f"""
+        SELECT trade_date::date, symbol, {', '.join(PANEL_FIELDS[field] for field in fields)}
+        FROM stock_daily_data sd
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY sd.symbol, sd.trade_date
+        """
+
+        exported = 0
+        with db_manager.read_engine().connect() as conn:
+            if self.timeout_ms:
+                db_manager.apply_statement_timeout(conn, self.timeout_ms)
+            result = conn.execution_options(stream_results=True, yield_per=self.chunk_rows).execute(
+                text(query), params
+            )
+            try:
+                for rows in result.partitions(self.chunk_rows):
+                    exported += len(rows)
+                    yield rows
+            finally:
+                result.close()
+                logger.info(f"行情导出结束: {exported} 行")
+
+    def stream(self,
+               fmt: str,
+               symbols: Optional[List[str]],
+               fields: List[str],
+               start_date: Optional[str] = None,
+               end_date: Optional[str] = None) -> Iterator[bytes]:
+        """按格式编码的导出字节流"""
+        columns = list(KEY_COLUMNS) + fields
+        chunks = iter_with_time_limit(self.iter_rows(symbols, fields, start_date, end_date), self.max_seconds)
+        if fmt == 'parquet':
+            return iter_parquet(chunks, columns)
+        return iter_csv(chunks, columns)
@@ -0,0 +1,132 @@
+"""
+数据新鲜度版本模块
+
+条件请求（ETag / Last-Modified）需要知道响应依赖的数据是否变化。
+每个数据源的版本由少量聚合查询得到（最新交易日期、最近同步时间、行数和最近更新时间），
+并在进程内缓存 HTTP_CACHE_CHECK_INTERVAL_SECONDS 秒：检查间隔内的条件请求不访问数据库。
+
+数据源：
+    market    —— 行情与股票信息（stock_daily_data 最新交易日期、stock_info 行数/更新时间/最近同步日期、
+                 stock_latest_bar 最近更新时间，覆盖新交易日和当日行情修订）
+    scripts   —— 自定义脚本（custom_scripts 行数和最近更新时间，读取主库）
+    universes —— 股票范围定义（stock_universes 行数和最近更新时间，读取主库）
+    stock_lists —— 本地股票清单（加载时间，不访问数据库）
+"""
+
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from config.settings import http_cache_config
+
+logger = logging.getLogger(__name__)
+
+# 数据源版本：(版本字符串, 最近修改时间)
+SourceVersion = Tuple[str, Optional[datetime]]
+
+
+def _join(*values) -> str:
+    return ':'.join('' if value is None else value.isoformat() if hasattr(value, 'isoformat') else str(value)
+                    for value in values)
+
+
+def _latest(*values) -> Optional[datetime]:
+    present = [value for value in values if value is not None]
+    return max(present) if present else None
+
+
+class DataFreshnessTracker:
+    """按数据源缓存数据版本（每个进程一份）"""
+
+    def __init__(self, config=None):
+        self.config = config or http_cache_config
+        self._versions: Dict[str, Tuple[float, SourceVersion]] = {}
+        self._lock = threading.Lock()
+        self._loaders = {
+            'market': self._market_version,
+            'scripts': self._scripts_version,
+            'universes': self._universes_version,
+            'stock_lists': self._stock_lists_version
+        }
+
+    def version(self, sources: Iterable[str]) -> SourceVersion:
+        """
+        多个数据源的组合版本
+
+        Returns:
+            Tuple[str, Optional[datetime]]: 版本字符串和其中最近的修改时间
+        """
+        parts = []
+        modified = []
+        for source in sources:
+            version, last_modified = self._get(source)
+            parts.append(f"{source}={version}")
+            modified.append(last_modified)
+        return '|'.join(parts), _latest(*modified)
+
+    def invalidate(self, source: Optional[str] = None):
+        """丢弃缓存的版本（下次请求时重新查询），source 为空时丢弃全部"""
+        with self._lock:
+            if source is None:
+                self._versions.clear()
+            else:
+                self._versions.pop(source, None)
+
+    def _get(self, source: str) -> SourceVersion:
+        loader = self._loaders.get(source)
+        if loader is None:
+            raise ValueError(f"未知的数据源: {source}")
+
+        cached = self._versions.get(source)
+        now = time.monotonic()
+        if cached is not None and now - cached[0] < self.config.http_cache_check_interval_seconds:
+            return cached[1]
+
+        value = loader()
+        with self._lock:
+            self._versions[source] = (time.monotonic(), value)
+        return value
+
+    def _market_version(self) -> SourceVersion:
+        from database.connection import db_manager
+        from sqlalchemy import text
+
+        with db_manager.get_session(read_only=True) as session:
+            latest_trade_date, stock_count, stock_updated, last_sync, bar_updated = session.execute(text("""
+                SELECT
+                    (SELECT MAX(trade_date) FROM stock_daily_data),
+                    (SELECT COUNT(*) FROM stock_info),
+                    (SELECT MAX(updated_at) FROM stock_info),
+                    (SELECT MAX(last_sync_date) FROM stock_info),
+                    (SELECT MAX(updated_at) FROM stock_latest_bar)
+            """)).fetchone()
+        return (_join(latest_trade_date, stock_count, stock_updated, last_sync, bar_updated),
+                _latest(stock_updated, bar_updated))
+
+    def _scripts_version(self) -> SourceVersion:
+        return self._table_version('custom_scripts')
+
+    def _universes_version(self) -> SourceVersion:
+        return self._table_version('stock_universes')
+
+    def _table_version(self, table: str) -> SourceVersion:
+        # 读取主库：脚本和股票范围修改后立即 invalidate，从副本读取可能得到修改前的版本并缓存，
+        # 客户端会在检查间隔内收到 304 和修改前的结果
+        from database.connection import db_manager
+        from sqlalchemy import text
+
+        with db_manager.get_session() as session:
+            count, updated = session.execute(text(f"SELECT COUNT(*), MAX(updated_at) FROM {table}")).fetchone()
+        return _join(count, updated), updated
+
+    def _stock_lists_version(self) -> SourceVersion:
+        from constants.stock_lists_loader import stock_lists_manager
+
+        loaded_at = stock_lists_manager.loaded_at
+        return _join(loaded_at), loaded_at
+
+
+# 全局数据版本实例
+data_freshness_tracker = DataFreshnessTracker()
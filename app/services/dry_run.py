@@ -0,0 +1,188 @@
+"""
+抽样试运行模块
+
+在全量股票范围中按板块分层随机抽样执行脚本，测量单只股票耗时分位数、
+读取的数据库行数和内存占用，外推全量执行的耗时与内存，
+并由准入控制给出执行方式建议（同步 / 后台任务 / 不建议执行）。
+
+分层按交易所和代码前两位（近似板块，如 SH.60 主板、SH.68 科创板、SZ.30 创业板），
+各层按股票数比例分配样本，使上市时间和历史数据长度的分布与全量接近。
+"""
+
+import sys
+import math
+import time
+import random
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def stratum_of(symbol: str) -> str:
+    """股票所属分层：交易所 + 代码前两位"""
+    market, _, code = symbol.partition('.')
+    return f"{market}.{code[:2]}"
+
+
+def stratified_sample(symbols: List[str], sample_size: int, seed: Optional[int] = None) -> List[str]:
+    """
+    按板块分层随机抽样（按比例分配，余数按最大余额法分配）
+
+    Args:
+        symbols: 全量股票代码
+        sample_size: 样本数
+        seed: 随机种子（相同种子得到相同样本）
+
+    Returns:
+        List[str]: 样本（保持在全量列表中的顺序）
+    """
+    if sample_size >= len(symbols):
+        return list(symbols)
+
+    strata: Dict[str, List[int]] = {}
+    for position, symbol in enumerate(symbols):
+        strata.setdefault(stratum_of(symbol), []).append(position)
+
+    quotas = {key: len(members) * sample_size / len(symbols) for key, members in strata.items()}
+    allocation = {key: int(quota) for key, quota in quotas.items()}
+    remainder = sample_size - sum(allocation.values())
+    for key in sorted(quotas, key=lambda k: quotas[k] - allocation[k], reverse=True)[:remainder]:
+        allocation[key] += 1
+
+    rng = random.Random(seed)
+    picked = []
+    for key, members in strata.items():
+        picked.extend(rng.sample(members, allocation[key]))
+    return [symbols[position] for position in sorted(picked)]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def deep_sizeof(obj: Any) -> int:
+    """估算字典/列表结构占用的内存（字节）"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k) + deep_sizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_sizeof(item) for item in obj)
+    return size
+
+
+class DryRunEstimator:
+    """抽样试运行估算器"""
+
+    def __init__(self, history_provider: Optional[Callable[..., List[dict]]] = None):
+        """
+        Args:
+            history_provider: 历史数据来源 (symbol, days) -> list，为空时直接查询数据库
+        """
+        if history_provider is None:
+            from app.services.stock_data_service import StockDataService
+            history_provider = StockDataService().get_history
+        self._history_provider = history_provider
+
+    def run(self, script: str, symbols: List[str], sample_size: int, seed: Optional[int] = None,
+            data_source=None, token=None) -> Dict[str, Any]:
+        """
+        抽样执行脚本并外推全量成本
+
+        Args:
+            script: 脚本代码
+            symbols: 全量股票代码
+            sample_size: 样本数
+            seed: 随机种子
+            data_source: 最新行情来源（StockDataService 或 UniversePanel），为空时查询数据库
+            token: 取消令牌
+
+        Returns:
+            Dict: results（样本计算结果）和 estimate（测量值与外推值）
+        """
+        from config.settings import execution_config
+        from app.services.sandbox_executor import SandboxExecutor
+        from app.services.admission_control import admission_controller
+
+        if data_source is None:
+            from app.services.stock_data_service import StockDataService
+            data_source = StockDataService()
+
+        sample = stratified_sample(symbols, sample_size, seed)
+
+        history_rows = [0]
+        history_bytes = [0]
+
+        def counted_history(symbol: str, days: int, *interval) -> list:
+            rows = self._history_provider(symbol, days, *interval)
+            history_rows[0] += len(rows)
+            history_bytes[0] = max(history_bytes[0], deep_sizeof(rows))
+            return rows
+
+        executor = SandboxExecutor(history_provider=counted_history)
+
+        load_started = time.perf_counter()
+        stock_rows = data_source.get_latest_stock_rows(sample)
+        row_load_seconds = time.perf_counter() - load_started
+
+        results = []
+        latencies = []
+        for symbol in sample:
+            if token is not None:
+                token.raise_if_cancelled()
+
+            stock_row = stock_rows.get(symbol)
+            if stock_row is None:
+                results.append({"symbol": symbol, "value": None, "error": "股票数据不存在"})
+                continue
+
+            started = time.perf_counter()
+            value, error = executor.execute(script, {"row": stock_row})
+            latencies.append(time.perf_counter() - started)
+            results.append({"symbol": symbol, "value": value, "error": error})
+
+        total = len(symbols)
+        measured = max(1, len(sample))
+        mean_latency = sum(latencies) / len(latencies) if latencies else 0.0
+        estimated_seconds = (row_load_seconds / measured + mean_latency) * total
+
+        # 内存：一批最新行情 + 单只股票最大历史数据（逐只释放）+ 全量结果
+        row_bytes = max((deep_sizeof(row) for row in stock_rows.values()), default=0)
+        result_bytes = max((deep_sizeof(item) for item in results), default=0)
+        estimated_memory = (
+            row_bytes * min(total, execution_config.latest_row_batch_size)
+            + history_bytes[0]
+            + result_bytes * total
+        )
+
+        failed = sum(1 for item in results if item['error'])
+        estimate = {
+            "universe_size": total,
+            "sample_size": len(sample),
+            "strata": len({stratum_of(s) for s in sample}),
+            "failed": failed,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 3),
+                "p90": round(percentile(latencies, 90) * 1000, 3),
+                "p99": round(percentile(latencies, 99) * 1000, 3),
+                "max": round(max(latencies, default=0.0) * 1000, 3),
+                "mean": round(mean_latency * 1000, 3)
+            },
+            "db_rows": {
+                "sample": history_rows[0] + len(stock_rows),
+                "per_symbol": round((history_rows[0] + len(stock_rows)) / measured, 1),
+                "estimated_total": round((history_rows[0] + len(stock_rows)) / measured * total)
+            },
+            "estimated_seconds": round(estimated_seconds, 3),
+            "estimated_memory_bytes": estimated_memory,
+            "recommendation": admission_controller.recommend_mode(estimated_seconds)
+        }
+
+        logger.info(f"抽样试运行完成: 样本 {len(sample)}/{total}，外推耗时 {estimated_seconds:.1f} 秒，"
+                    f"建议 {estimate['recommendation']}")
+        return {"results": results, "estimate": estimate}
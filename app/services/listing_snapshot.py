@@ -0,0 +1,209 @@
+"""
+股票列表最新行情快照模块
+
+/api/stock-price/list 的结果只在每日行情同步或股票信息变更后才变化，
+但每次请求都要对全部 stock_info 关联查询最新行情并执行 COUNT 查询。
+本模块在进程内按列保存全部股票的基本信息和最新行情（快照），
+按市场、ETF、是否活跃筛选的结果（行号列表）也缓存在快照中，
+请求只需切片分页并组装当前页的行，不访问数据库。
+
+快照每隔 LISTING_SNAPSHOT_CHECK_INTERVAL_SECONDS 最多检查一次数据版本
+（stock_info 行数与最近更新时间、全市场最新交易日期），版本变化或超过最长使用时间时重建。
+"""
+
+import bisect
+import threading
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import listing_snapshot_config
+from app.utils.metrics import observe_cache
+
+logger = logging.getLogger(__name__)
+
+# 快照内缓存的筛选结果数量上限（市场、ETF、是否活跃的组合有限，超出时清空）
+MAX_CACHED_FILTERS = 64
+
+COLUMNS = (
+    'symbol', 'stock_name', 'market_code', 'is_active', 'is_etf', 'last_sync_date',
+    'close_price', 'price_change_pct', 'volume', 'latest_trade_date'
+)
+
+
+class ListingSnapshot:
+    """全部股票最新行情的列式快照（只读）"""
+
+    def __init__(self, rows: List[Dict[str, Any]], version: str):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.columns: Dict[str, List[Any]] = {name: [row[name] for row in rows] for name in COLUMNS}
+        self.size = len(rows)
+        self._positions = {symbol: i for i, symbol in enumerate(self.columns['symbol'])}
+        self._filters: Dict[Tuple, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def list_stocks(self,
+                    market_codes: Optional[List[str]] = None,
+                    is_active: str = 'Y',
+                    is_etf: Optional[bool] = None,
+                    limit: int = 100,
+                    offset: int = 0,
+                    symbols: Optional[List[str]] = None,
+                    after: Optional[str] = None,
+                    include_total: str = 'exact',
+                    columnar: bool = False) -> Dict[str, Any]:
+        """
+        筛选并分页（参数与返回格式同 StockDataService.list_stocks_with_latest_price）
+
+        总数在内存中直接得到，无论 include_total 取值都返回精确总数。
+        每次返回新的行字典，调用方可以修改（如写入 script_results）；
+        columnar 为True时 data 为列名 → 当前页的值列表（列式响应直接使用，不构建行字典）。
+        """
+        positions = self._filter(tuple(sorted(market_codes)) if market_codes else None, is_active, is_etf)
+
+        if symbols is not None:
+            members = {self._positions[s] for s in symbols if s in self._positions}
+            positions = [p for p in positions if p in members]
+
+        start = offset
+        if after:
+            start += self._position_after(positions, after)
+
+        page = positions[start:start + limit]
+        columns = self.columns
+        if columnar:
+            data = {name: [columns[name][p] for p in page] for name in COLUMNS}
+        else:
+            data = [{name: columns[name][p] for name in COLUMNS} for p in page]
+        has_more = start + limit < len(positions)
+
+        return {
+            'success': True,
+            'data': data,
+            'total': len(positions),
+            'total_estimated': False,
+            'count': len(page),
+            'has_more': has_more,
+            'next_key': columns['symbol'][page[-1]] if has_more and page else None
+        }
+
+    def _position_after(self, positions: List[int], after: str) -> int:
+        """游标定位：positions（升序行号）中第一个排在 after 之后的下标"""
+        row = self._positions.get(after)
+        if row is not None:
+            return bisect.bisect_right(positions, row)
+        # 游标股票已不在快照中：按代码顺序定位
+        row = bisect.bisect_left(self.columns['symbol'], after)
+        return bisect.bisect_left(positions, row)
+
+    def _filter(self, market_codes: Optional[Tuple[str, ...]], is_active: str, is_etf: Optional[bool]) -> List[int]:
+        """满足筛选条件的行号（按代码排序），同一条件只计算一次"""
+        key = (market_codes, is_active, is_etf)
+        positions = self._filters.get(key)
+        if positions is not None:
+            return positions
+
+        market_set = set(market_codes) if market_codes else None
+        columns = self.columns
+        positions = [
+            i for i in range(self.size)
+            if columns['is_active'][i] == is_active
+            and (market_set is None or columns['market_code'][i] in market_set)
+            and (is_etf is None or columns['is_etf'][i] == is_etf)
+        ]
+        with self._lock:
+            if len(self._filters) >= MAX_CACHED_FILTERS:
+                self._filters.clear()
+            self._filters[key] = positions
+        return positions
+
+
+class ListingSnapshotCache:
+    """股票列表快照缓存（每个进程一份）"""
+
+    def __init__(self, config=None, data_service=None):
+        self.config = config or listing_snapshot_config
+        self._data_service = data_service
+        self._snapshot: Optional[ListingSnapshot] = None
+        self._checked_at = 0.0
+        self._build_lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+
+    @property
+    def data_service(self):
+        if self._data_service is None:
+            from app.services.stock_data_service import StockDataService
+            self._data_service = StockDataService()
+        return self._data_service
+
+    def get(self) -> ListingSnapshot:
+        """获取当前快照，首次使用、数据版本变化或超过最长使用时间时重建"""
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < self.config.listing_snapshot_check_interval_seconds:
+            self.hits += 1
+            observe_cache('listing_snapshot', True)
+            return snapshot
+
+        with self._build_lock:
+            snapshot = self._snapshot
+            now = time.monotonic()
+            # 等待锁期间其他线程已完成检查
+            if snapshot is not None and now - self._checked_at < self.config.listing_snapshot_check_interval_seconds:
+                self.hits += 1
+                observe_cache('listing_snapshot', True)
+                return snapshot
+
+            version = self.data_service.get_listing_version()
+            self._checked_at = time.monotonic()
+            if (snapshot is not None and snapshot.version == version
+                    and now - snapshot.built_at < self.config.listing_snapshot_max_age_seconds):
+                self.hits += 1
+                observe_cache('listing_snapshot', True)
+                return snapshot
+
+            started = time.monotonic()
+            snapshot = ListingSnapshot(self.data_service.get_listing_rows(), version)
+            self._snapshot = snapshot
+            self.builds += 1
+            observe_cache('listing_snapshot', False)
+            logger.info(f"构建股票列表快照: {snapshot.size} 只股票，版本 {version}，"
+                        f"耗时 {time.monotonic() - started:.3f} 秒")
+            return snapshot
+
+    def list_stocks(self, **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        从快照响应 /list 查询
+
+        Returns:
+            Optional[Dict]: 未启用或构建失败时返回None，由调用方回退到数据库查询
+        """
+        if not self.config.listing_snapshot_enabled:
+            return None
+        try:
+            return self.get().list_stocks(**kwargs)
+        except Exception as e:
+            logger.error(f"股票列表快照不可用，回退到数据库查询: {e}")
+            return None
+
+    def invalidate(self):
+        """丢弃快照（下次请求时重建）"""
+        with self._build_lock:
+            self._snapshot = None
+            self._checked_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        snapshot = self._snapshot
+        return {
+            'size': snapshot.size if snapshot else 0,
+            'version': snapshot.version if snapshot else None,
+            'builds': self.builds,
+            'hits': self.hits
+        }
+
+
+# 全局快照缓存实例
+listing_snapshot_cache = ListingSnapshotCache()
@@ -6,10 +6,12 @@
 """
 
 import math
+import time
 import signal
 import logging
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from RestrictedPython import compile_restricted, safe_globals
+from app.services.script_linter import ScriptAnalysis, analyze_script
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +22,15 @@ class SandboxExecutor:
     # 超时限制（秒）
     TIMEOUT_SECONDS = 10
     
-    def __init__(self):
-        """初始化沙箱执行器"""
+    def __init__(self, history_provider: Optional[Callable[..., List[dict]]] = None):
+        """
+        初始化沙箱执行器
+        
+        Args:
+            history_provider: 历史数据来源 (symbol, days) -> list（周线、月线时另传 interval），
+                为空时直接查询数据库；批量计算时可传入预加载的面板数据
+        """
+        self._history_provider = history_provider
         self._configure_safe_globals()
     
     def _configure_safe_globals(self):
@@ -91,17 +100,20 @@ class SandboxExecutor:
         
         self._safe_globals = safe
     
-    def _get_history_function(self, symbol: str, days: int) -> list:
+    def _get_history_function(self, symbol: str, days: int, interval: str = '1d') -> list:
         """
         获取股票历史价格数据（提供给脚本调用）
         
         Args:
             symbol: 股票代码（如 'SH.600519'）
-            days: 获取交易天数（最多1000天）
+            days: 获取交易天数（最多1000天；周线、月线时为K线根数）
+            interval: K线周期（'1d' 日线 / '1w' 周线 / '1M' 月线）
             
         Returns:
             历史价格数据列表，每个元素包含 close_price, trade_date, volume, price_change_pct
         """
+        from app.services.stock_data_service import parse_interval
+        
         # 输入验证
         if not symbol or not isinstance(symbol, str):
             return []
@@ -109,27 +121,32 @@ class SandboxExecutor:
         if not isinstance(days, int) or days < 1 or days > 1000:
             days = 250  # 默认250天
         
+        interval = parse_interval(interval)
+        
+        # 请求已取消（客户端断开）时不再访问数据库
+        from app.utils.cancellation import current_token
+        token = current_token()
+        if token is not None and token.cancelled:
+            return []
+        
+        from database.connection import db_manager, is_statement_timeout
+        from app.utils.query_timeout import timeout_for
+        
+        timeout_ms = timeout_for('script_history')
         try:
-            from database.connection import db_manager
-            from models.stock_data import StockDailyData
-            from sqlalchemy import desc
-            
-            with db_manager.get_session() as session:
-                query = session.query(StockDailyData).filter(
-                    StockDailyData.symbol == symbol
-                ).order_by(desc(StockDailyData.trade_date)).limit(days)
-                
-                results = query.all()
+            with db_manager.statement_timeout(timeout_ms):
+                if self._history_provider is not None:
+                    if interval == '1d':
+                        return self._history_provider(symbol, days)
+                    return self._history_provider(symbol, days, interval)
                 
-                # 格式化返回数据
-                return [{
-                    'close_price': float(r.close_price) if r.close_price else None,
-                    'trade_date': r.trade_date.strftime('%Y-%m-%d') if r.trade_date else None,
-                    'volume': int(r.volume) if r.volume else 0,
-                    'price_change_pct': float(r.price_change_pct) if r.price_change_pct else None
-                } for r in results]
+                from app.services.stock_data_service import StockDataService
+                return StockDataService().get_history(symbol, days, interval)
                 
         except Exception as e:
+            if is_statement_timeout(e):
+                # 超时不返回空列表，避免脚本把缺失的历史数据当作真实结果
+                raise TimeoutError(f"get_history 查询超过 {timeout_ms} 毫秒，已取消: {symbol}")
             logger.error(f"Error retrieving history for {symbol}: {e}")
             return []
     
@@ -146,6 +163,15 @@ class SandboxExecutor:
                 - result: 计算结果（如果成功）
                 - error_message: 错误消息（如果失败）
         """
+        from app.utils.metrics import observe_sandbox_execution
+        
+        started = time.perf_counter()
+        result, error = self._execute(script_code, context)
+        observe_sandbox_execution(time.perf_counter() - started, error is None)
+        return result, error
+    
+    def _execute(self, script_code: str, context: Optional[Dict[str, Any]]) -> Tuple[Optional[Any], Optional[str]]:
+        """编译并执行脚本（见 execute）"""
         try:
             # 准备执行上下文
             exec_globals = self._safe_globals.copy()
@@ -270,4 +296,23 @@ class SandboxExecutor:
         except Exception as e:
             logger.error(f"语法验证异常: {e}")
             return False, f"Syntax validation failed: {str(e)}"
+    
+    def validate_script(self, script_code: str) -> Tuple[bool, Optional[str], Optional[ScriptAnalysis]]:
+        """
+        验证脚本语法并做静态性能分析
+        
+        Args:
+            script_code: Python脚本代码
+            
+        Returns:
+            Tuple[is_valid, error_message, analysis]: 语法错误时 analysis 为None
+        """
+        is_valid, error_message = self.validate_syntax(script_code)
+        if not is_valid:
+            return False, error_message, None
+        
+        analysis = analyze_script(script_code)
+        for warning in analysis.warnings:
+            logger.info(f"脚本性能提示 {warning.code}（第 {warning.line} 行）: {warning.message}")
+        return True, None, analysis
 
@@ -0,0 +1,231 @@
+"""
+分布式计算（scatter-gather）模块
+
+协调者把股票按代码哈希分片到配置的对等实例（CLUSTER_PEERS），
+各实例通过内部接口 /api/custom-calculations/shard 计算自己的分片，
+协调者合并结果并按原始顺序返回。
+
+同一股票总是分到同一实例，各实例的行情缓存保持稳定；
+分片失败（网络错误、超时、实例过载返回429等）时换下一个实例重试。
+"""
+
+import json
+import time
+import zlib
+import logging
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from config.settings import cluster_config, execution_config
+
+logger = logging.getLogger(__name__)
+
+SHARD_PATH = '/api/custom-calculations/shard'
+CLUSTER_TOKEN_HEADER = 'X-Cluster-Token'
+
+# 分片类型 → (请求中的股票字段, 响应中的结果字段)，结果按请求顺序一一对应
+SHARD_FIELDS = {
+    'execute': ('symbols', 'results'),
+    'list': ('stocks', 'script_results')
+}
+
+
+class ShardFailed(Exception):
+    """分片在所有候选实例上均计算失败"""
+
+
+def shard_index(symbol: str, shard_count: int) -> int:
+    """股票所属分片（稳定哈希，与进程和Python版本无关）"""
+    return zlib.crc32(symbol.encode('utf-8')) % shard_count
+
+
+def post_json(url: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """
+    向对等实例发送分片请求
+
+    Returns:
+        Dict: 响应中的 data 字段
+
+    Raises:
+        Exception: 网络错误、HTTP错误状态（HTTPError）或错误响应
+    """
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+        headers={
+            'Content-Type': 'application/json',
+            CLUSTER_TOKEN_HEADER: cluster_config.cluster_token
+        },
+        method='POST'
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        body = json.loads(response.read().decode('utf-8'))
+
+    if body.get('error') or 'data' not in body:
+        raise ShardFailed(body.get('detail') or body.get('message') or '分片计算失败')
+    return body['data']
+
+
+def check_shard_result(payload: Dict[str, Any], data: Dict[str, Any]):
+    """
+    校验分片结果与请求的股票一一对应（按位置合并，条数不一致时不能使用）
+
+    Raises:
+        ShardFailed: 缺少结果字段或结果条数与请求的股票数不一致
+    """
+    request_field, result_field = SHARD_FIELDS[payload['kind']]
+    results = data.get(result_field) if isinstance(data, dict) else None
+    expected = len(payload[request_field])
+    if not isinstance(results, list) or len(results) != expected:
+        received = len(results) if isinstance(results, list) else None
+        raise ShardFailed(f"分片结果条数不一致: 请求 {expected} 只股票，返回 {received} 条")
+
+
+class ScatterGatherCoordinator:
+    """分布式计算协调者"""
+
+    def __init__(self, peers: Optional[List[str]] = None, config=None,
+                 transport: Callable[[str, Dict[str, Any], float], Dict[str, Any]] = post_json):
+        """
+        Args:
+            peers: 对等实例地址列表，默认读取 CLUSTER_PEERS
+            config: 分布式计算配置
+            transport: 发送分片请求的函数 (url, payload, timeout) -> data
+        """
+        self.config = config or cluster_config
+        self.peers = peers if peers is not None else self.config.peer_urls
+        self.transport = transport
+
+    def should_scatter(self, symbol_count: int) -> bool:
+        """是否分发到对等实例（已配置实例且股票数达到阈值）"""
+        return bool(self.peers) and symbol_count >= self.config.cluster_min_symbols
+
+    def split(self, symbols: List[str]) -> Dict[int, List[int]]:
+        """按哈希分片，返回 分片序号 → 股票在原列表中的位置"""
+        shards: Dict[int, List[int]] = {}
+        for position, symbol in enumerate(symbols):
+            shards.setdefault(shard_index(symbol, len(self.peers)), []).append(position)
+        return shards
+
+    def run_script(self, script: str, stock_symbols: List[str], token=None) -> Dict[str, Any]:
+        """
+        分布式执行单个脚本（/execute）
+
+        Returns:
+            Dict: 与 CalculationService.run_script 相同格式的 results 和 summary
+        """
+        shards = self.split(stock_symbols)
+        payloads = {
+            index: {
+                'kind': 'execute',
+                'script': script,
+                'symbols': [stock_symbols[p] for p in positions]
+            }
+            for index, positions in shards.items()
+        }
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(stock_symbols)
+        for index, data in self._gather(payloads, token).items():
+            for position, item in zip(shards[index], data['results']):
+                results[position] = item
+
+        failed = sum(1 for item in results if item.get('error'))
+        response_data = {"results": results}
+        if len(results) > 1:
+            response_data["summary"] = {
+                "total": len(results),
+                "successful": len(results) - failed,
+                "failed": failed
+            }
+        return response_data
+
+    def run_list_scripts(self, scripts_dict: Dict[int, str], stocks: List[Dict[str, Any]], token=None) -> int:
+        """
+        分布式执行 /list 的多个脚本，结果写入 stock['script_results']
+
+        Returns:
+            int: 已完成计算的股票数
+        """
+        shards = self.split([stock['symbol'] for stock in stocks])
+        scripts = {str(script_id): code for script_id, code in scripts_dict.items()}
+        payloads = {
+            index: {
+                'kind': 'list',
+                'scripts': scripts,
+                'stocks': [stocks[p] for p in positions]
+            }
+            for index, positions in shards.items()
+        }
+
+        for index, data in self._gather(payloads, token).items():
+            for position, script_results in zip(shards[index], data['script_results']):
+                stocks[position]['script_results'] = script_results
+
+        return len(stocks)
+
+    def _gather(self, payloads: Dict[int, Dict[str, Any]], token=None) -> Dict[int, Dict[str, Any]]:
+        """
+        并发发送全部分片并等待结果
+
+        Raises:
+            ShardFailed: 某个分片在所有候选实例上均失败
+            RequestCancelled: 请求已被取消
+        """
+        started = time.monotonic()
+        results: Dict[int, Dict[str, Any]] = {}
+
+        executor = ThreadPoolExecutor(max_workers=len(payloads), thread_name_prefix='scatter')
+        try:
+            futures = {
+                executor.submit(self._run_shard, index, payload, token): index
+                for index, payload in payloads.items()
+            }
+            pending = set(futures)
+            while pending:
+                done, pending = wait(
+                    pending,
+                    timeout=execution_config.disconnect_check_interval_seconds,
+                    return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    results[futures[future]] = future.result()
+                if token is not None:
+                    token.raise_if_cancelled()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        logger.info(f"分布式计算完成: {len(payloads)} 个分片，耗时 {time.monotonic() - started:.2f} 秒")
+        return results
+
+    def _run_shard(self, index: int, payload: Dict[str, Any], token=None) -> Dict[str, Any]:
+        """
+        在分片的首选实例上计算，失败后依次换下一个实例重试
+
+        请求取消后 _gather 不再等待，但已在执行的分片线程仍会继续；每次发送前检查取消令牌，
+        取消后不再向其他实例重试。
+
+        Raises:
+            ShardFailed: 在所有候选实例上均失败
+            RequestCancelled: 请求已被取消
+        """
+        attempts = min(len(self.peers), 1 + self.config.cluster_shard_retries)
+        last_error = None
+
+        for attempt in range(attempts):
+            if token is not None:
+                token.raise_if_cancelled()
+            peer = self.peers[(index + attempt) % len(self.peers)]
+            try:
+                data = self.transport(f"{peer}{SHARD_PATH}", payload, self.config.cluster_shard_timeout_seconds)
+                check_shard_result(payload, data)
+                return data
+            except Exception as e:
+                last_error = e
+                logger.warning(f"分片 {index} 在 {peer} 上计算失败（第 {attempt + 1} 次）: {e}")
+
+        raise ShardFailed(f"分片 {index} 在 {attempts} 个实例上均计算失败: {last_error}")
+
+
+# 全局协调者实例
+scatter_gather_coordinator = ScatterGatherCoordinator()
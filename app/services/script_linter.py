@@ -0,0 +1,294 @@
+"""
+脚本性能静态分析模块
+
+保存和验证脚本时基于AST检查常见的慢写法，并估算单只股票的计算成本：
+- PERF001: 在循环中（或在循环调用的函数中）调用 get_history，每次迭代都访问数据库
+- PERF002: 获取的历史天数远多于实际使用的天数
+- PERF003: 在循环中（或在循环调用的函数中）重复构建 list(range(n))
+- PERF004: 按循环变量切片滑动窗口并整体重算，复杂度 O(n×窗口)
+
+成本估算（cost_estimate）= 回看天数 × 复杂度系数，保存在 custom_scripts 表中，
+准入控制按 股票数 × 各脚本成本之和 判定重请求。
+"""
+
+import ast
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# 复杂度系数
+HISTORY_IN_LOOP_FACTOR = 10
+SLIDING_WINDOW_FACTOR = 10
+
+# 超过此天数的 get_history 调用给出提示
+LARGE_HISTORY_DAYS = 500
+
+
+@dataclass
+class LintWarning:
+    """性能警告"""
+    code: str
+    line: int
+    message: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'code': self.code, 'line': self.line, 'message': self.message}
+
+
+@dataclass
+class ScriptAnalysis:
+    """脚本静态分析结果"""
+    lookback_days: int
+    cost_estimate: int
+    warnings: List[LintWarning] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'lookback_days': self.lookback_days,
+            'cost_estimate': self.cost_estimate,
+            'warnings': [warning.to_dict() for warning in self.warnings]
+        }
+
+
+def analyze_script(script_code: str) -> ScriptAnalysis:
+    """
+    静态分析脚本的性能问题并估算成本
+
+    Args:
+        script_code: 脚本代码
+
+    Returns:
+        ScriptAnalysis: 语法错误时只返回回看天数估算，不包含警告
+    """
+    from app.services.admission_control import estimate_script_lookback
+
+    lookback = estimate_script_lookback(script_code)
+
+    try:
+        tree = ast.parse(script_code)
+    except SyntaxError:
+        return ScriptAnalysis(lookback_days=lookback, cost_estimate=lookback)
+
+    constants = _module_constants(tree)
+    functions = {node.name for node in tree.body if isinstance(node, ast.FunctionDef)}
+
+    # 被循环调用的函数（传递闭包）：函数体内的代码同样视为在循环中执行
+    hot_functions: Set[str] = set()
+    while True:
+        visitor = _LoopVisitor(hot_functions, functions, constants)
+        visitor.visit(tree)
+        if visitor.called_in_loop <= hot_functions:
+            break
+        hot_functions |= visitor.called_in_loop
+
+    # 同一行的“天数多于实际使用”比“天数过大”更具体，只保留前者
+    unused = _unused_history_warnings(tree, constants)
+    unused_keys = {(w.code, w.line) for w in unused}
+    warnings = [w for w in visitor.warnings if (w.code, w.line) not in unused_keys] + unused
+    warnings.sort(key=lambda w: (w.line, w.code))
+
+    factor = 1
+    if any(w.code == 'PERF001' for w in warnings):
+        factor *= HISTORY_IN_LOOP_FACTOR
+    if any(w.code == 'PERF004' for w in warnings):
+        factor *= SLIDING_WINDOW_FACTOR
+
+    return ScriptAnalysis(lookback_days=lookback, cost_estimate=lookback * factor, warnings=warnings)
+
+
+def script_cost_estimate(script_code: str, stored_estimate: Optional[int] = None) -> int:
+    """
+    脚本的单只股票计算成本：优先使用保存时记录的估算值，否则现场分析
+
+    Args:
+        script_code: 脚本代码
+        stored_estimate: custom_scripts.cost_estimate（旧脚本可能为空）
+    """
+    if stored_estimate is not None:
+        return stored_estimate
+    return analyze_script(script_code).cost_estimate
+
+
+def _module_constants(tree: ast.Module) -> Dict[str, int]:
+    """模块级整数常量（如 MOMENTUM_DAY = 34）"""
+    constants = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, int):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    constants[target.id] = node.value.value
+    return constants
+
+
+def _resolve_int(node: Optional[ast.AST], constants: Dict[str, int]) -> Optional[int]:
+    """解析整数字面量或模块常量"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, int) and not isinstance(node.value, bool):
+        return node.value
+    if isinstance(node, ast.Name):
+        return constants.get(node.id)
+    return None
+
+
+def _history_days_arg(call: ast.Call) -> Optional[ast.AST]:
+    """get_history 调用的 days 参数"""
+    days_arg = call.args[1] if len(call.args) >= 2 else None
+    for keyword in call.keywords:
+        if keyword.arg == 'days':
+            days_arg = keyword.value
+    return days_arg
+
+
+def _is_call_to(node: ast.AST, name: str) -> bool:
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == name
+
+
+class _LoopVisitor(ast.NodeVisitor):
+    """跟踪循环上下文，检查循环内的 get_history、list(range()) 和滑动窗口"""
+
+    def __init__(self, hot_functions: Set[str], functions: Set[str], constants: Dict[str, int]):
+        self.hot_functions = hot_functions
+        self.functions = functions
+        self.constants = constants
+        self.depth = 0
+        self.in_hot_function = False
+        self.called_in_loop: Set[str] = set()
+        self.warnings: List[LintWarning] = []
+
+    @property
+    def in_loop(self) -> bool:
+        return self.depth > 0 or self.in_hot_function
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        saved = (self.depth, self.in_hot_function)
+        self.depth, self.in_hot_function = 0, node.name in self.hot_functions
+        self.generic_visit(node)
+        self.depth, self.in_hot_function = saved
+
+    def visit_For(self, node: ast.For):
+        # 迭代对象只求值一次，不在循环内
+        self.visit(node.iter)
+        self._check_sliding_window(node)
+        self.depth += 1
+        for child in [node.target] + node.body + node.orelse:
+            self.visit(child)
+        self.depth -= 1
+
+    def visit_While(self, node: ast.While):
+        self.depth += 1
+        self.generic_visit(node)
+        self.depth -= 1
+
+    def _visit_comprehension(self, node):
+        self.visit(node.generators[0].iter)
+        self.depth += 1
+        for index, generator in enumerate(node.generators):
+            if index > 0:
+                self.visit(generator.iter)
+            self.visit(generator.target)
+            for condition in generator.ifs:
+                self.visit(condition)
+        for attr in ('elt', 'key', 'value'):
+            if hasattr(node, attr):
+                self.visit(getattr(node, attr))
+        self.depth -= 1
+
+    visit_ListComp = visit_SetComp = visit_GeneratorExp = visit_DictComp = _visit_comprehension
+
+    def visit_Call(self, node: ast.Call):
+        if isinstance(node.func, ast.Name):
+            name = node.func.id
+            if self.in_loop and name in self.functions:
+                self.called_in_loop.add(name)
+
+            if name == 'get_history':
+                if self.in_loop:
+                    self._warn('PERF001', node, "在循环中调用 get_history，每次迭代都会查询数据库；"
+                                                "请在循环外获取一次历史数据后复用")
+                days = _resolve_int(_history_days_arg(node), self.constants)
+                if days is not None and days >= LARGE_HISTORY_DAYS:
+                    self._warn('PERF002', node, f"获取 {days} 天历史数据，数据加载量和准入成本随天数线性增长；"
+                                                "请只获取计算所需的天数")
+
+            if name == 'list' and node.args and _is_call_to(node.args[0], 'range') and self.in_loop:
+                self._warn('PERF003', node, "在循环中重复构建 list(range(n))；"
+                                            "可在循环外构建一次，或直接迭代 range(n)")
+
+        self.generic_visit(node)
+
+    def _check_sliding_window(self, node: ast.For):
+        """循环体按循环变量切片（如 prices[i - N:i]）并整体重算"""
+        if not isinstance(node.target, ast.Name):
+            return
+        loop_var = node.target.id
+
+        for child in node.body:
+            for sub in ast.walk(child):
+                if not (isinstance(sub, ast.Subscript) and isinstance(sub.slice, ast.Slice)):
+                    continue
+                bounds = [b for b in (sub.slice.lower, sub.slice.upper) if b is not None]
+                if any(isinstance(n, ast.Name) and n.id == loop_var for b in bounds for n in ast.walk(b)):
+                    self._warn('PERF004', node, f"按循环变量 {loop_var} 切片滑动窗口并整体重算，复杂度为 O(n×窗口)；"
+                                                "可改为滚动更新（窗口移动时增量加减首尾元素）")
+                    return
+
+    def _warn(self, code: str, node: ast.AST, message: str):
+        line = getattr(node, 'lineno', 0)
+        if not any(w.code == code and w.line == line for w in self.warnings):
+            self.warnings.append(LintWarning(code, line, message))
+
+
+def _unused_history_warnings(tree: ast.Module, constants: Dict[str, int]) -> List[LintWarning]:
+    """
+    检查获取的历史天数多于实际使用的天数
+
+    形如 history = get_history(symbol, 1000)，且 history 只以 history[:34] / history[-34:]
+    这类常量切片使用时，提示只需获取切片范围内的天数。
+    """
+    parents = {}
+    for node in ast.walk(tree):
+        for child in ast.iter_child_nodes(node):
+            parents[child] = node
+
+    warnings = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name) and _is_call_to(node.value, 'get_history')):
+            continue
+
+        days = _resolve_int(_history_days_arg(node.value), constants)
+        if days is None:
+            continue
+
+        var = node.targets[0].id
+        used = []
+        for name in ast.walk(tree):
+            if not (isinstance(name, ast.Name) and name.id == var and isinstance(name.ctx, ast.Load)):
+                continue
+            parent = parents.get(name)
+            if not (isinstance(parent, ast.Subscript) and parent.value is name and isinstance(parent.slice, ast.Slice)):
+                used = None
+                break
+            used.append(_slice_extent(parent.slice, constants))
+
+        if used and all(extent is not None for extent in used) and max(used) < days:
+            warnings.append(LintWarning(
+                'PERF002', node.lineno,
+                f"获取了 {days} 天历史数据但只使用了 {max(used)} 天；请将 days 改为 {max(used)}"
+            ))
+
+    return warnings
+
+
+def _slice_extent(slice_node: ast.Slice, constants: Dict[str, int]) -> Optional[int]:
+    """常量切片覆盖的元素数（history[:N] 或 history[-N:]），无法确定时返回None"""
+    if slice_node.step is not None:
+        return None
+    if slice_node.lower is None and slice_node.upper is not None:
+        upper = _resolve_int(slice_node.upper, constants)
+        return upper if upper is not None and upper >= 0 else None
+    if slice_node.upper is None and isinstance(slice_node.lower, ast.UnaryOp) \
+            and isinstance(slice_node.lower.op, ast.USub):
+        return _resolve_int(slice_node.lower.operand, constants)
+    return None
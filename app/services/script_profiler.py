@@ -0,0 +1,177 @@
+"""
+脚本逐行性能分析模块
+
+在抽样股票上用 sys.settrace 跟踪脚本执行（只跟踪 '<inline-script>' 的帧），
+统计每行的执行次数和累计耗时（包含该行调用的函数），
+并单独统计 get_history 的耗时，区分数据加载与纯计算，结果按脚本源码行返回。
+
+跟踪本身有开销，耗时的绝对值偏大，应关注各行之间的相对比例。
+"""
+
+import sys
+import time
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_FILENAME = '<inline-script>'
+
+
+def sample_symbols(symbols: List[str], sample_size: int) -> List[str]:
+    """等间隔抽样（结果确定，覆盖整个股票列表）"""
+    if sample_size >= len(symbols):
+        return list(symbols)
+    step = len(symbols) / sample_size
+    return [symbols[int(i * step)] for i in range(sample_size)]
+
+
+class _LineTracer:
+    """逐行计时：一行的耗时为该行开始到同一帧下一个事件之间的时间"""
+
+    def __init__(self):
+        self.hits: Dict[int, int] = defaultdict(int)
+        self.seconds: Dict[int, float] = defaultdict(float)
+        self.history_seconds: Dict[int, float] = defaultdict(float)
+        self.history_calls: Dict[int, int] = defaultdict(int)
+        self._last: Dict[Any, tuple] = {}
+
+    def global_trace(self, frame, event, arg):
+        if event == 'call' and frame.f_code.co_filename == SCRIPT_FILENAME:
+            return self.local_trace
+        return None
+
+    def local_trace(self, frame, event, arg):
+        now = time.perf_counter()
+        last = self._last.get(frame)
+        if last is not None:
+            self.seconds[last[0]] += now - last[1]
+
+        if event == 'line':
+            self.hits[frame.f_lineno] += 1
+            self._last[frame] = (frame.f_lineno, now)
+        elif event == 'return':
+            self._last.pop(frame, None)
+        elif last is not None:
+            self._last[frame] = (last[0], now)
+        return self.local_trace
+
+    def record_history(self, seconds: float):
+        """把一次 get_history 的耗时记到调用它的脚本行"""
+        frame = sys._getframe(1)
+        while frame is not None and frame.f_code.co_filename != SCRIPT_FILENAME:
+            frame = frame.f_back
+        line = frame.f_lineno if frame is not None else 0
+        self.history_seconds[line] += seconds
+        self.history_calls[line] += 1
+
+
+class ScriptProfiler:
+    """脚本逐行性能分析器"""
+
+    def __init__(self, history_provider: Optional[Callable[..., List[dict]]] = None):
+        """
+        Args:
+            history_provider: 历史数据来源 (symbol, days) -> list，为空时直接查询数据库
+        """
+        if history_provider is None:
+            from app.services.stock_data_service import StockDataService
+            history_provider = StockDataService().get_history
+        self._history_provider = history_provider
+
+    def profile(self, script: str, symbols: List[str], data_source=None, token=None) -> Dict[str, Any]:
+        """
+        在给定股票上执行脚本并逐行计时
+
+        Args:
+            script: 脚本代码
+            symbols: 抽样的股票代码
+            data_source: 最新行情来源（StockDataService 或 UniversePanel），为空时查询数据库
+            token: 取消令牌
+
+        Returns:
+            Dict: results（各股票计算结果）和 profile（逐行统计）
+        """
+        from app.services.sandbox_executor import SandboxExecutor
+
+        if data_source is None:
+            from app.services.stock_data_service import StockDataService
+            data_source = StockDataService()
+
+        tracer = _LineTracer()
+
+        def timed_history(symbol: str, days: int, *interval) -> list:
+            # 加载数据期间暂停跟踪，避免数据库代码的跟踪开销计入 get_history
+            sys.settrace(None)
+            started = time.perf_counter()
+            try:
+                return self._history_provider(symbol, days, *interval)
+            finally:
+                tracer.record_history(time.perf_counter() - started)
+                sys.settrace(tracer.global_trace)
+
+        executor = SandboxExecutor(history_provider=timed_history)
+
+        load_started = time.perf_counter()
+        stock_rows = data_source.get_latest_stock_rows(symbols)
+        row_load_seconds = time.perf_counter() - load_started
+
+        results = []
+        script_seconds = 0.0
+        previous_trace = sys.gettrace()
+        for symbol in symbols:
+            if token is not None:
+                token.raise_if_cancelled()
+
+            stock_row = stock_rows.get(symbol)
+            if stock_row is None:
+                results.append({"symbol": symbol, "value": None, "error": "股票数据不存在"})
+                continue
+
+            started = time.perf_counter()
+            sys.settrace(tracer.global_trace)
+            try:
+                value, error = executor.execute(script, {"row": stock_row})
+            finally:
+                sys.settrace(previous_trace)
+            script_seconds += time.perf_counter() - started
+            results.append({"symbol": symbol, "value": value, "error": error})
+
+        history_seconds = sum(tracer.history_seconds.values())
+        logger.info(f"脚本性能分析完成: {len(symbols)} 只股票，脚本耗时 {script_seconds:.3f} 秒，"
+                    f"其中 get_history {history_seconds:.3f} 秒")
+
+        return {
+            "results": results,
+            "profile": {
+                "sample_size": len(symbols),
+                "executed": sum(1 for item in results if item['error'] != "股票数据不存在"),
+                "row_load_ms": round(row_load_seconds * 1000, 3),
+                "script_ms": round(script_seconds * 1000, 3),
+                "history_ms": round(history_seconds * 1000, 3),
+                "history_calls": sum(tracer.history_calls.values()),
+                "compute_ms": round(max(0.0, script_seconds - history_seconds) * 1000, 3),
+                "lines": self._line_report(script, tracer, script_seconds)
+            }
+        }
+
+    @staticmethod
+    def _line_report(script: str, tracer: _LineTracer, script_seconds: float) -> List[Dict[str, Any]]:
+        """按源码行汇总（只包含执行过的行）"""
+        source_lines = script.splitlines()
+        report = []
+        for line in sorted(set(tracer.hits) | set(tracer.history_calls)):
+            if line < 1 or line > len(source_lines):
+                continue
+            seconds = tracer.seconds.get(line, 0.0)
+            report.append({
+                "line": line,
+                "source": source_lines[line - 1],
+                "hits": tracer.hits.get(line, 0),
+                "time_ms": round(seconds * 1000, 3),
+                "percent": round(seconds / script_seconds * 100, 1) if script_seconds else 0.0,
+                "history_ms": round(tracer.history_seconds.get(line, 0.0) * 1000, 3),
+                "history_calls": tracer.history_calls.get(line, 0)
+            })
+        return report
@@ -21,54 +21,101 @@ class StockDataService:
                                symbol: str,
                                start_date: Optional[str] = None,
                                end_date: Optional[str] = None,
-                               limit: int = 100) -> Dict[str, Any]:
+                               limit: int = 100,
+                               after: Optional[str] = None,
+                               include_total: str = 'exact',
+                               columnar: bool = False,
+                               interval: str = '1d') -> Dict[str, Any]:
         """
         从TimescaleDB查询股票数据
         
+        只选取响应需要的列，数值列在SQL中转换为 float8、日期格式化为字符串，
+        由结果元组一次构建响应行，不经过ORM对象和逐行的 Decimal 转换。
+        
         Args:
             symbol: 股票代码
             start_date: 开始日期
             end_date: 结束日期
             limit: 数据条数限制
+            after: 游标分页：上一页最后一条的交易日期（YYYY-MM-DD），只返回更早的数据
+            include_total: 总数计算方式（exact 精确计数 / estimate 查询计划估算 / none 不计算）
+            columnar: 为True时 data 为列名 → 值列表（交易日期为 date），由SQL结果直接转置
+            interval: K线周期（1d 日线 / 1w 周线 / 1M 月线）；周线、月线读取 stock_period_bars，
+                      trade_date 为周期内最后一个交易日，日期范围和游标均按该日期
             
         Returns:
-            Dict: 查询结果
+            Dict: 查询结果（data 为行情字典列表，键见 STOCK_PRICE_COLUMNS；
+                  has_more 表示是否还有下一页，next_key 为下一页游标的排序键）
         """
         try:
             from database.connection import db_manager
-            from models.stock_data import StockDailyData
-            from sqlalchemy import desc
+            from sqlalchemy import text
+            from app.utils.pagination import TOTAL_EXACT, TOTAL_ESTIMATE, estimate_row_count
             
-            with db_manager.get_session() as session:
-                # 构建查询
-                query = session.query(StockDailyData).filter(
-                    StockDailyData.symbol == symbol
-                )
-                
-                # 添加日期范围过滤
-                if start_date:
-                    start_dt = datetime.strptime(start_date, '%Y-%m-%d').date()
-                    query = query.filter(StockDailyData.trade_date >= start_dt)
-                
-                if end_date:
-                    end_dt = datetime.strptime(end_date, '%Y-%m-%d').date()
-                    query = query.filter(StockDailyData.trade_date <= end_dt)
-                
-                # 按日期降序排列
-                query = query.order_by(desc(StockDailyData.trade_date))
-                
-                # 获取总记录数
-                total_count = query.count()
+            table, period = BAR_INTERVALS[interval]
+            conditions = ["symbol = :symbol"]
+            params: Dict[str, Any] = {'symbol': symbol}
+            if period:
+                conditions.append("period = :period")
+                params['period'] = period
+            
+            # 添加日期范围过滤
+            if start_date:
+                conditions.append("trade_date >= :start_date")
+                params['start_date'] = datetime.strptime(start_date, '%Y-%m-%d')
+            
+            if end_date:
+                conditions.append("trade_date <= :end_date")
+                params['end_date'] = datetime.strptime(end_date, '%Y-%m-%d')
+            
+            with db_manager.get_session(read_only=True) as session:
+                # 获取总记录数（不受游标影响）
+                total_count = None
+                if include_total == TOTAL_EXACT:
+                    total_count = session.execute(text(
+                        f"SELECT COUNT(*) FROM {table} WHERE {' AND '.join(conditions)}"
+                    ), params).scalar()
+                elif include_total == TOTAL_ESTIMATE:
+                    total_count = estimate_row_count(
+                        session, f"SELECT 1 FROM {table} WHERE {' AND '.join(conditions)}", params
+                    )
                 
-                # 限制返回数量
-                results = query.limit(limit).all()
+                # 游标分页：从上一页最后一条之后继续（按日期降序）
+                if after:
+                    conditions.append("trade_date < :after")
+                    params['after'] = datetime.strptime(after, '%Y-%m-%d')
                 
-                return {
-                    'success': True,
-                    'data': results,
-                    'total': total_count,
-                    'count': len(results)
-                }
+                # 按日期降序排列，多取一条判断是否还有下一页
+                query = text(f"""
+                SELECT {'trade_date::date' if columnar else "to_char(trade_date, 'YYYY-MM-DD')"},
+                       {STOCK_PRICE_SELECT}
+                FROM {table} sd
+                WHERE {' AND '.join(conditions)}
+                ORDER BY sd.trade_date DESC
+                LIMIT :limit
+                """)
+                rows = session.execute(query, {**params, 'limit': limit + 1}).fetchall()
+            
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            
+            if columnar:
+                values = list(zip(*rows)) if rows else [()] * len(STOCK_PRICE_COLUMNS)
+                data = {name: list(column) for name, column in zip(STOCK_PRICE_COLUMNS, values)}
+                next_key = rows[-1][0].strftime('%Y-%m-%d') if has_more else None
+            else:
+                data = [dict(zip(STOCK_PRICE_COLUMNS, row)) for row in rows]
+                next_key = rows[-1][0] if has_more else None
+            
+            return {
+                'success': True,
+                'data': data,
+                'total': total_count,
+                'total_estimated': include_total == TOTAL_ESTIMATE,
+                'count': len(rows),
+                'has_more': has_more,
+                'next_key': next_key
+            }
                 
         except Exception as e:
             logger.error(f"数据库查询错误: {e}")
@@ -80,6 +127,246 @@ class StockDataService:
                 'error': str(e)
             }
     
+    def get_latest_stock_row(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """
+        获取股票最新一条行情数据（脚本执行的 row 上下文）
+        
+        Args:
+            symbol: 股票代码
+            
+        Returns:
+            Optional[Dict]: 行情数据字典，不存在时返回None
+        """
+        try:
+            return self.get_latest_stock_rows([symbol]).get(symbol)
+        except Exception as e:
+            logger.error(f"获取股票数据失败: {symbol}, 错误: {e}")
+            return None
+    
+    def get_latest_stock_rows(self, symbols: List[str], batch_size: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取多只股票的最新一条行情数据
+        
+        每批股票一条SQL：对每只股票做一次 ORDER BY trade_date DESC LIMIT 1 的
+        索引探测（LATERAL），数值列在SQL中转换为 float8、日期格式化为字符串，
+        直接由结果元组构建 row 字典，不经过ORM对象。
+        
+        Args:
+            symbols: 股票代码列表
+            batch_size: 每批股票数，默认使用 latest_row_batch_size 配置
+            
+        Returns:
+            Dict[str, Dict]: 股票代码 → 行情数据字典（无行情的股票不包含在内）
+        """
+        from database.connection import db_manager
+        from sqlalchemy import text
+        from config.settings import execution_config
+        
+        batch_size = batch_size or execution_config.latest_row_batch_size
+        rows: Dict[str, Dict[str, Any]] = {}
+        if not symbols:
+            return rows
+        
+        query = text("""
+        SELECT s.symbol, lr.stock_name, to_char(lr.trade_date, 'YYYY-MM-DD'),
+               lr.open_price::float8, lr.high_price::float8, lr.low_price::float8,
+               lr.close_price::float8, lr.volume, lr.turnover::float8,
+               lr.price_change::float8, lr.price_change_pct::float8,
+               lr.premium_rate::float8, lr.market_code
+        FROM unnest(CAST(:symbols AS text[])) AS s(symbol)
+        CROSS JOIN LATERAL (
+            SELECT *
+            FROM stock_daily_data sd
+            WHERE sd.symbol = s.symbol
+            ORDER BY sd.trade_date DESC
+            LIMIT 1
+        ) lr
+        """)
+        
+        with db_manager.get_session(read_only=True) as session:
+            for start in range(0, len(symbols), batch_size):
+                batch = list(symbols[start:start + batch_size])
+                for (symbol, stock_name, trade_date, open_price, high_price, low_price,
+                     close_price, volume, turnover, price_change, price_change_pct,
+                     premium_rate, market_code) in session.execute(query, {'symbols': batch}):
+                    rows[symbol] = {
+                        "symbol": symbol,
+                        "stock_name": stock_name,
+                        "trade_date": trade_date,
+                        "open_price": open_price,
+                        "high_price": high_price,
+                        "low_price": low_price,
+                        "close_price": close_price,
+                        "volume": volume,
+                        "turnover": turnover,
+                        "price_change": price_change,
+                        "price_change_pct": price_change_pct,
+                        "premium_rate": premium_rate,
+                        "market_code": market_code
+                    }
+        
+        return rows
+    
+    def get_history(self, symbol: str, days: int, interval: str = '1d') -> List[Dict[str, Any]]:
+        """
+        获取股票最近 days 个交易日的历史数据（按日期降序）
+        
+        Args:
+            symbol: 股票代码
+            days: 交易天数（周线、月线时为K线根数）
+            interval: K线周期（1d 日线 / 1w 周线 / 1M 月线）
+            
+        Returns:
+            List[Dict]: 每个元素包含 close_price, trade_date, volume, price_change_pct
+        """
+        from database.connection import db_manager
+        from sqlalchemy import text
+        
+        table, period = BAR_INTERVALS[interval]
+        query = text(f"""
+        SELECT {HISTORY_SELECT}
+        FROM {table} sd
+        WHERE symbol = :symbol {'AND period = :period' if period else ''}
+        ORDER BY sd.trade_date DESC
+        LIMIT :days
+        """)
+        
+        with db_manager.get_session(read_only=True) as session:
+            rows = session.execute(query, {'symbol': symbol, 'period': period, 'days': days}).fetchall()
+        
+        return [dict(zip(HISTORY_COLUMNS, row)) for row in rows]
+    
+    def get_history_panel(self, symbols: List[str], days: int) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        批量获取多只股票最近 days 个交易日的历史数据
+        
+        一条语句完成：对每只股票做一次带 LIMIT 的索引探测（LATERAL），
+        代替逐只股票的查询往返。
+        
+        Args:
+            symbols: 股票代码列表
+            days: 交易天数
+            
+        Returns:
+            Dict[str, List[Dict]]: 股票代码 → 历史数据（按日期降序）
+        """
+        from database.connection import db_manager
+        from sqlalchemy import text
+        
+        panel: Dict[str, List[Dict[str, Any]]] = {symbol: [] for symbol in symbols}
+        if not symbols:
+            return panel
+        
+        query = text(f"""
+        SELECT s.symbol, h.*
+        FROM unnest(CAST(:symbols AS text[])) AS s(symbol)
+        CROSS JOIN LATERAL (
+            SELECT {HISTORY_SELECT}
+            FROM stock_daily_data sd
+            WHERE sd.symbol = s.symbol
+            ORDER BY sd.trade_date DESC
+            LIMIT :days
+        ) h
+        """)
+        
+        with db_manager.get_session(read_only=True) as session:
+            rows = session.execute(query, {'symbols': list(symbols), 'days': days}).fetchall()
+        
+        for symbol, *values in rows:
+            panel[symbol].append(dict(zip(HISTORY_COLUMNS, values)))
+        
+        return panel
+    
+    def get_batch_history(self,
+                          symbols: List[str],
+                          fields: List[str],
+                          start_date: Optional[str] = None,
+                          end_date: Optional[str] = None,
+                          max_rows: Optional[int] = None,
+                          with_seed: bool = False) -> Dict[str, Any]:
+        """
+        批量获取多只股票在日期范围内的行情（/query-batch 面板的数据来源）
+        
+        一条集合查询（symbol = ANY + 日期范围），按交易日期升序返回元组，
+        不经过ORM对象和逐行字典。
+        
+        Args:
+            symbols: 股票代码列表
+            fields: 字段列表（见 batch_panel.PANEL_FIELDS）
+            start_date: 开始日期（YYYY-MM-DD）
+            end_date: 结束日期（YYYY-MM-DD）
+            max_rows: 最多返回的行数，超出时 truncated 为 True
+            with_seed: 是否同时获取开始日期之前每只股票最近一行（前向填充的初始值）
+            
+        Returns:
+            Dict: rows 为 (symbol, trade_date, 字段值...) 元组列表，seed_rows 格式相同
+        """
+        from database.connection import db_manager
+        from sqlalchemy import text
+        from app.services.batch_panel import PANEL_FIELDS
+        
+        columns = ', '.join(f"{PANEL_FIELDS[field]} AS {field}" for field in fields)
+        conditions = ["symbol = ANY(:symbols)"]
+        params: Dict[str, Any] = {'symbols': list(symbols)}
+        if start_date:
+            conditions.append("trade_date >= :start_date")
+            params['start_date'] = datetime.strptime(start_date, '%Y-%m-%d')
+        if end_date:
+            conditions.append("trade_date <= :end_date")
+            params['end_date'] = datetime.strptime(end_date, '%Y-%m-%d')
+        
+        query = f"""
+        SELECT symbol, to_char(trade_date, 'YYYY-MM-DD'), {columns}
+        FROM stock_daily_data
+        WHERE {' AND '.join(conditions)}
+        ORDER BY trade_date, symbol
+        """
+        if max_rows:
+            query += " LIMIT :limit"
+            params['limit'] = max_rows + 1
+        
+        with db_manager.get_session(read_only=True) as session:
+            rows = [tuple(row) for row in session.execute(text(query), params)]
+            
+            seed_rows = []
+            if with_seed and start_date:
+                # 每只股票一次索引探测：开始日期之前最近一行
+                seed_query = text(f"""
+                SELECT s.symbol, to_char(h.trade_date, 'YYYY-MM-DD'), {', '.join(f'h.{field}' for field in fields)}
+                FROM unnest(CAST(:symbols AS text[])) AS s(symbol)
+                CROSS JOIN LATERAL (
+                    SELECT trade_date, {columns}
+                    FROM stock_daily_data sd
+                    WHERE sd.symbol = s.symbol AND sd.trade_date < :start_date
+                    ORDER BY sd.trade_date DESC
+                    LIMIT 1
+                ) h
+                """)
+                seed_rows = [tuple(row) for row in session.execute(
+                    seed_query, {'symbols': params['symbols'], 'start_date': params['start_date']}
+                )]
+        
+        truncated = bool(max_rows) and len(rows) > max_rows
+        return {
+            'rows': rows[:max_rows] if truncated else rows,
+            'seed_rows': seed_rows,
+            'truncated': truncated
+        }
+    
+    def get_latest_trade_date(self) -> Optional[str]:
+        """获取全市场最新交易日期（用于判断行情数据是否更新）"""
+        try:
+            from database.connection import db_manager
+            from sqlalchemy import text
+            
+            with db_manager.get_session(read_only=True) as session:
+                latest = session.execute(text("SELECT MAX(trade_date) FROM stock_daily_data")).scalar()
+                return latest.strftime('%Y-%m-%d') if latest else None
+                
+        except Exception as e:
+            logger.error(f"获取最新交易日期失败: {e}")
+            return None
+    
     def get_stock_info_from_db(self, symbol: str) -> Dict[str, Any]:
         """
         从数据库获取股票基础信息
@@ -94,7 +381,7 @@ class StockDataService:
             from database.connection import db_manager
             from models.stock_data import StockInfo
             
-            with db_manager.get_session() as session:
+            with db_manager.get_session(read_only=True) as session:
                 stock_info = session.query(StockInfo).filter(
                     StockInfo.symbol == symbol
                 ).first()
@@ -150,7 +437,7 @@ class StockDataService:
             from database.connection import db_manager
             from models.stock_data import StockInfo
             
-            with db_manager.get_session() as session:
+            with db_manager.get_session(read_only=True) as session:
                 query = session.query(StockInfo)
                 
                 if market_code:
@@ -196,11 +483,15 @@ class StockDataService:
                                       is_active: str = 'Y',
                                       is_etf: Optional[bool] = None,
                                       limit: int = 100,
-                                      offset: int = 0) -> Dict[str, Any]:
+                                      offset: int = 0,
+                                      symbols: Optional[List[str]] = None,
+                                      after: Optional[str] = None,
+                                      include_total: str = 'exact') -> Dict[str, Any]:
         """
         从数据库列出所有股票，包含最新的价格信息
         
-        使用 LATERAL JOIN 高效查询每只股票的最新价格、涨跌幅和成交量。
+        关联 stock_latest_bar（由触发器维护的每只股票最新一条行情）获取最新价格、涨跌幅和成交量，
+        不再对 stock_daily_data 逐股票探测。
         
         Args:
             market_code: 单个市场代码过滤（SH/SZ/BJ）- 保留向后兼容
@@ -209,16 +500,19 @@ class StockDataService:
             is_etf: ETF筛选（True-仅ETF, False-仅股票, None-全部）
             limit: 返回数量限制
             offset: 分页偏移量
+            symbols: 限定股票代码列表（股票范围成员），为空时不限定
+            after: 游标分页：上一页最后一只股票的代码，只返回排在其后的股票（按索引定位，不扫描前面的行）
+            include_total: 总数计算方式（exact 精确计数 / estimate 查询计划估算 / none 不计算）
             
         Returns:
-            Dict: 包含股票列表和最新价格数据
+            Dict: 包含股票列表和最新价格数据（has_more 表示是否还有下一页）
         """
         try:
             from database.connection import db_manager
             from sqlalchemy import text
             
-            with db_manager.get_session() as session:
-                # 构建 LATERAL JOIN 查询
+            with db_manager.get_session(read_only=True) as session:
+                # 构建查询（关联最新行情表）
                 query = """
                 SELECT 
                     si.symbol,
@@ -232,23 +526,13 @@ class StockDataService:
                     lp.price_change_pct,
                     lp.trade_date as latest_trade_date
                 FROM stock_info si
-                LEFT JOIN LATERAL (
-                    SELECT 
-                        close_price, 
-                        volume, 
-                        price_change_pct,
-                        trade_date
-                    FROM stock_daily_data sd
-                    WHERE sd.symbol = si.symbol
-                    ORDER BY sd.trade_date DESC
-                    LIMIT 1
-                ) lp ON true
+                LEFT JOIN stock_latest_bar lp ON lp.symbol = si.symbol
                 WHERE si.is_active = :is_active
                 """
                 
                 params = {
                     'is_active': is_active,
-                    'limit': limit,
+                    'limit': limit + 1,  # 多取一条判断是否还有下一页
                     'offset': offset
                 }
                 
@@ -269,30 +553,35 @@ class StockDataService:
                     else:
                         query += " AND si.is_etf = 'N'"
                 
+                # 限定股票范围成员
+                if symbols is not None:
+                    query += " AND si.symbol = ANY(:symbols)"
+                    params['symbols'] = list(symbols)
+                
+                # 游标分页：从上一页最后一只股票之后继续
+                page_query = query
+                if after:
+                    page_query += " AND si.symbol > :after"
+                    params['after'] = after
+                
                 # 添加排序和分页
-                query += " ORDER BY si.symbol LIMIT :limit OFFSET :offset"
+                page_query += " ORDER BY si.symbol LIMIT :limit OFFSET :offset"
                 
                 # 执行查询
-                result = session.execute(text(query), params)
+                result = session.execute(text(page_query), params)
                 rows = result.fetchall()
+                has_more = len(rows) > limit
                 
                 # 格式化结果
-                stock_list = []
-                for row in rows:
-                    stock_list.append({
-                        'symbol': row.symbol,
-                        'stock_name': row.stock_name,
-                        'market_code': row.market_code,
-                        'is_active': row.is_active,
-                        'is_etf': row.is_etf == 'Y',  # Convert CHAR to boolean
-                        'last_sync_date': row.last_sync_date.isoformat() if row.last_sync_date else None,
-                        'close_price': float(row.close_price) if row.close_price is not None else None,
-                        'price_change_pct': float(row.price_change_pct) if row.price_change_pct is not None else None,
-                        'volume': int(row.volume) if row.volume is not None else None,
-                        'latest_trade_date': row.latest_trade_date.strftime('%Y-%m-%d') if row.latest_trade_date else None
-                    })
+                stock_list = [_format_listing_row(row) for row in rows[:limit]]
+                
+                # 获取总数（用于分页，默认由调用方决定是否计算）
+                from app.utils.pagination import TOTAL_EXACT, TOTAL_ESTIMATE, estimate_row_count
+                total_count = None
+                if include_total == TOTAL_ESTIMATE:
+                    estimate_params = {k: v for k, v in params.items() if k not in ('limit', 'offset', 'after')}
+                    total_count = estimate_row_count(session, query, estimate_params)
                 
-                # 获取总数（用于分页）
                 count_query = """
                 SELECT COUNT(*) 
                 FROM stock_info si
@@ -315,13 +604,21 @@ class StockDataService:
                     else:
                         count_query += " AND si.is_etf = 'N'"
                 
-                total_count = session.execute(text(count_query), count_params).scalar()
+                if symbols is not None:
+                    count_query += " AND si.symbol = ANY(:symbols)"
+                    count_params['symbols'] = list(symbols)
+                
+                if include_total == TOTAL_EXACT:
+                    total_count = session.execute(text(count_query), count_params).scalar()
                 
                 return {
                     'success': True,
                     'data': stock_list,
                     'total': total_count,
-                    'count': len(stock_list)
+                    'total_estimated': include_total == TOTAL_ESTIMATE,
+                    'count': len(stock_list),
+                    'has_more': has_more,
+                    'next_key': stock_list[-1]['symbol'] if has_more else None
                 }
                 
         except Exception as e:
@@ -334,12 +631,60 @@ class StockDataService:
                 'error': str(e)
             }
     
-    def get_all_active_stocks(self, market_code: Optional[str] = None) -> List[str]:
+    def get_listing_rows(self) -> List[Dict[str, Any]]:
+        """
+        获取全部股票（不限是否活跃）及其最新价格，按代码排序
+        
+        用于构建 /list 的进程内快照，格式与 list_stocks_with_latest_price 的 data 相同。
+        """
+        from database.connection import db_manager
+        from sqlalchemy import text
+        
+        with db_manager.get_session(read_only=True) as session:
+            rows = session.execute(text("""
+                SELECT 
+                    si.symbol,
+                    si.stock_name,
+                    si.market_code,
+                    si.is_active,
+                    si.is_etf,
+                    si.last_sync_date,
+                    lp.close_price,
+                    lp.volume,
+                    lp.price_change_pct,
+                    lp.trade_date as latest_trade_date
+                FROM stock_info si
+                LEFT JOIN stock_latest_bar lp ON lp.symbol = si.symbol
+                ORDER BY si.symbol
+            """)).fetchall()
+            return [_format_listing_row(row) for row in rows]
+    
+    def get_listing_version(self) -> str:
+        """
+        股票列表的数据版本：stock_info 行数和最近更新时间 + 全市场最新交易日期
+        
+        任一变化都说明 /list 的结果可能变化（新增/修改股票，或同步了新交易日的行情）。
+        """
+        from database.connection import db_manager
+        from sqlalchemy import text
+        
+        with db_manager.get_session(read_only=True) as session:
+            count, last_updated, latest_trade_date = session.execute(text("""
+                SELECT
+                    (SELECT COUNT(*) FROM stock_info),
+                    (SELECT MAX(updated_at) FROM stock_info),
+                    (SELECT MAX(trade_date) FROM stock_daily_data)
+            """)).fetchone()
+            return (f"{count}:{last_updated.isoformat() if last_updated else ''}:"
+                    f"{latest_trade_date.strftime('%Y-%m-%d') if latest_trade_date else ''}")
+    
+    def get_all_active_stocks(self, market_code: Optional[str] = None, prefilter=None) -> List[str]:
         """
         获取所有活跃股票代码
         
         Args:
             market_code: 市场代码过滤（可选，SH/SZ/BJ）
+            prefilter: 股票范围筛选条件（UniverseFilter，可选），在SQL中完成筛选
             
         Returns:
             List[str]: 股票代码列表
@@ -348,7 +693,10 @@ class StockDataService:
             from database.connection import db_manager
             from models.stock_data import StockInfo
             
-            with db_manager.get_session() as session:
+            if prefilter is not None:
+                return self._get_filtered_active_stocks(market_code, prefilter)
+            
+            with db_manager.get_session(read_only=True) as session:
                 query = session.query(StockInfo.symbol).filter(
                     StockInfo.is_active == 'Y'
                 )
@@ -356,10 +704,127 @@ class StockDataService:
                 if market_code:
                     query = query.filter(StockInfo.market_code == market_code)
                 
-                results = query.all()
+                # 固定顺序，保证续传令牌的位置在多次请求间一致
+                results = query.order_by(StockInfo.symbol).all()
                 return [row.symbol for row in results]
                 
         except Exception as e:
             logger.error(f"获取所有活跃股票失败: {e}")
             return []
+    
+    def _get_filtered_active_stocks(self, market_code: Optional[str], prefilter) -> List[str]:
+        """按筛选条件获取活跃股票代码（只读会话）"""
+        from database.connection import db_manager
+        
+        with db_manager.get_session(read_only=True) as session:
+            return self.get_filtered_active_stocks(session, prefilter, market_code)
+    
+    def get_filtered_active_stocks(self, session, prefilter, market_code: Optional[str] = None) -> List[str]:
+        """
+        在给定会话中按筛选条件获取活跃股票代码（成交量/收盘价条件关联最新一条行情）
+        
+        与 get_all_active_stocks 不同，查询失败时异常向上抛出，不返回空列表。
+        
+        Args:
+            session: 数据库会话（需要与其他读取保持一致时传入主库会话）
+            prefilter: 股票范围筛选条件（UniverseFilter），为None时返回全部活跃股票
+            market_code: 市场代码过滤（可选）
+            
+        Returns:
+            List[str]: 股票代码列表
+        """
+        from sqlalchemy import text
+        
+        conditions, params = prefilter.to_sql('si', 'lp') if prefilter is not None else ([], {})
+        conditions.insert(0, "si.is_active = 'Y'")
+        if market_code:
+            conditions.append("si.market_code = :market_code")
+            params['market_code'] = market_code
+        
+        # 仅在需要行情条件时关联最新一条行情（无行情数据的股票被排除）
+        latest_join = ""
+        if prefilter is not None and prefilter.needs_latest_price:
+            latest_join = "JOIN stock_latest_bar lp ON lp.symbol = si.symbol"
+        
+        query = f"""
+        SELECT si.symbol
+        FROM stock_info si
+        {latest_join}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY si.symbol
+        """
+        
+        rows = session.execute(text(query), params).fetchall()
+        return [row.symbol for row in rows]
+
+
+# K线周期 → (数据表, stock_period_bars.period)
+BAR_INTERVALS = {
+    '1d': ('stock_daily_data', None),
+    '1w': ('stock_period_bars', '1w'),
+    '1M': ('stock_period_bars', '1M')
+}
+
+
+def parse_interval(value: Optional[str]) -> str:
+    """
+    解析K线周期参数（默认日线）
+    
+    Raises:
+        ValueError: 不支持的周期
+    """
+    if not value:
+        return '1d'
+    if value not in BAR_INTERVALS:
+        raise ValueError(f"不支持的K线周期: {value}（支持 {' / '.join(BAR_INTERVALS)}）")
+    return value
+
+
+# 行情查询（/query）的列及列式响应的类型
+STOCK_PRICE_COLUMNS = (
+    'trade_date', 'symbol', 'stock_name', 'open_price', 'high_price', 'low_price', 'close_price',
+    'volume', 'turnover', 'price_change', 'price_change_pct', 'premium_rate', 'market_code'
+)
+# trade_date 之后各列的SQL投影（数值列转换为 float8）
+STOCK_PRICE_SELECT = """symbol, stock_name,
+       open_price::float8, high_price::float8, low_price::float8, close_price::float8,
+       volume, turnover::float8, price_change::float8, price_change_pct::float8,
+       premium_rate::float8, market_code"""
+STOCK_PRICE_COLUMN_TYPES = {
+    'trade_date': 'date32', 'symbol': 'string', 'stock_name': 'string',
+    'open_price': 'float64', 'high_price': 'float64', 'low_price': 'float64', 'close_price': 'float64',
+    'volume': 'int64', 'turnover': 'float64', 'price_change': 'float64', 'price_change_pct': 'float64',
+    'premium_rate': 'float64', 'market_code': 'string'
+}
+
+# 股票列表（/list）列式响应的类型
+LISTING_COLUMN_TYPES = {
+    'symbol': 'string', 'stock_name': 'string', 'market_code': 'string', 'is_active': 'string',
+    'is_etf': 'bool_', 'last_sync_date': 'string', 'close_price': 'float64',
+    'price_change_pct': 'float64', 'volume': 'int64', 'latest_trade_date': 'string'
+}
+
+
+# 历史数据行（get_history 的返回格式）的键及对应的SQL投影：
+# 收盘价、涨跌幅为 0 或空时为 None，成交量为空时为 0
+HISTORY_COLUMNS = ('close_price', 'trade_date', 'volume', 'price_change_pct')
+HISTORY_SELECT = """NULLIF(close_price, 0)::float8 AS close_price,
+               to_char(trade_date, 'YYYY-MM-DD') AS trade_date,
+               COALESCE(volume, 0) AS volume,
+               NULLIF(price_change_pct, 0)::float8 AS price_change_pct"""
+
 
+def _format_listing_row(row) -> Dict[str, Any]:
+    """格式化股票列表行（/list 的返回格式）"""
+    return {
+        'symbol': row.symbol,
+        'stock_name': row.stock_name,
+        'market_code': row.market_code,
+        'is_active': row.is_active,
+        'is_etf': row.is_etf == 'Y',  # Convert CHAR to boolean
+        'last_sync_date': row.last_sync_date.isoformat() if row.last_sync_date else None,
+        'close_price': float(row.close_price) if row.close_price is not None else None,
+        'price_change_pct': float(row.price_change_pct) if row.price_change_pct is not None else None,
+        'volume': int(row.volume) if row.volume is not None else None,
+        'latest_trade_date': row.latest_trade_date.strftime('%Y-%m-%d') if row.latest_trade_date else None
+    }
@@ -0,0 +1,177 @@
+"""
+股票范围面板缓存模块
+
+按股票范围缓存成员的最新行情（latest-row 面板）和历史数据（history 面板）。
+同一股票范围的重复请求（如自选股每次刷新）直接命中缓存，
+不再逐只股票查询最新行情和历史数据。
+
+缓存键包含成员版本和最新交易日期：成员变化或行情更新后自动失效；
+另设有效期，覆盖同一交易日内行情被修订的情况。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from config.settings import universe_config
+from app.utils.metrics import observe_cache
+
+logger = logging.getLogger(__name__)
+
+
+class UniversePanel:
+    """单个股票范围的行情面板（按需加载）"""
+
+    def __init__(self, universe_id: int, members: List[str], data_service=None):
+        if data_service is None:
+            from app.services.stock_data_service import StockDataService
+            data_service = StockDataService()
+
+        self.universe_id = universe_id
+        self.members = list(members)
+        self._member_set = set(self.members)
+        self._data_service = data_service
+        self._lock = threading.Lock()
+        self._latest_rows: Optional[Dict[str, Dict[str, Any]]] = None
+        self._history: Dict[str, List[Dict[str, Any]]] = {}
+        self._history_days = 0
+        self._history_failed_days: Optional[int] = None
+        self.created_at = time.monotonic()
+
+    def get_latest_stock_rows(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取最新行情行（首次调用时一次性加载全部成员）
+
+        返回副本，脚本修改 row 不影响缓存。非成员股票直接查询数据库。
+        """
+        with self._lock:
+            if self._latest_rows is None:
+                self._latest_rows = self._data_service.get_latest_stock_rows(self.members)
+
+        rows = {symbol: dict(self._latest_rows[symbol])
+                for symbol in symbols if symbol in self._latest_rows}
+
+        others = [symbol for symbol in symbols if symbol not in self._member_set]
+        if others:
+            rows.update(self._data_service.get_latest_stock_rows(others))
+
+        return rows
+
+    def get_latest_stock_row(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """获取单只股票最新行情行"""
+        return self.get_latest_stock_rows([symbol]).get(symbol)
+
+    def get_history(self, symbol: str, days: int, interval: str = '1d') -> List[Dict[str, Any]]:
+        """
+        获取股票最近 days 个交易日的历史数据（SandboxExecutor 的 history_provider）
+
+        已加载的天数不足时，一次性为全部成员重新加载 days 天数据（使用面板自己的语句超时，
+        不受脚本单次 get_history 超时限制）。批量加载失败后记住失败的天数，不再为每只股票重试，
+        超过已加载天数的请求逐只股票查询。非成员股票和周线、月线直接查询数据库。
+        """
+        if interval != '1d':
+            return self._data_service.get_history(symbol, days, interval)
+        if symbol not in self._member_set:
+            return self._data_service.get_history(symbol, days)
+
+        with self._lock:
+            if days > self._history_days and (self._history_failed_days is None or days < self._history_failed_days):
+                self._load_history(days)
+            history = self._history.get(symbol, []) if days <= self._history_days else None
+
+        if history is None:
+            return self._data_service.get_history(symbol, days)
+        return [dict(row) for row in history[:days]]
+
+    def _load_history(self, days: int):
+        """为全部成员加载 days 天历史数据（调用方持有锁）"""
+        from database.connection import db_manager
+        from app.utils.query_timeout import timeout_for
+
+        try:
+            with db_manager.statement_timeout(timeout_for('universe_panel')):
+                self._history = self._data_service.get_history_panel(self.members, days)
+            self._history_days = days
+        except Exception as e:
+            self._history_failed_days = days
+            logger.warning(f"股票范围面板加载历史数据失败，改为逐只股票查询: "
+                           f"universe_id={self.universe_id}, days={days}, 错误: {e}")
+
+
+class UniversePanelCache:
+    """股票范围面板缓存（进程内LRU）"""
+
+    def __init__(self, config=None):
+        self.config = config or universe_config
+        self._panels: 'OrderedDict[Tuple[int, str, str], UniversePanel]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, universe_id: int, members_version: str, members: List[str],
+            data_version: Optional[str] = None) -> Optional[UniversePanel]:
+        """
+        获取股票范围面板，未命中时创建
+
+        Args:
+            universe_id: 股票范围ID
+            members_version: 成员版本
+            members: 成员股票列表
+            data_version: 行情版本（最新交易日期），为空时自动查询
+
+        Returns:
+            Optional[UniversePanel]: 成员过多（超过 universe_panel_max_symbols）时返回None
+        """
+        if len(members) > self.config.universe_panel_max_symbols:
+            return None
+
+        if data_version is None:
+            from app.services.stock_data_service import StockDataService
+            data_version = StockDataService().get_latest_trade_date() or ''
+
+        key = (universe_id, members_version, data_version)
+        now = time.monotonic()
+
+        with self._lock:
+            panel = self._panels.get(key)
+            if panel is not None and now - panel.created_at < self.config.universe_panel_ttl_seconds:
+                self._panels.move_to_end(key)
+                self.hits += 1
+                observe_cache('universe_panel', True)
+                return panel
+
+            # 同一股票范围的旧版本面板不再使用
+            for stale_key in [k for k in self._panels if k[0] == universe_id]:
+                del self._panels[stale_key]
+
+            panel = UniversePanel(universe_id, members)
+            self._panels[key] = panel
+            self.misses += 1
+            observe_cache('universe_panel', False)
+
+            while len(self._panels) > self.config.universe_panel_cache_size:
+                self._panels.popitem(last=False)
+
+        logger.info(f"创建股票范围面板: universe_id={universe_id}, 成员数={len(members)}")
+        return panel
+
+    def invalidate(self, universe_id: int):
+        """使股票范围的面板失效（范围被修改或删除）"""
+        with self._lock:
+            for key in [k for k in self._panels if k[0] == universe_id]:
+                del self._panels[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                'panels': len(self._panels),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# 全局面板缓存实例
+universe_panel_cache = UniversePanelCache()
@@ -0,0 +1,125 @@
+"""
+股票范围筛选条件模块
+
+声明式描述"哪些股票参与计算"，并下推为SQL条件，
+使脚本只在筛选后的股票上执行（如剔除低成交量、低价股）
+"""
+
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+VALID_MARKET_CODES = {'SH', 'SZ', 'BJ'}
+
+
+@dataclass
+class UniverseFilter:
+    """股票范围筛选条件"""
+    market_codes: Optional[List[str]] = None
+    is_etf: Optional[bool] = None
+    industries: Optional[List[str]] = None
+    min_volume: Optional[int] = None
+    min_close: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional['UniverseFilter']:
+        """
+        从请求参数解析筛选条件
+
+        Args:
+            data: 形如 {"min_volume": 100000, "market_codes": ["SH"], "is_etf": false, "industry": "银行"}
+
+        Returns:
+            Optional[UniverseFilter]: 未提供条件时返回None
+
+        Raises:
+            ValueError: 参数格式错误
+        """
+        if not data:
+            return None
+        if not isinstance(data, dict):
+            raise ValueError("prefilter必须是对象")
+
+        unknown = set(data) - {'market_codes', 'is_etf', 'industry', 'min_volume', 'min_close'}
+        if unknown:
+            raise ValueError(f"prefilter不支持的字段: {', '.join(sorted(unknown))}")
+
+        market_codes = data.get('market_codes')
+        if market_codes is not None:
+            if isinstance(market_codes, str):
+                market_codes = market_codes.split(',')
+            market_codes = [str(code).strip().upper() for code in market_codes]
+            invalid_codes = [code for code in market_codes if code not in VALID_MARKET_CODES]
+            if invalid_codes:
+                raise ValueError(f"无效的市场代码: {', '.join(invalid_codes)}")
+
+        is_etf = data.get('is_etf')
+        if is_etf is not None and not isinstance(is_etf, bool):
+            raise ValueError("prefilter.is_etf必须是布尔值")
+
+        industries = data.get('industry')
+        if industries is not None:
+            industries = [industries] if isinstance(industries, str) else [str(i) for i in industries]
+
+        min_volume = data.get('min_volume')
+        if min_volume is not None:
+            if isinstance(min_volume, bool) or not isinstance(min_volume, (int, float)) or min_volume < 0:
+                raise ValueError("prefilter.min_volume必须是非负数")
+            min_volume = int(min_volume)
+
+        min_close = data.get('min_close')
+        if min_close is not None:
+            if isinstance(min_close, bool) or not isinstance(min_close, (int, float)) or min_close < 0:
+                raise ValueError("prefilter.min_close必须是非负数")
+            min_close = float(min_close)
+
+        return cls(
+            market_codes=market_codes or None,
+            is_etf=is_etf,
+            industries=industries or None,
+            min_volume=min_volume,
+            min_close=min_close
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（与 from_dict 的请求格式一致，用于任务参数、请求指纹和保存的规则）"""
+        data = {key: value for key, value in asdict(self).items() if value is not None}
+        if 'industries' in data:
+            data['industry'] = data.pop('industries')
+        return data
+
+    @property
+    def needs_latest_price(self) -> bool:
+        """是否需要关联最新行情（成交量/收盘价条件）"""
+        return self.min_volume is not None or self.min_close is not None
+
+    def to_sql(self, info_alias: str = 'si', price_alias: str = 'lp') -> Tuple[List[str], Dict[str, Any]]:
+        """
+        生成SQL条件
+
+        Args:
+            info_alias: stock_info 表别名
+            price_alias: 最新行情子查询别名
+
+        Returns:
+            Tuple[条件列表, 绑定参数]
+        """
+        conditions = []
+        params: Dict[str, Any] = {}
+
+        if self.market_codes:
+            conditions.append(f"{info_alias}.market_code = ANY(:pf_market_codes)")
+            params['pf_market_codes'] = self.market_codes
+        if self.is_etf is not None:
+            conditions.append(f"{info_alias}.is_etf = :pf_is_etf")
+            params['pf_is_etf'] = 'Y' if self.is_etf else 'N'
+        if self.industries:
+            conditions.append(f"{info_alias}.industry = ANY(:pf_industries)")
+            params['pf_industries'] = self.industries
+        if self.min_volume is not None:
+            conditions.append(f"{price_alias}.volume >= :pf_min_volume")
+            params['pf_min_volume'] = self.min_volume
+        if self.min_close is not None:
+            conditions.append(f"{price_alias}.close_price >= :pf_min_close")
+            params['pf_min_close'] = self.min_close
+
+        return conditions, params
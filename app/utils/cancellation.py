@@ -0,0 +1,198 @@
+"""
+请求取消工具模块
+
+客户端断开连接（如关闭仪表盘页面）后，长时间的脚本计算应立即停止：
+- 看门狗线程定期探测客户端socket，检测到断开后将取消令牌置位
+- 股票循环在每只股票前检查令牌，跳过剩余的沙箱执行任务
+- 通过 SQLAlchemy 事件登记当前线程正在执行的SQL，取消时调用
+  psycopg2 的 connection.cancel() 中断数据库端语句，及时归还连接
+
+令牌还可携带请求截止时间（deadline_ms）：到期后循环停止执行剩余股票，
+由调用方返回已完成部分的结果，不会中断正在计算的股票。
+"""
+
+import select
+import socket
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Set
+
+from config.settings import execution_config
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class RequestCancelled(Exception):
+    """请求已被取消（客户端断开连接）"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancellationToken:
+    """取消令牌 - 在请求处理线程与看门狗线程之间共享"""
+
+    def __init__(self, deadline_ms: Optional[int] = None):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._connections: Set[Any] = set()
+        self.reason: Optional[str] = None
+        self.deadline = time.monotonic() + deadline_ms / 1000.0 if deadline_ms else None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def expired(self) -> bool:
+        """是否已超过请求截止时间"""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def cancel(self, reason: str):
+        """取消请求，并中断正在执行的数据库语句"""
+        if self._event.is_set():
+            return
+        self.reason = reason
+        self._event.set()
+        logger.warning(f"请求已取消: {reason}")
+
+        with self._lock:
+            connections = list(self._connections)
+        for dbapi_connection in connections:
+            try:
+                dbapi_connection.cancel()
+            except Exception as e:
+                logger.warning(f"取消数据库语句失败: {e}")
+
+    def raise_if_cancelled(self):
+        """已取消时抛出 RequestCancelled"""
+        if self._event.is_set():
+            raise RequestCancelled(self.reason)
+
+    def register_connection(self, dbapi_connection):
+        with self._lock:
+            self._connections.add(dbapi_connection)
+
+    def unregister_connection(self, dbapi_connection):
+        with self._lock:
+            self._connections.discard(dbapi_connection)
+
+
+def current_token() -> Optional[CancellationToken]:
+    """获取当前线程的取消令牌"""
+    return getattr(_local, 'token', None)
+
+
+def get_client_socket(environ: dict) -> Optional[socket.socket]:
+    """从 WSGI environ 中获取客户端socket（gunicorn / werkzeug 开发服务器）"""
+    return environ.get('gunicorn.socket') or environ.get('werkzeug.socket')
+
+
+def client_disconnected(sock: Optional[socket.socket]) -> bool:
+    """
+    探测客户端是否已断开连接
+
+    请求体已读完后，socket 可读且 peek 到 EOF 即表示对端已关闭。
+    """
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b''
+    except (BlockingIOError, InterruptedError):
+        return False
+    except (ConnectionError, OSError):
+        return True
+    except ValueError:
+        # SSL socket 不支持 MSG_PEEK 等标志，无法探测
+        return False
+
+
+@contextmanager
+def cancellation_scope(environ: Optional[dict] = None,
+                       deadline_ms: Optional[int] = None) -> Iterator[CancellationToken]:
+    """
+    取消作用域：在作用域内启动看门狗线程监控客户端连接
+
+    Args:
+        environ: WSGI environ（Flask 中为 request.environ），为空时只提供令牌
+        deadline_ms: 请求截止时间（毫秒），为空表示不限制
+    """
+    token = CancellationToken(deadline_ms)
+    previous = current_token()
+    _local.token = token
+
+    sock = get_client_socket(environ) if environ else None
+    stop_event = threading.Event()
+    watchdog = None
+
+    if sock is not None:
+        watchdog = threading.Thread(
+            target=_watch_client,
+            args=(sock, token, stop_event),
+            name='disconnect-watchdog',
+            daemon=True
+        )
+        watchdog.start()
+
+    try:
+        yield token
+    finally:
+        stop_event.set()
+        if watchdog is not None:
+            watchdog.join()
+        _local.token = previous
+
+
+def _watch_client(sock: socket.socket, token: CancellationToken, stop_event: threading.Event):
+    """看门狗：定期探测客户端连接状态"""
+    interval = execution_config.disconnect_check_interval_seconds
+    while not stop_event.wait(interval):
+        if client_disconnected(sock):
+            token.cancel("客户端已断开连接")
+            return
+
+
+def install_db_cancellation_hooks(engine):
+    """
+    在引擎上登记SQL执行事件，使取消令牌能够中断正在执行的语句
+
+    Args:
+        engine: SQLAlchemy 引擎
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        token = current_token()
+        if token is None:
+            return
+        # 先登记再检查，避免与 cancel() 之间的竞态漏掉刚开始执行的语句
+        dbapi_connection = conn.connection.dbapi_connection
+        token.register_connection(dbapi_connection)
+        if token.cancelled:
+            token.unregister_connection(dbapi_connection)
+            token.raise_if_cancelled()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        token = current_token()
+        if token is not None:
+            token.unregister_connection(conn.connection.dbapi_connection)
+
+    @event.listens_for(engine, 'handle_error')
+    def _handle_error(exception_context):
+        token = current_token()
+        if token is None or exception_context.connection is None:
+            return
+        try:
+            token.unregister_connection(exception_context.connection.connection.dbapi_connection)
+        except Exception:
+            pass
@@ -0,0 +1,120 @@
+"""
+列式响应格式协商模块
+
+/query、/list、/execute 默认返回 JSON；请求头 Accept 优先选择
+application/vnd.apache.arrow.stream 时返回 Arrow IPC 流：
+数据直接由查询结果的列构建，不经过逐行字典，客户端（pyarrow / apache-arrow JS）
+无需解析即可读取。JSON 响应中除 data 以外的字段（message、total、has_more 等）
+以 JSON 形式保存在 Arrow schema 元数据的 "response" 键中。
+
+Arrow 格式需要安装 pyarrow（可选依赖）；未安装时仍返回 JSON，
+客户端只接受 Arrow 时返回 406。错误响应始终为 JSON。
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import Response, after_this_request, request
+
+FORMAT_JSON = 'json'
+FORMAT_ARROW = 'arrow'
+
+JSON_MIMETYPE = 'application/json'
+ARROW_STREAM_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+
+class NotAcceptable(Exception):
+    """客户端只接受当前无法提供的响应格式"""
+    pass
+
+
+def arrow_available() -> bool:
+    """是否安装了 pyarrow"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def negotiate_format() -> str:
+    """
+    按请求头 Accept 选择响应格式（未指定或同等优先时为 JSON）
+
+    Raises:
+        NotAcceptable: 只接受 Arrow 但未安装 pyarrow
+    """
+    # 同一URL的响应格式随 Accept 变化，缓存需按 Accept 区分
+    @after_this_request
+    def vary_on_accept(response):
+        response.vary.add('Accept')
+        return response
+
+    accept = request.accept_mimetypes
+    if accept.best_match([JSON_MIMETYPE, ARROW_STREAM_MIMETYPE]) != ARROW_STREAM_MIMETYPE:
+        return FORMAT_JSON
+    if arrow_available():
+        return FORMAT_ARROW
+    if accept[JSON_MIMETYPE]:
+        return FORMAT_JSON
+    raise NotAcceptable("返回Arrow格式需要服务端安装 pyarrow")
+
+
+def rows_to_columns(rows: Iterable[Dict[str, Any]], names: Iterable[str]) -> Dict[str, List[Any]]:
+    """行字典转换为列（缺失的键为None）"""
+    rows = list(rows)
+    return {name: [row.get(name) for row in rows] for name in names}
+
+
+def value_array(values: List[Any]):
+    """脚本结果列：全部为数值时为 float64，否则转换为字符串（字典、列表使用JSON）"""
+    import pyarrow as pa
+
+    if all(value is None or (isinstance(value, (int, float)) and not isinstance(value, bool)) for value in values):
+        return pa.array([None if value is None else float(value) for value in values], type=pa.float64())
+    return pa.array([
+        None if value is None else value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+        for value in values
+    ], type=pa.string())
+
+
+def create_arrow_response(columns: Dict[str, Any],
+                          types: Optional[Dict[str, str]] = None,
+                          message: str = "success",
+                          code: int = 200,
+                          total: Optional[int] = None,
+                          **kwargs) -> tuple:
+    """
+    创建 Arrow IPC 流响应（参数与 create_success_response 对应，data 换为列）
+
+    Args:
+        columns: 列名 → 值列表或 pyarrow 数组
+        types: 列名 → pyarrow 类型名（如 float64、int64、date32），未指定的列自动推断
+    """
+    import pyarrow as pa
+
+    types = types or {}
+    arrays = {
+        name: values if isinstance(values, (pa.Array, pa.ChunkedArray))
+        else pa.array(values, type=getattr(pa, types[name])() if name in types else None)
+        for name, values in columns.items()
+    }
+
+    envelope = {
+        "code": code,
+        "message": message,
+        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    if total is not None:
+        envelope["total"] = total
+    envelope.update(kwargs)
+
+    table = pa.table(arrays).replace_schema_metadata({
+        'response': json.dumps(envelope, ensure_ascii=False, default=str)
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return Response(sink.getvalue().to_pybytes(), mimetype=ARROW_STREAM_MIMETYPE), code
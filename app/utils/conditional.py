@@ -0,0 +1,95 @@
+"""
+条件请求工具模块
+
+仪表盘每隔几秒轮询 /list、/query 等接口，而数据只在每日同步或脚本修改后才变化。
+conditional_get 装饰的 GET 接口返回 ETag（数据版本 + 请求参数 + Accept + 接口代码的摘要）、
+Last-Modified 和 Cache-Control；请求携带的 If-None-Match 与当前 ETag 一致
+（或 If-Modified-Since 不早于最近修改时间）时直接返回 304，不执行查询也不序列化响应。
+
+数据版本由 data_freshness_tracker 在进程内缓存，检查间隔内的条件请求完全不访问数据库。
+"""
+
+import hashlib
+import logging
+import marshal
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Iterable, Tuple
+
+from flask import Response, make_response, request
+
+logger = logging.getLogger(__name__)
+
+
+def conditional_get(sources: Iterable[str] = (), skip_params: Tuple[str, ...] = ()):
+    """
+    为 GET 接口启用 ETag / Last-Modified 条件请求
+
+    Args:
+        sources: 响应依赖的数据源（见 data_freshness）
+        skip_params: 出现这些查询参数时不启用（如截止时间、续传等结果不可复用的请求）
+    """
+    sources = tuple(sources)
+
+    def decorator(view):
+        # 接口代码变化（部署新版本）时 ETag 随之变化；各进程计算结果一致
+        code_version = hashlib.sha1(marshal.dumps(view.__code__)).hexdigest()[:12]
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from config.settings import http_cache_config
+            from app.services.data_freshness import data_freshness_tracker
+            from app.utils.metrics import observe_cache
+
+            if (request.method != 'GET' or not http_cache_config.http_cache_enabled
+                    or any(param in request.args for param in skip_params)):
+                return view(*args, **kwargs)
+
+            try:
+                version, last_modified = data_freshness_tracker.version(sources)
+            except Exception as e:
+                logger.warning(f"获取数据版本失败，跳过条件请求: {e}")
+                return view(*args, **kwargs)
+
+            etag = hashlib.sha1('\n'.join((
+                code_version, version, request.full_path, request.headers.get('Accept', '')
+            )).encode('utf-8')).hexdigest()
+            if last_modified is not None:
+                last_modified = min(last_modified.replace(tzinfo=timezone.utc), datetime.now(timezone.utc))
+
+            not_modified = _not_modified(etag, last_modified)
+            observe_cache('http_etag', not_modified)
+            if not_modified:
+                return _cache_headers(Response(status=304), etag, last_modified, http_cache_config)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _cache_headers(response, etag, last_modified, http_cache_config)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _not_modified(etag: str, last_modified) -> bool:
+    """If-None-Match 优先；未携带时按 If-Modified-Since 判断"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _cache_headers(response: Response, etag: str, last_modified, config) -> Response:
+    # 弱 ETag：同一内容的 gzip / brotli 压缩版本共用一个 ETag
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    if config.http_cache_max_age_seconds > 0:
+        response.cache_control.public = True
+        response.cache_control.max_age = config.http_cache_max_age_seconds
+    else:
+        response.cache_control.no_cache = True
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,87 @@
+"""
+截止时间与续传令牌工具模块
+
+客户端通过 deadline_ms 指定"在给定时间内尽量返回"，超时后服务端返回
+已完成股票的结果、未完成股票列表和续传令牌（continuation_token）。
+客户端携带相同参数和续传令牌再次请求，即可从中断位置继续计算。
+
+续传令牌使用应用密钥签名，包含续传位置和请求指纹，
+指纹不匹配（脚本或股票范围已变化）时拒绝续传。
+"""
+
+import hashlib
+import json
+from typing import Any, Optional
+
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from config.settings import app_config, REQUEST_TIMEOUT
+
+_serializer = URLSafeSerializer(app_config.secret_key, salt='continuation-token')
+
+
+def parse_deadline_ms(value: Any) -> Optional[int]:
+    """
+    解析并验证 deadline_ms 参数
+
+    Returns:
+        Optional[int]: 截止时间（毫秒），未提供时返回None
+
+    Raises:
+        ValueError: 参数不是正整数或超过请求超时上限
+    """
+    if value is None or value == '':
+        return None
+
+    try:
+        deadline_ms = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("deadline_ms必须是整数（毫秒）")
+
+    if deadline_ms <= 0 or deadline_ms > REQUEST_TIMEOUT * 1000:
+        raise ValueError(f"deadline_ms应在1-{REQUEST_TIMEOUT * 1000}之间")
+
+    return deadline_ms
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """计算请求指纹（脚本、股票范围等决定计算内容的参数）"""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def make_continuation_token(offset: int, fingerprint: str) -> str:
+    """生成续传令牌"""
+    return _serializer.dumps({'offset': offset, 'fp': fingerprint})
+
+
+def parse_continuation_token(token: Optional[str], fingerprint: str) -> int:
+    """
+    解析续传令牌
+
+    Args:
+        token: 续传令牌，为空表示从头开始
+        fingerprint: 当前请求指纹
+
+    Returns:
+        int: 续传位置
+
+    Raises:
+        ValueError: 令牌无效或与当前请求不匹配
+    """
+    if not token:
+        return 0
+
+    try:
+        payload = _serializer.loads(token)
+    except BadSignature:
+        raise ValueError("continuation_token无效")
+
+    if payload.get('fp') != fingerprint:
+        raise ValueError("continuation_token与当前请求参数不匹配")
+
+    offset = payload.get('offset')
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError("continuation_token无效")
+
+    return offset
@@ -0,0 +1,153 @@
+"""
+响应编码与压缩模块
+
+所有响应工具（create_success_response 等）都通过 Flask 的 jsonify 序列化，
+本模块替换应用的 JSON 提供者：安装了 orjson 时使用 orjson（比标准库快数倍，直接输出字节），
+否则使用标准库；默认输出紧凑 JSON（JSON_PRETTY=true 时缩进，便于调试）。
+键按字母排序、日期 / Decimal 等类型的格式与 Flask 默认行为一致。
+
+响应体超过 COMPRESSION_MIN_BYTES 时，按 Accept-Encoding 协商 brotli（需安装 brotli）或 gzip 压缩。
+流式响应（如 /export）不压缩。
+"""
+
+import gzip
+import json
+import logging
+from typing import Any, Optional
+
+from flask import Flask, Response, request
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+# 可压缩的响应类型
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/vnd.apache.arrow.stream',
+    'text/csv',
+    'text/plain',
+    'text/html'
+}
+
+
+def _load_orjson():
+    try:
+        import orjson
+        return orjson
+    except ImportError:
+        return None
+
+
+def _load_brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+_brotli = _load_brotli()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    可切换编码器的 JSON 提供者
+
+    encoder: auto（有 orjson 时使用 orjson）/ orjson / stdlib
+    """
+
+    ensure_ascii = False
+
+    def __init__(self, app: Flask, encoder: str = 'auto', pretty: bool = False):
+        super().__init__(app)
+        if encoder not in ('auto', 'orjson', 'stdlib'):
+            raise ValueError(f"不支持的JSON编码器: {encoder}（支持 auto / orjson / stdlib）")
+
+        self._orjson = _load_orjson() if encoder != 'stdlib' else None
+        if encoder == 'orjson' and self._orjson is None:
+            raise ValueError("JSON_ENCODER=orjson 需要安装 orjson: pip install orjson")
+
+        self.pretty = pretty
+        self.encoder = 'orjson' if self._orjson is not None else 'stdlib'
+        if self._orjson is not None:
+            orjson = self._orjson
+            # 日期交给 default 处理（与 Flask 默认的 HTTP 日期格式一致）
+            self._options = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+                             | orjson.OPT_PASSTHROUGH_DATETIME)
+            if pretty:
+                self._options |= orjson.OPT_INDENT_2
+
+    def encode(self, obj: Any) -> bytes:
+        """序列化为 UTF-8 字节"""
+        if self._orjson is not None:
+            try:
+                return self._orjson.dumps(obj, default=self.default, option=self._options)
+            except TypeError:
+                # 超出 64 位的整数等 orjson 不支持的值，回退到标准库
+                pass
+        return json.dumps(
+            obj,
+            default=self.default,
+            ensure_ascii=False,
+            sort_keys=True,
+            indent=2 if self.pretty else None,
+            separators=None if self.pretty else (',', ':')
+        ).encode('utf-8')
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj).decode('utf-8')
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj) + b'\n', mimetype=self.mimetype)
+
+
+def compress_response(response: Response, min_bytes: int, gzip_level: int = 1, brotli_quality: int = 4) -> Response:
+    """按 Accept-Encoding 压缩响应体（brotli 优先，其次 gzip）"""
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < min_bytes:
+        return response
+
+    encoding = _negotiate_encoding()
+    if encoding == 'br':
+        data = _brotli.compress(data, quality=brotli_quality)
+    elif encoding == 'gzip':
+        data = gzip.compress(data, compresslevel=gzip_level, mtime=0)
+    else:
+        return response
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def _negotiate_encoding() -> Optional[str]:
+    return request.accept_encodings.best_match(['br', 'gzip'] if _brotli is not None else ['gzip'])
+
+
+def install_encoding(app: Flask, config=None):
+    """为应用安装 JSON 提供者和响应压缩"""
+    from config.settings import response_config
+    config = config or response_config
+
+    app.json = FastJSONProvider(app, encoder=config.json_encoder, pretty=config.json_pretty)
+    logger.info(f"JSON编码器: {app.json.encoder}，响应压缩: {'启用' if config.compression_enabled else '关闭'}")
+
+    if config.compression_enabled:
+        @app.after_request
+        def compress(response):
+            return compress_response(
+                response,
+                config.compression_min_bytes,
+                config.compression_gzip_level,
+                config.compression_brotli_quality
+            )
@@ -0,0 +1,225 @@
+"""
+监控指标模块（Prometheus）
+
+以前只能从 flask_server.log 中检索耗时，无法得到分位数。/api/metrics 以 Prometheus 文本格式输出：
+- 按路由模板、方法和状态码的请求耗时直方图，以及正在处理的请求数
+- 数据库连接池（主库和只读副本）的已借出连接数、溢出连接数、获取连接的等待时间和超时次数
+- 沙箱脚本执行次数（成功/失败）和单次执行耗时
+- 缓存命中/未命中次数（股票范围面板、股票列表快照、HTTP 条件请求），命中率由 Prometheus 按计数计算
+
+gunicorn 多进程部署时配置 METRICS_MULTIPROC_DIR（见 config/gunicorn_config.py）：各工作进程把指标写入该目录，
+任一进程响应 /api/metrics 时汇总全部进程的数据。未安装 prometheus_client 或 metrics_enabled=false 时，
+所有记录函数为空操作，/api/metrics 返回 503。
+"""
+
+import os
+import time
+import logging
+import threading
+import weakref
+from typing import Optional, Tuple
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+# 请求耗时分桶（秒）：覆盖轻量接口到工作进程 600 秒超时
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# 获取连接等待时间分桶（秒）：正常情况下为毫秒级，上限为 pool_timeout
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+# 沙箱单次执行耗时分桶（秒）：上限为 SandboxExecutor.TIMEOUT_SECONDS
+SANDBOX_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5, 10)
+
+
+class Metrics:
+    """全部监控指标（每个进程一份）"""
+
+    def __init__(self):
+        from prometheus_client import Counter, Gauge, Histogram
+
+        # 多进程模式下 Gauge 按 livesum 汇总存活的工作进程
+        self.request_duration = Histogram(
+            'qtfund_http_request_duration_seconds', 'HTTP 请求耗时（秒）',
+            ['method', 'endpoint', 'status'], buckets=REQUEST_BUCKETS)
+        self.requests_in_flight = Gauge(
+            'qtfund_http_requests_in_flight', '正在处理的 HTTP 请求数', multiprocess_mode='livesum')
+
+        self.pool_size = Gauge(
+            'qtfund_db_pool_size', '连接池常驻连接数（pool_size）', ['pool'], multiprocess_mode='livesum')
+        self.pool_checked_out = Gauge(
+            'qtfund_db_pool_checked_out', '已借出的连接数', ['pool'], multiprocess_mode='livesum')
+        self.pool_overflow = Gauge(
+            'qtfund_db_pool_overflow', '超出 pool_size 的溢出连接数', ['pool'], multiprocess_mode='livesum')
+        self.pool_wait = Histogram(
+            'qtfund_db_pool_wait_seconds', '从连接池获取连接的等待时间（秒，含新建连接）',
+            ['pool'], buckets=POOL_WAIT_BUCKETS)
+        self.pool_timeouts = Counter(
+            'qtfund_db_pool_timeouts', '等待连接超过 pool_timeout 的次数', ['pool'])
+
+        self.sandbox_executions = Counter(
+            'qtfund_sandbox_executions', '沙箱脚本执行次数', ['outcome'])
+        self.sandbox_duration = Histogram(
+            'qtfund_sandbox_execution_seconds', '沙箱脚本单次执行耗时（秒）', buckets=SANDBOX_BUCKETS)
+
+        self.cache_requests = Counter(
+            'qtfund_cache_requests', '缓存访问次数', ['cache', 'result'])
+
+
+_metrics: Optional[Metrics] = None
+_initialized = False
+_init_lock = threading.Lock()
+_instrumented_engines = weakref.WeakSet()
+
+
+def get_metrics() -> Optional[Metrics]:
+    """获取监控指标，未启用或未安装 prometheus_client 时返回None"""
+    global _metrics, _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                _metrics = _create_metrics()
+                _initialized = True
+    return _metrics
+
+
+def _create_metrics() -> Optional[Metrics]:
+    from config.settings import metrics_config
+
+    if not metrics_config.metrics_enabled:
+        return None
+
+    # 必须在导入 prometheus_client 之前设置，gunicorn 已设置时以其为准
+    if metrics_config.metrics_multiproc_dir:
+        os.makedirs(metrics_config.metrics_multiproc_dir, exist_ok=True)
+        os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', metrics_config.metrics_multiproc_dir)
+
+    try:
+        return Metrics()
+    except ImportError:
+        logger.warning("未安装 prometheus_client，监控指标不可用")
+        return None
+
+
+def install_metrics(app):
+    """
+    为应用记录请求耗时并为数据库连接池安装监控
+
+    应在 install_encoding 之前调用：after_request 按注册的逆序执行，耗时因此包含响应压缩。
+    """
+    metrics = get_metrics()
+    if metrics is None:
+        return
+
+    try:
+        from database.connection import db_manager
+        instrument_engine(db_manager.engine, 'primary')
+        for replica in db_manager.replicas:
+            instrument_engine(replica.engine, replica.name)
+    except Exception as e:
+        logger.warning(f"连接池监控安装失败: {e}")
+
+    app.before_request(_start_request)
+    app.after_request(_observe_request)
+    app.teardown_request(_finish_request)
+
+
+def _start_request():
+    g._metrics_started = time.perf_counter()
+    _metrics.requests_in_flight.inc()
+
+
+def _observe_request(response):
+    started = g.get('_metrics_started')
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        _metrics.request_duration.labels(
+            request.method, endpoint, str(response.status_code)
+        ).observe(time.perf_counter() - started)
+    return response
+
+
+def _finish_request(error=None):
+    if g.pop('_metrics_started', None) is not None:
+        _metrics.requests_in_flight.dec()
+
+
+def instrument_engine(engine, name: str):
+    """
+    监控引擎的连接池
+
+    已借出连接数由 checkout/checkin 事件维护（事件监听随 dispose 重建的连接池保留）；
+    等待时间和超时在 Engine.raw_connection 处计时，会话和 engine.connect() 都经过这里。
+    """
+    metrics = get_metrics()
+    if metrics is None or engine in _instrumented_engines:
+        return
+    _instrumented_engines.add(engine)
+
+    from sqlalchemy import event
+    from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+    size = engine.pool.size()
+    metrics.pool_size.labels(name).set(size)
+    lock = threading.Lock()
+    checked_out = 0
+
+    def update(delta: int):
+        nonlocal checked_out
+        with lock:
+            checked_out += delta
+            current = checked_out
+        metrics.pool_checked_out.labels(name).set(current)
+        metrics.pool_overflow.labels(name).set(max(0, current - size))
+
+    event.listen(engine, 'checkout', lambda *args: update(1))
+    event.listen(engine, 'checkin', lambda *args: update(-1))
+
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection():
+        started = time.perf_counter()
+        try:
+            return raw_connection()
+        except PoolTimeoutError:
+            metrics.pool_timeouts.labels(name).inc()
+            raise
+        finally:
+            metrics.pool_wait.labels(name).observe(time.perf_counter() - started)
+
+    engine.raw_connection = timed_raw_connection
+
+
+def observe_sandbox_execution(seconds: float, success: bool):
+    """记录一次沙箱脚本执行"""
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.sandbox_executions.labels('success' if success else 'error').inc()
+        metrics.sandbox_duration.observe(seconds)
+
+
+def observe_cache(cache: str, hit: bool):
+    """记录一次缓存访问"""
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.cache_requests.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def render_metrics() -> Optional[Tuple[bytes, str]]:
+    """
+    生成 Prometheus 文本格式的指标
+
+    Returns:
+        Optional[Tuple[bytes, str]]: (响应体, Content-Type)，监控指标不可用时返回None
+    """
+    if get_metrics() is None:
+        return None
+
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,88 @@
+"""
+游标分页工具模块
+
+/list 和 /query 支持基于键的游标分页：响应返回 has_more 和 next_cursor，
+客户端携带 after=<next_cursor> 请求下一页，服务端按排序键（股票代码 / 交易日期）
+直接定位，翻页成本只与页大小有关，与页码无关。
+
+游标使用应用密钥签名，内容对客户端不透明；
+include_total 控制是否返回总数（true 精确计数，estimate 使用查询计划的估算行数）。
+"""
+
+from typing import Any, Optional
+
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from config.settings import app_config
+
+_serializer = URLSafeSerializer(app_config.secret_key, salt='page-cursor')
+
+# include_total 取值
+TOTAL_NONE = 'none'
+TOTAL_EXACT = 'exact'
+TOTAL_ESTIMATE = 'estimate'
+
+
+def make_cursor(endpoint: str, key: str) -> str:
+    """生成分页游标（endpoint 区分不同接口的游标，key 为上一页最后一行的排序键）"""
+    return _serializer.dumps({'e': endpoint, 'k': key})
+
+
+def parse_cursor(token: Optional[str], endpoint: str) -> Optional[str]:
+    """
+    解析分页游标
+
+    Returns:
+        Optional[str]: 上一页最后一行的排序键，未提供游标时返回None
+
+    Raises:
+        ValueError: 游标无效或不属于该接口
+    """
+    if not token:
+        return None
+
+    try:
+        payload = _serializer.loads(token)
+    except BadSignature:
+        raise ValueError("after游标无效")
+
+    if not isinstance(payload, dict) or payload.get('e') != endpoint or not isinstance(payload.get('k'), str):
+        raise ValueError("after游标无效")
+
+    return payload['k']
+
+
+def parse_include_total(value: Any) -> str:
+    """
+    解析 include_total 参数（默认不返回总数）
+
+    Returns:
+        str: TOTAL_NONE / TOTAL_EXACT / TOTAL_ESTIMATE
+
+    Raises:
+        ValueError: 取值无效
+    """
+    if value is None or value is False or value == '':
+        return TOTAL_NONE
+    if value is True:
+        return TOTAL_EXACT
+
+    normalized = str(value).strip().lower()
+    if normalized in ('false', '0', 'no'):
+        return TOTAL_NONE
+    if normalized in ('true', '1', 'yes', 'exact'):
+        return TOTAL_EXACT
+    if normalized == 'estimate':
+        return TOTAL_ESTIMATE
+    raise ValueError("include_total必须是 true、false 或 estimate")
+
+
+def estimate_row_count(session, sql: str, params: dict) -> int:
+    """按查询计划估算结果行数（不执行查询，基于表统计信息）"""
+    from sqlalchemy import text
+
+    plan = session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+    if isinstance(plan, str):
+        import json
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
@@ -0,0 +1,67 @@
+"""
+语句超时工具模块
+
+以前只有工作进程的 600 秒超时兜底，一个失控的 /query 或 /list 查询会在客户端离开后继续占用连接池中的连接。
+with_statement_timeout 装饰的接口在语句超时作用域内执行：期间打开的数据库会话在事务内设置
+statement_timeout（按接口类别配置，见 QueryTimeoutConfig），超时的语句由数据库取消并立即归还连接；
+接口因此失败时返回 504，而不是笼统的 500。
+"""
+
+import logging
+from functools import wraps
+
+from flask import make_response
+
+logger = logging.getLogger(__name__)
+
+# 接口类别 → QueryTimeoutConfig 中的超时配置项
+ENDPOINT_TIMEOUTS = {
+    'query': 'statement_timeout_query_ms',
+    'list': 'statement_timeout_list_ms',
+    'batch': 'statement_timeout_batch_ms',
+    'export': 'statement_timeout_export_ms',
+    'script_history': 'statement_timeout_script_history_ms',
+    'universe_panel': 'statement_timeout_universe_panel_ms'
+}
+
+
+def timeout_for(endpoint: str) -> int:
+    """接口类别的语句超时（毫秒，0 表示不限制）"""
+    from config.settings import query_timeout_config
+    return getattr(query_timeout_config, ENDPOINT_TIMEOUTS[endpoint])
+
+
+def with_statement_timeout(endpoint: str):
+    """
+    在语句超时作用域内执行接口
+
+    Args:
+        endpoint: 接口类别（见 ENDPOINT_TIMEOUTS）
+    """
+    if endpoint not in ENDPOINT_TIMEOUTS:
+        raise ValueError(f"未知的接口类别: {endpoint}")
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from database.connection import db_manager
+            from app.utils.responses import create_timeout_response
+
+            timeout_ms = timeout_for(endpoint)
+            with db_manager.statement_timeout(timeout_ms) as scope:
+                try:
+                    response = make_response(view(*args, **kwargs))
+                except Exception:
+                    if not scope.timed_out:
+                        raise
+                    response = None
+
+            # 服务层通常捕获异常后返回 500，以作用域记录的超时为准改为 504
+            if scope.timed_out and (response is None or response.status_code >= 500):
+                logger.warning(f"{endpoint} 接口查询超时（{timeout_ms} 毫秒）")
+                return create_timeout_response(timeout_ms)
+            return response
+
+        return wrapper
+
+    return decorator
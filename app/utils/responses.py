@@ -50,6 +50,31 @@ def create_error_response(code: int = 400,
     return jsonify(response_data), code
 
 
+def create_overload_response(retry_after: int,
+                             detail: Optional[str] = None,
+                             **kwargs) -> tuple:
+    """创建过载响应（429 + Retry-After）"""
+    response, code = create_error_response(
+        429,
+        "服务繁忙，请稍后重试",
+        detail,
+        retry_after=retry_after,
+        **kwargs
+    )
+    return response, code, {'Retry-After': str(retry_after)}
+
+
+def create_timeout_response(timeout_ms: int, **kwargs) -> tuple:
+    """创建查询超时响应（504）"""
+    return create_error_response(
+        504,
+        "查询超时",
+        f"数据库查询超过 {timeout_ms} 毫秒，已取消；请缩小日期范围或减少数量后重试",
+        timeout_ms=timeout_ms,
+        **kwargs
+    )
+
+
 def create_data_response(data: Any,
                         total: Optional[int] = None,
                         page: Optional[int] = None,
@@ -80,7 +105,8 @@ def create_stock_data_response(data: list,
                              symbol: str,
                              source: str,
                              date_range: Optional[Dict] = None,
-                             total: Optional[int] = None) -> tuple:
+                             total: Optional[int] = None,
+                             **kwargs) -> tuple:
     """创建股票数据专用响应"""
     response_data = {
         "code": 200,
@@ -98,28 +124,11 @@ def create_stock_data_response(data: list,
     if date_range:
         response_data["date_range"] = date_range
     
+    response_data.update(kwargs)
+    
     return jsonify(response_data), 200
 
 
-def format_stock_price_data(db_record) -> Dict[str, Any]:
-    """格式化数据库股票数据记录"""
-    return {
-        "trade_date": db_record.trade_date.strftime('%Y-%m-%d'),
-        "symbol": str(db_record.symbol),
-        "stock_name": str(db_record.stock_name),
-        "open_price": float(db_record.open_price) if db_record.open_price is not None else None,
-        "high_price": float(db_record.high_price) if db_record.high_price is not None else None,
-        "low_price": float(db_record.low_price) if db_record.low_price is not None else None,
-        "close_price": float(db_record.close_price),
-        "volume": int(db_record.volume),
-        "turnover": float(db_record.turnover),
-        "price_change": float(db_record.price_change) if db_record.price_change is not None else None,
-        "price_change_pct": float(db_record.price_change_pct) if db_record.price_change_pct is not None else None,
-        "premium_rate": float(db_record.premium_rate) if db_record.premium_rate is not None else None,
-        "market_code": str(db_record.market_code)
-    }
-
-
 def validate_date_range(start_date: Optional[str], end_date: Optional[str]) -> Dict[str, Optional[str]]:
     """验证日期范围参数"""
     import re
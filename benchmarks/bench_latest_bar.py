@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+最新行情查询基准测试：逐股票 LATERAL 探测 vs stock_latest_bar 关联
+
+在独立 schema（默认 bench_latest_bar）中按指定规模生成 stock_info / stock_daily_data
+模拟数据（安装了 TimescaleDB 时可用 --timescale 建为超表并压缩旧分块），
+分别以两种方式执行 /api/stock-price/list 的全量查询，输出耗时中位数和执行计划摘要。
+
+用法：
+    python benchmarks/bench_latest_bar.py                          # 5000 只股票 × 1250 个交易日
+    python benchmarks/bench_latest_bar.py --symbols 2000 --days 500 --repeat 20
+    python benchmarks/bench_latest_bar.py --timescale --keep       # 超表 + 压缩，保留测试数据
+"""
+
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+LATERAL_QUERY = """
+SELECT si.symbol, si.stock_name, si.market_code, si.is_active, si.is_etf, si.last_sync_date,
+       lp.close_price, lp.volume, lp.price_change_pct, lp.trade_date AS latest_trade_date
+FROM stock_info si
+LEFT JOIN LATERAL (
+    SELECT close_price, volume, price_change_pct, trade_date
+    FROM stock_daily_data sd
+    WHERE sd.symbol = si.symbol
+    ORDER BY sd.trade_date DESC
+    LIMIT 1
+) lp ON true
+WHERE si.is_active = 'Y'
+ORDER BY si.symbol
+"""
+
+LATEST_BAR_QUERY = """
+SELECT si.symbol, si.stock_name, si.market_code, si.is_active, si.is_etf, si.last_sync_date,
+       lp.close_price, lp.volume, lp.price_change_pct, lp.trade_date AS latest_trade_date
+FROM stock_info si
+LEFT JOIN stock_latest_bar lp ON lp.symbol = si.symbol
+WHERE si.is_active = 'Y'
+ORDER BY si.symbol
+"""
+
+
+def setup(conn, schema: str, symbols: int, days: int, timescale: bool):
+    """生成模拟数据（表结构和索引与生产一致）"""
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {schema}"))
+    conn.execute(text(f"SET search_path TO {schema}, public"))
+
+    conn.execute(text("""
+        CREATE TABLE stock_info (
+            symbol VARCHAR(20) PRIMARY KEY,
+            stock_name VARCHAR(100) NOT NULL,
+            market_code VARCHAR(10) NOT NULL,
+            is_active CHAR(1) NOT NULL DEFAULT 'Y',
+            is_etf CHAR(1) NOT NULL DEFAULT 'N',
+            last_sync_date TIMESTAMP
+        )
+    """))
+    conn.execute(text("""
+        CREATE TABLE stock_daily_data (
+            trade_date TIMESTAMP NOT NULL,
+            symbol VARCHAR(20) NOT NULL,
+            close_price NUMERIC(10,4) NOT NULL,
+            volume BIGINT NOT NULL,
+            price_change_pct NUMERIC(8,4),
+            PRIMARY KEY (trade_date, symbol)
+        )
+    """))
+    conn.execute(text("CREATE INDEX idx_symbol_date ON stock_daily_data (symbol, trade_date)"))
+    if timescale:
+        conn.execute(text("SELECT create_hypertable('stock_daily_data', 'trade_date', chunk_time_interval => INTERVAL '30 days')"))
+
+    conn.execute(text("""
+        INSERT INTO stock_info (symbol, stock_name, market_code, last_sync_date)
+        SELECT (ARRAY['SH', 'SZ', 'BJ'])[1 + i % 3] || '.' || LPAD(i::text, 6, '0'), 'S' || i,
+               (ARRAY['SH', 'SZ', 'BJ'])[1 + i % 3], NOW()
+        FROM generate_series(1, :symbols) AS i
+    """), {'symbols': symbols})
+
+    started = time.perf_counter()
+    conn.execute(text("""
+        INSERT INTO stock_daily_data (trade_date, symbol, close_price, volume, price_change_pct)
+        SELECT DATE '2020-01-01' + d, si.symbol, 10 + random() * 90, (random() * 1e7)::bigint, random() * 20 - 10
+        FROM stock_info si CROSS JOIN generate_series(0, :days - 1) AS d
+    """), {'days': days})
+    print(f"生成 {symbols * days:,} 行行情数据，耗时 {time.perf_counter() - started:.1f} 秒")
+
+    if timescale:
+        conn.execute(text("ALTER TABLE stock_daily_data SET (timescaledb.compress, timescaledb.compress_segmentby = 'symbol')"))
+        conn.execute(text("SELECT compress_chunk(c) FROM show_chunks('stock_daily_data', older_than => DATE '2020-01-01' + :keep) c"),
+                     {'keep': max(days - 60, 1)})
+
+    conn.execute(text("""
+        CREATE TABLE stock_latest_bar AS
+        SELECT DISTINCT ON (symbol) symbol, trade_date, close_price, volume, price_change_pct
+        FROM stock_daily_data ORDER BY symbol, trade_date DESC
+    """))
+    conn.execute(text("ALTER TABLE stock_latest_bar ADD PRIMARY KEY (symbol)"))
+    conn.execute(text("ANALYZE"))
+
+
+def measure(conn, query: str, repeat: int):
+    """执行 repeat 次，返回耗时列表（毫秒）和执行计划摘要"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(text(query)).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {query}")).fetchall()
+    summary = [row[0] for row in plan if 'Buffers' in row[0] or 'Execution Time' in row[0]]
+    return timings, summary[:1] + summary[-1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="最新行情查询基准测试")
+    parser.add_argument('--symbols', type=int, default=5000, help="股票数（默认5000）")
+    parser.add_argument('--days', type=int, default=1250, help="每只股票的交易日数（默认1250，约5年）")
+    parser.add_argument('--repeat', type=int, default=10, help="每种查询的执行次数（默认10）")
+    parser.add_argument('--schema', default='bench_latest_bar', help="测试数据所在 schema")
+    parser.add_argument('--timescale', action='store_true', help="建为 TimescaleDB 超表并压缩旧分块")
+    parser.add_argument('--keep', action='store_true', help="完成后保留测试数据")
+    args = parser.parse_args()
+
+    from database.connection import db_manager
+
+    with db_manager.engine.connect() as conn:
+        setup(conn, args.schema, args.symbols, args.days, args.timescale)
+        conn.commit()
+
+        try:
+            conn.execute(text(f"SET search_path TO {args.schema}, public"))
+            # 预热
+            conn.execute(text(LATERAL_QUERY)).fetchall()
+            conn.execute(text(LATEST_BAR_QUERY)).fetchall()
+
+            print(f"\n{'查询方式':<24}{'中位数(ms)':>12}{'最小(ms)':>12}{'最大(ms)':>12}")
+            for name, query in (('LATERAL 逐股票探测', LATERAL_QUERY), ('stock_latest_bar 关联', LATEST_BAR_QUERY)):
+                timings, summary = measure(conn, query, args.repeat)
+                print(f"{name:<24}{statistics.median(timings):>12.2f}{min(timings):>12.2f}{max(timings):>12.2f}")
+                for line in summary:
+                    print(f"    {line.strip()}")
+        finally:
+            if not args.keep:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE"))
+                conn.commit()
+
+
+if __name__ == '__main__':
+    main()
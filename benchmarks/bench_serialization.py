@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+响应序列化基准测试：编码耗时与传输字节数
+
+生成与 /list（全市场股票列表）和 /query（单只股票 10000 条行情）结构相同的模拟响应，
+分别用原来的方式（标准库 json、缩进）、标准库紧凑输出和 orjson 编码，
+并比较 gzip / brotli 压缩后的传输字节数。不需要数据库。
+
+用法：
+    python benchmarks/bench_serialization.py                    # 5000 只股票 / 10000 条行情
+    python benchmarks/bench_serialization.py --symbols 2000 --bars 5000 --repeat 20
+"""
+
+import sys
+import gzip
+import json
+import time
+import random
+import argparse
+import statistics
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.utils.encoding import FastJSONProvider
+
+
+def listing_payload(symbols: int) -> dict:
+    """模拟 /list 响应"""
+    data = [{
+        'symbol': f"{('SH', 'SZ', 'BJ')[i % 3]}.{i:06d}",
+        'stock_name': f"股票{i}",
+        'market_code': ('SH', 'SZ', 'BJ')[i % 3],
+        'is_active': 'Y',
+        'is_etf': i % 10 == 0,
+        'last_sync_date': '2025-07-11T15:30:00',
+        'close_price': round(random.uniform(2, 200), 4),
+        'price_change_pct': round(random.uniform(-10, 10), 4),
+        'volume': random.randint(0, 10 ** 8),
+        'latest_trade_date': '2025-07-11'
+    } for i in range(symbols)]
+    return {'code': 200, 'message': f"查询到 {symbols} 只股票", 'timestamp': '2025-07-11 16:00:00',
+            'data': data, 'has_more': False}
+
+
+def query_payload(bars: int) -> dict:
+    """模拟 /query 响应"""
+    data = [{
+        'trade_date': f"20{10 + i // 250:02d}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+        'symbol': 'SH.600519',
+        'stock_name': '贵州茅台',
+        'open_price': round(random.uniform(1000, 2000), 4),
+        'high_price': round(random.uniform(1000, 2000), 4),
+        'low_price': round(random.uniform(1000, 2000), 4),
+        'close_price': round(random.uniform(1000, 2000), 4),
+        'volume': random.randint(10 ** 4, 10 ** 7),
+        'turnover': round(random.uniform(10 ** 7, 10 ** 10), 2),
+        'price_change': round(random.uniform(-50, 50), 4),
+        'price_change_pct': round(random.uniform(-10, 10), 4),
+        'premium_rate': None,
+        'market_code': 'SH'
+    } for i in range(bars)]
+    return {'code': 200, 'message': '查询成功', 'timestamp': '2025-07-11 16:00:00',
+            'data': data, 'symbol': 'SH.600519', 'source': 'database', 'count': bars}
+
+
+def encoders(app: Flask) -> dict:
+    """参与比较的编码方式 → 编码函数（返回字节）"""
+    pretty = DefaultJSONProvider(app)
+    result = {
+        '标准库 缩进（原方式）': lambda obj: pretty.dumps(obj, indent=2).encode('utf-8'),
+        '标准库 紧凑': FastJSONProvider(app, encoder='stdlib').encode,
+    }
+    try:
+        result['orjson 紧凑'] = FastJSONProvider(app, encoder='orjson').encode
+    except ValueError:
+        print("未安装 orjson，跳过 orjson 编码")
+    return result
+
+
+def compressors() -> dict:
+    """压缩方式 → 压缩函数"""
+    result = {
+        'gzip-1': lambda data: gzip.compress(data, compresslevel=1, mtime=0),
+        'gzip-6': lambda data: gzip.compress(data, compresslevel=6, mtime=0)
+    }
+    try:
+        import brotli
+        result['br-4'] = lambda data: brotli.compress(data, quality=4)
+    except ImportError:
+        print("未安装 brotli，跳过 brotli 压缩")
+    return result
+
+
+def measure(func, arg, repeat: int):
+    """执行 repeat 次，返回耗时中位数（毫秒）和结果"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(arg)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="响应序列化基准测试")
+    parser.add_argument('--symbols', type=int, default=5000, help="/list 股票数（默认5000）")
+    parser.add_argument('--bars', type=int, default=10000, help="/query 行情条数（默认10000）")
+    parser.add_argument('--repeat', type=int, default=10, help="每种方式的执行次数（默认10）")
+    args = parser.parse_args()
+
+    random.seed(42)
+    app = Flask(__name__)
+    payloads = {
+        f"/list {args.symbols} 只股票": listing_payload(args.symbols),
+        f"/query {args.bars} 条行情": query_payload(args.bars)
+    }
+
+    compress_funcs = compressors()
+    for name, payload in payloads.items():
+        print(f"\n== {name} ==")
+        print(f"{'编码方式':<20}{'编码(ms)':>10}{'字节':>12}", end='')
+        for codec in compress_funcs:
+            print(f"{codec + '(ms)':>12}{codec + '字节':>12}", end='')
+        print()
+
+        for encoder_name, encode in encoders(app).items():
+            encode_ms, body = measure(encode, payload, args.repeat)
+            print(f"{encoder_name:<20}{encode_ms:>10.2f}{len(body):>12,}", end='')
+            for compress in compress_funcs.values():
+                compress_ms, compressed = measure(compress, body, max(1, args.repeat // 2))
+                print(f"{compress_ms:>12.2f}{len(compressed):>12,}", end='')
+            print()
+
+
+if __name__ == '__main__':
+    main()
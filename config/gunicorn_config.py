@@ -43,6 +43,14 @@ worker_connections = 1000  # 每个工作进程的最大连接数
 max_requests = 1000  # 工作进程处理请求数上限后重启（防止内存泄漏）
 max_requests_jitter = 50  # 随机抖动，避免所有进程同时重启
 
+# 监控指标多进程存储目录（各工作进程的指标写入此目录，/api/metrics 汇总）
+def _metrics_multiproc_dir():
+    try:
+        from config.settings import metrics_config
+        return metrics_config.metrics_multiproc_dir if metrics_config.metrics_enabled else ""
+    except Exception:
+        return ""
+
 # 启动前回调
 def on_starting(server):
     """服务器启动前执行"""
@@ -50,9 +58,28 @@ def on_starting(server):
     print(f"绑定地址: {bind}")
     print(f"工作进程数: {workers}")
     print(f"请求超时: {timeout}秒")
+    
+    # 清空上次运行遗留的指标文件；工作进程继承环境变量，导入 prometheus_client 前即为多进程模式
+    metrics_dir = _metrics_multiproc_dir()
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        for name in os.listdir(metrics_dir):
+            if name.endswith('.db'):
+                os.remove(os.path.join(metrics_dir, name))
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = metrics_dir
+        print(f"监控指标目录: {metrics_dir}")
 
 # 工作进程启动后回调
 def post_worker_init(worker):
     """工作进程启动后执行"""
     print(f"工作进程 {worker.pid} 已启动")
 
+# 工作进程退出后回调
+def child_exit(server, worker):
+    """工作进程退出后执行：移除其 livesum 类指标（正在处理的请求数、连接池连接数）"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        try:
+            from prometheus_client import multiprocess
+            multiprocess.mark_process_dead(worker.pid)
+        except ImportError:
+            pass
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -23,6 +23,12 @@ class DatabaseConfig(BaseSettings):
     db_pool_timeout: int = Field(default=30, description="连接超时时间")
     db_pool_recycle: int = Field(default=3600, description="连接回收时间")
     
+    # 只读副本（可选）：只读查询轮询分发到健康且复制延迟不超过阈值的副本，否则回退到主库
+    db_replica_urls: str = Field(default="", description="只读副本连接URL，逗号分隔；为空时所有查询使用主库")
+    db_replica_max_lag_seconds: float = Field(default=30.0, description="副本复制延迟超过此秒数时不再分发查询")
+    db_replica_check_interval_seconds: float = Field(default=5.0, description="副本健康和延迟检查间隔（秒）")
+    db_replica_connect_timeout: int = Field(default=3, description="副本连接超时（秒），不可用的副本尽快回退到主库")
+    
     # TimescaleDB 特定配置
     compression_interval_days: int = Field(default=7, description="数据压缩间隔（天）")
     data_retention_days: int = Field(default=1095, description="数据保留天数")
@@ -35,6 +41,11 @@ class DatabaseConfig(BaseSettings):
         encoded_password = quote_plus(self.db_password)
         return f"postgresql://{self.db_user}:{encoded_password}@{self.db_host}:{self.db_port}/{self.db_name}"
     
+    @property
+    def replica_urls(self) -> list:
+        """只读副本连接URL列表"""
+        return [url.strip() for url in self.db_replica_urls.split(',') if url.strip()]
+    
     model_config = {
         "env_file": ".env",
         "env_file_encoding": "utf-8",
@@ -62,7 +73,234 @@ class AppConfig(BaseSettings):
     }
 
 
+class AdmissionConfig(BaseSettings):
+    """请求准入控制配置类"""
+    
+    admission_enabled: bool = Field(default=True, description="是否启用重请求准入控制")
+    
+    # 成本 = 股票数 × 各脚本的单只股票成本（回看天数 × 复杂度系数）之和，超过阈值即视为重请求
+    admission_heavy_cost_threshold: int = Field(default=100000, description="重请求成本阈值")
+    admission_default_lookback_days: int = Field(default=250, description="无法解析脚本回看天数时的默认值")
+    
+    # 重请求并发上限（全局上限应小于gunicorn工作进程数，为轻量请求保留容量）
+    admission_heavy_slots_per_process: int = Field(default=1, description="单进程重请求并发上限")
+    admission_heavy_slots_global: int = Field(default=4, description="跨进程重请求并发上限")
+    admission_lock_dir: str = Field(default="/tmp/qtfund_admission", description="跨进程并发槽位锁文件目录")
+    admission_retry_after_seconds: int = Field(default=30, description="拒绝时返回的Retry-After秒数")
+    
+    # 抽样试运行（/execute 的 sample 选项）按外推的全量耗时给出执行方式建议
+    admission_interactive_max_seconds: float = Field(default=30, description="外推耗时不超过此值时建议同步执行（秒）")
+    admission_background_max_seconds: float = Field(default=3600, description="外推耗时不超过此值时建议后台执行，超过则不建议执行（秒）")
+    
+    model_config = {
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"  # 忽略额外的环境变量
+    }
+
+
+class WorkerConfig(BaseSettings):
+    """后台计算进程配置类"""
+    
+    # inline: Web进程内同步计算；queue: /execute 默认只入队，由 start_worker.py 计算
+    calculation_mode: str = Field(default="inline", description="脚本计算模式（inline/queue）")
+    
+    worker_poll_interval_seconds: float = Field(default=1.0, description="队列为空时的轮询间隔（秒）")
+    worker_heartbeat_interval_seconds: int = Field(default=10, description="运行中任务的心跳间隔（秒）")
+    worker_stale_timeout_seconds: int = Field(default=120, description="心跳超时后任务重新入队（秒）")
+    worker_max_attempts: int = Field(default=3, description="任务最大尝试次数")
+    
+    model_config = {
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"  # 忽略额外的环境变量
+    }
+
+
+class ExecutionConfig(BaseSettings):
+    """脚本执行控制配置类"""
+    
+    disconnect_check_interval_seconds: float = Field(default=0.5, description="客户端断开检测间隔（秒）")
+    latest_row_batch_size: int = Field(default=500, description="批量获取最新行情时每条SQL的股票数")
+    
+    # 脚本逐行性能分析（/execute 的 profile 选项）
+    profile_sample_size: int = Field(default=20, description="性能分析默认抽样的股票数")
+    profile_max_sample_size: int = Field(default=200, description="性能分析最多抽样的股票数")
+    dry_run_max_sample_size: int = Field(default=500, description="抽样试运行最多抽样的股票数")
+    
+    model_config = {
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"  # 忽略额外的环境变量
+    }
+
+
+class UniverseConfig(BaseSettings):
+    """股票范围与面板缓存配置类"""
+    
+    universe_max_symbols: int = Field(default=5000, description="静态股票范围最多包含的股票数")
+    
+    # 按股票范围缓存最新行情与历史数据面板（进程内LRU）
+    universe_panel_cache_size: int = Field(default=8, description="缓存的股票范围面板数量")
+    universe_panel_max_symbols: int = Field(default=1000, description="成员数超过此值的股票范围不缓存面板")
+    universe_panel_ttl_seconds: int = Field(default=300, description="面板缓存有效期（秒）")
+    
+    model_config = {
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"  # 忽略额外的环境变量
+    }
+
+
+class ClusterConfig(BaseSettings):
+    """分布式计算（scatter-gather）配置类"""
+    
+    # 逗号分隔的对等实例地址，如 http://10.0.0.2:8000,http://10.0.0.3:8000；为空时不启用
+    cluster_peers: str = Field(default="", description="对等实例地址列表")
+    cluster_token: str = Field(default="", description="实例间分片请求的共享令牌（为空时拒绝分片请求）")
+    
+    cluster_min_symbols: int = Field(default=200, description="股票数达到此值时才分发到对等实例")
+    cluster_shard_timeout_seconds: int = Field(default=300, description="单个分片请求超时（秒）")
+    cluster_shard_retries: int = Field(default=1, description="分片失败后换其他实例重试的次数")
+    
+    @property
+    def peer_urls(self) -> List[str]:
+        """解析对等实例地址列表"""
+        return [url.strip().rstrip('/') for url in self.cluster_peers.split(',') if url.strip()]
+    
+    model_config = {
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"  # 忽略额外的环境变量
+    }
+
+
+class ListingSnapshotConfig(BaseSettings):
+    """股票列表最新行情快照缓存配置类"""
+    
+    listing_snapshot_enabled: bool = Field(default=True, description="是否使用进程内快照响应 /api/stock-price/list")
+    
+    # 每隔此时间最多检查一次数据版本（stock_info 变更、最新交易日期），版本变化时重建快照
+    listing_snapshot_check_interval_seconds: float = Field(default=5, description="快照版本检查间隔（秒）")
+    listing_snapshot_max_age_seconds: int = Field(default=300, description="快照最长使用时间（秒），覆盖同一交易日内行情被修订的情况")
+    
+    model_config = {
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"  # 忽略额外的环境变量
+    }
+
+
+class BatchQueryConfig(BaseSettings):
+    """多股票批量行情查询配置类"""
+    
+    batch_query_max_symbols: int = Field(default=1000, description="/query-batch 单次请求最多的股票数")
+    batch_query_max_rows: int = Field(default=1000000, description="/query-batch 单次请求最多读取的行情行数")
+    
+    model_config = {
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"  # 忽略额外的环境变量
+    }
+
+
+class ExportConfig(BaseSettings):
+    """行情数据导出配置类"""
+    
+    # 服务端游标每次读取的行数，也是每个 CSV 块 / Parquet 行组的行数（决定导出时的内存占用）
+    export_chunk_rows: int = Field(default=10000, description="导出时每批读取的行数")
+    export_max_symbols: int = Field(default=10000, description="单次导出请求最多指定的股票数（不指定时导出全部股票）")
+    # 同步工作进程在整个请求（包括流式响应）完成前不会上报心跳，导出必须在 gunicorn 的 600 秒超时前结束
+    export_max_seconds: int = Field(default=540, description="单次导出的最长时间（秒），超过后中断连接")
+    
+    model_config = {
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"  # 忽略额外的环境变量
+    }
+
+
+class HttpCacheConfig(BaseSettings):
+    """HTTP 条件请求（ETag / Last-Modified）配置类"""
+    
+    http_cache_enabled: bool = Field(default=True, description="是否为轮询接口返回 ETag 并响应条件请求")
+    
+    # 每隔此时间最多查询一次数据版本；间隔内的条件请求不访问数据库
+    http_cache_check_interval_seconds: float = Field(default=5, description="数据版本检查间隔（秒）")
+    http_cache_max_age_seconds: int = Field(default=0, description="Cache-Control max-age（秒），0 表示每次都需重新验证")
+    
+    model_config = {
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"  # 忽略额外的环境变量
+    }
+
+
+class ResponseConfig(BaseSettings):
+    """响应编码与压缩配置类"""
+    
+    # auto：安装了 orjson 时使用 orjson，否则使用标准库 json
+    json_encoder: str = Field(default="auto", description="JSON编码器（auto/orjson/stdlib）")
+    json_pretty: bool = Field(default=False, description="是否缩进JSON输出（调试用）")
+    
+    compression_enabled: bool = Field(default=True, description="是否按 Accept-Encoding 压缩响应（brotli 需安装 brotli）")
+    compression_min_bytes: int = Field(default=1024, description="响应体超过此字节数时才压缩")
+    compression_gzip_level: int = Field(default=1, description="gzip 压缩级别（1-9，级别越高越慢）")
+    compression_brotli_quality: int = Field(default=4, description="brotli 压缩质量（0-11）")
+    
+    model_config = {
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"  # 忽略额外的环境变量
+    }
+
+
+class QueryTimeoutConfig(BaseSettings):
+    """数据库语句超时配置类（按接口类别，0 表示不限制）"""
+    
+    statement_timeout_query_ms: int = Field(default=10000, description="单只股票行情查询（/query、/info）的语句超时（毫秒）")
+    statement_timeout_list_ms: int = Field(default=20000, description="股票列表（/list）的语句超时（毫秒）")
+    statement_timeout_batch_ms: int = Field(default=30000, description="批量查询（/query-batch）的语句超时（毫秒）")
+    statement_timeout_export_ms: int = Field(default=60000, description="导出（/export）每次读取一批数据的语句超时（毫秒）")
+    statement_timeout_script_history_ms: int = Field(default=5000, description="脚本中 get_history 的语句超时（毫秒）")
+    # 股票范围面板一次加载全部成员的历史数据（最多 1000 只 × 1000 天），不受单次 get_history 超时限制
+    statement_timeout_universe_panel_ms: int = Field(default=60000, description="股票范围面板批量加载历史数据的语句超时（毫秒）")
+    
+    model_config = {
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"  # 忽略额外的环境变量
+    }
+
+
+
+class MetricsConfig(BaseSettings):
+    """监控指标配置类（/api/metrics，需安装 prometheus_client）"""
+    
+    metrics_enabled: bool = Field(default=True, description="是否记录监控指标")
+    # gunicorn 多进程部署时必须配置，否则每次抓取只能看到响应请求的那个工作进程
+    metrics_multiproc_dir: str = Field(default="", description="多进程指标存储目录（为空时只统计当前进程）")
+    
+    model_config = {
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"  # 忽略额外的环境变量
+    }
+
+
 # 全局配置实例
 db_config = DatabaseConfig()
 app_config = AppConfig()
+admission_config = AdmissionConfig()
+worker_config = WorkerConfig()
+execution_config = ExecutionConfig()
+universe_config = UniverseConfig()
+cluster_config = ClusterConfig()
+listing_snapshot_config = ListingSnapshotConfig()
+batch_query_config = BatchQueryConfig()
+export_config = ExportConfig()
+http_cache_config = HttpCacheConfig()
+response_config = ResponseConfig()
+query_timeout_config = QueryTimeoutConfig()
+metrics_config = MetricsConfig()
 
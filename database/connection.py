@@ -1,10 +1,14 @@
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import QueuePool
 from contextlib import contextmanager
-from typing import Generator
+from itertools import count
+from typing import Any, Dict, Generator, List, Optional
 import logging
+import threading
+import time
 from config.settings import db_config
 
 # 设置日志
@@ -14,40 +18,168 @@ logger = logging.getLogger(__name__)
 # SQLAlchemy 基础类
 Base = declarative_base()
 
+# 副本复制延迟（秒）：主库或已回放全部接收的WAL时为0
+# （主库空闲时 pg_last_xact_replay_timestamp 不再前进，不能单独用它计算延迟）
+REPLICA_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+# 语句超时作用域（每个线程一个，可嵌套）
+_local = threading.local()
+
+
+class TimeoutScope:
+    """语句超时作用域：期间打开的会话使用 timeout_ms 毫秒的 statement_timeout"""
+    
+    def __init__(self, timeout_ms: int):
+        self.timeout_ms = timeout_ms
+        self.timed_out = False
+
+
+def current_timeout_scope() -> Optional[TimeoutScope]:
+    """当前线程的语句超时作用域"""
+    return getattr(_local, 'timeout_scope', None)
+
+
+def is_statement_timeout(error: BaseException) -> bool:
+    """
+    是否为因 statement_timeout 被数据库取消的语句
+
+    statement_timeout 与客户端断开时的主动取消（取消令牌调用 cancel()）返回相同的错误码 57014，
+    错误信息随服务器的 lc_messages 翻译，不能用于区分；当前请求的取消令牌未被取消时即为超时。
+    """
+    from app.utils.cancellation import current_token
+
+    orig = getattr(error, 'orig', error)
+    if getattr(orig, 'pgcode', None) != '57014':
+        return False
+    token = current_token()
+    return token is None or not token.cancelled
+
+
+def _create_engine(url: str, **kwargs):
+    return create_engine(
+        url,
+        poolclass=QueuePool,
+        pool_size=db_config.db_pool_size,
+        max_overflow=db_config.db_max_overflow,
+        pool_timeout=db_config.db_pool_timeout,
+        pool_recycle=db_config.db_pool_recycle,
+        echo=False,  # 设置为 True 可以看到 SQL 语句
+        future=True,
+        **kwargs
+    )
+
+
+def _session_factory(engine):
+    return sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+
+class Replica:
+    """只读副本：引擎、会话工厂和最近一次检查结果"""
+    
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self.SessionLocal = _session_factory(engine)
+        self.healthy = True
+        self.lag_seconds: Optional[float] = None
+        self.checked_at: Optional[float] = None
+    
+    def status(self) -> Dict[str, Any]:
+        return {'name': self.name, 'healthy': self.healthy, 'lag_seconds': self.lag_seconds}
+
+
 class DatabaseManager:
     """TimescaleDB 数据库管理器"""
     
     def __init__(self):
         self.engine = None
         self.SessionLocal = None
+        self.replicas: List[Replica] = []
+        self._replica_cursor = count()
+        self._replica_lock = threading.Lock()
         self._initialize_engine()
     
     def _initialize_engine(self):
-        """初始化数据库引擎"""
+        """初始化数据库引擎（主库及配置的只读副本）"""
         try:
-            self.engine = create_engine(
-                db_config.database_url,
-                poolclass=QueuePool,
-                pool_size=db_config.db_pool_size,
-                max_overflow=db_config.db_max_overflow,
-                pool_timeout=db_config.db_pool_timeout,
-                pool_recycle=db_config.db_pool_recycle,
-                echo=False,  # 设置为 True 可以看到 SQL 语句
-                future=True
-            )
+            self.engine = _create_engine(db_config.database_url)
+            self.SessionLocal = _session_factory(self.engine)
             
-            self.SessionLocal = sessionmaker(
-                bind=self.engine,
-                autocommit=False,
-                autoflush=False
-            )
+            for url in db_config.replica_urls:
+                engine = _create_engine(
+                    url,
+                    pool_pre_ping=True,  # 副本重启或切换后丢弃失效连接
+                    connect_args={'connect_timeout': db_config.db_replica_connect_timeout}
+                )
+                self.replicas.append(Replica(engine.url.render_as_string(hide_password=True), engine))
             
-            logger.info("数据库引擎初始化成功")
+            logger.info(f"数据库引擎初始化成功（只读副本 {len(self.replicas)} 个）")
             
         except Exception as e:
             logger.error(f"数据库引擎初始化失败: {e}")
             raise
     
+    @property
+    def engines(self) -> list:
+        """主库和全部副本的引擎"""
+        return [self.engine] + [replica.engine for replica in self.replicas]
+    
+    def _check_replica(self, replica: Replica):
+        """检查副本可用性和复制延迟，延迟超过阈值时视为不可用"""
+        try:
+            with replica.engine.connect() as conn:
+                lag = float(conn.execute(text(REPLICA_LAG_SQL)).scalar() or 0)
+            healthy = lag <= db_config.db_replica_max_lag_seconds
+            replica.lag_seconds = round(lag, 3)
+            if not healthy and replica.healthy:
+                logger.warning(f"只读副本复制延迟 {lag:.1f} 秒，暂停分发: {replica.name}")
+        except Exception as e:
+            healthy = False
+            if replica.healthy:
+                logger.warning(f"只读副本不可用，暂停分发: {replica.name}, 错误: {e}")
+        
+        if healthy and not replica.healthy:
+            logger.info(f"只读副本恢复: {replica.name}")
+        replica.healthy = healthy
+    
+    def choose_replica(self) -> Optional[Replica]:
+        """
+        轮询选择一个健康的副本，没有可用副本时返回None（使用主库）
+        
+        每个副本的检查结果缓存 DB_REPLICA_CHECK_INTERVAL_SECONDS 秒
+        """
+        now = time.monotonic()
+        candidates = []
+        for replica in self.replicas:
+            with self._replica_lock:
+                due = (replica.checked_at is None
+                       or now - replica.checked_at >= db_config.db_replica_check_interval_seconds)
+                if due:
+                    replica.checked_at = now
+            if due:
+                self._check_replica(replica)
+            if replica.healthy:
+                candidates.append(replica)
+        
+        if not candidates:
+            return None
+        return candidates[next(self._replica_cursor) % len(candidates)]
+    
+    def read_engine(self):
+        """只读查询使用的引擎（可用副本之一，否则为主库）"""
+        replica = self.choose_replica() if self.replicas else None
+        return replica.engine if replica is not None else self.engine
+    
+    def replica_status(self) -> List[Dict[str, Any]]:
+        """各副本最近一次检查的状态"""
+        return [replica.status() for replica in self.replicas]
+    
     def test_connection(self) -> bool:
         """测试数据库连接"""
         try:
@@ -88,24 +220,83 @@ class DatabaseManager:
             raise
     
     @contextmanager
-    def get_session(self) -> Generator[Session, None, None]:
-        """获取数据库会话的上下文管理器"""
-        session = self.SessionLocal()
+    def statement_timeout(self, timeout_ms: int) -> Generator[TimeoutScope, None, None]:
+        """
+        语句超时作用域：作用域内（当前线程）打开的会话在事务内设置 statement_timeout，
+        超时的语句由数据库取消并立即归还连接；timeout_ms 为0时不限制
+        """
+        scope = TimeoutScope(timeout_ms)
+        previous = current_timeout_scope()
+        _local.timeout_scope = scope
         try:
+            yield scope
+        finally:
+            _local.timeout_scope = previous
+    
+    @staticmethod
+    def apply_statement_timeout(connection, timeout_ms: int):
+        """在当前事务内设置 statement_timeout（事务结束后恢复，不影响连接池中的连接）"""
+        connection.execute(
+            text("SELECT set_config('statement_timeout', :timeout, true)"),
+            {'timeout': f"{int(timeout_ms)}ms"}
+        )
+    
+    @contextmanager
+    def get_session(self, read_only: bool = False, timeout_ms: Optional[int] = None) -> Generator[Session, None, None]:
+        """
+        获取数据库会话的上下文管理器
+        
+        Args:
+            read_only: 只读查询（可能读到延迟不超过 DB_REPLICA_MAX_LAG_SECONDS 的数据）
+                时使用可用的只读副本；写入和需要读到刚写入数据的查询使用主库
+            timeout_ms: 语句超时（毫秒），为空时使用当前语句超时作用域的设置
+        """
+        scope = current_timeout_scope()
+        if timeout_ms is None and scope is not None:
+            timeout_ms = scope.timeout_ms
+        
+        replica = self.choose_replica() if read_only and self.replicas else None
+        session = self._replica_session(replica) if replica is not None else None
+        if session is None:
+            replica = None
+            session = self.SessionLocal()
+        try:
+            if timeout_ms:
+                self.apply_statement_timeout(session, timeout_ms)
             yield session
             session.commit()
         except Exception as e:
             session.rollback()
+            if is_statement_timeout(e):
+                if scope is not None:
+                    scope.timed_out = True
+                logger.warning(f"数据库语句超过 {timeout_ms} 毫秒，已被取消")
+            if replica is not None and isinstance(e, DBAPIError) and e.connection_invalidated:
+                # 副本连接中断：下次检查前不再分发到该副本
+                replica.healthy = False
+                logger.warning(f"只读副本连接中断，暂停分发: {replica.name}")
             logger.error(f"数据库会话出错: {e}")
             raise
         finally:
             session.close()
     
+    def _replica_session(self, replica: Replica) -> Optional[Session]:
+        """在副本上打开会话并立即获取连接；副本不可用时返回None（回退到主库）"""
+        session = replica.SessionLocal()
+        try:
+            session.connection()
+            return session
+        except DBAPIError as e:
+            session.close()
+            replica.healthy = False
+            logger.warning(f"只读副本连接失败，回退到主库: {replica.name}, 错误: {e}")
+            return None
+    
     def close(self):
         """关闭数据库连接"""
-        if self.engine:
-            self.engine.dispose()
-            logger.info("数据库连接已关闭")
+        for engine in self.engines:
+            engine.dispose()
+        logger.info("数据库连接已关闭")
 
 
 # 全局数据库管理器实例
@@ -0,0 +1,6 @@
+-- custom_scripts 增加脚本成本估算列
+-- 保存/更新脚本时由静态分析写入（回看天数 × 复杂度系数），准入控制据此估算请求成本
+
+ALTER TABLE custom_scripts ADD COLUMN IF NOT EXISTS cost_estimate INTEGER;
+
+COMMENT ON COLUMN custom_scripts.cost_estimate IS '单只股票的估算计算成本（静态分析）'
@@ -0,0 +1,35 @@
+-- 创建脚本计算任务队列表
+-- Web进程入队，后台计算进程（start_worker.py）使用 FOR UPDATE SKIP LOCKED 抢占执行
+
+CREATE TABLE IF NOT EXISTS calculation_tasks (
+    -- 主键
+    id SERIAL PRIMARY KEY,
+    
+    -- 任务状态：pending / running / succeeded / failed
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    
+    -- 请求参数与计算结果
+    payload JSONB NOT NULL,
+    result JSONB,
+    error TEXT,
+    
+    -- 执行信息
+    worker_id VARCHAR(100),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    
+    -- 时间戳
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    started_at TIMESTAMP,
+    heartbeat_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- 创建索引（抢占任务时按状态和ID顺序扫描）
+CREATE INDEX IF NOT EXISTS idx_calculation_tasks_status ON calculation_tasks(status, id);
+
+-- 添加注释
+COMMENT ON TABLE calculation_tasks IS '脚本计算任务队列';
+COMMENT ON COLUMN calculation_tasks.status IS '任务状态';
+COMMENT ON COLUMN calculation_tasks.payload IS '任务参数';
+COMMENT ON COLUMN calculation_tasks.result IS '计算结果';
+COMMENT ON COLUMN calculation_tasks.heartbeat_at IS '最近心跳时间，超时后任务重新入队';
@@ -14,6 +14,9 @@ CREATE TABLE IF NOT EXISTS custom_scripts (
     -- Python脚本代码
     code TEXT NOT NULL,
     
+    -- 单只股票的估算计算成本（静态分析）
+    cost_estimate INTEGER,
+    
     -- 时间戳
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
@@ -29,6 +32,7 @@ COMMENT ON COLUMN custom_scripts.id IS '主键ID';
 COMMENT ON COLUMN custom_scripts.name IS '脚本名称';
 COMMENT ON COLUMN custom_scripts.description IS '脚本描述';
 COMMENT ON COLUMN custom_scripts.code IS 'Python脚本代码';
+COMMENT ON COLUMN custom_scripts.cost_estimate IS '单只股票的估算计算成本（静态分析）';
 COMMENT ON COLUMN custom_scripts.created_at IS '创建时间';
 COMMENT ON COLUMN custom_scripts.updated_at IS '更新时间';
 
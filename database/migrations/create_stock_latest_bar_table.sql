@@ -0,0 +1,103 @@
+-- 创建 stock_latest_bar 表：每只股票一行的最新行情
+-- 替代 /list 等查询中对 stock_daily_data 的逐股票 LATERAL 探测（历史增长、分块压缩后越来越慢）
+-- 由 stock_daily_data 上的行级触发器实时维护；批量导入或修复数据后可执行
+--   SELECT refresh_stock_latest_bar();
+-- 全量重建（或 python database/migrations/run_migrations.py --refresh-latest-bar）
+-- 创建触发器需要锁住行情表，本迁移不在应用启动时执行，由部署时运行 run_migrations.py 完成
+-- （run_migrations.py 在事务级咨询锁内执行，并发执行时依次进行）
+
+CREATE TABLE IF NOT EXISTS stock_latest_bar (
+    symbol VARCHAR(20) PRIMARY KEY,
+    trade_date TIMESTAMP NOT NULL,
+    close_price NUMERIC(10,4),
+    volume BIGINT,
+    price_change_pct NUMERIC(8,4),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- 添加注释
+COMMENT ON TABLE stock_latest_bar IS '每只股票的最新一条行情（由触发器维护）';
+COMMENT ON COLUMN stock_latest_bar.symbol IS '股票代码';
+COMMENT ON COLUMN stock_latest_bar.trade_date IS '最新交易日期';
+COMMENT ON COLUMN stock_latest_bar.close_price IS '收盘价';
+COMMENT ON COLUMN stock_latest_bar.volume IS '成交量';
+COMMENT ON COLUMN stock_latest_bar.price_change_pct IS '涨跌幅';
+COMMENT ON COLUMN stock_latest_bar.updated_at IS '更新时间';
+
+-- 重建最新行情：p_symbol 为空时重建全部股票（每只股票一次索引探测），否则只重建该股票
+CREATE OR REPLACE FUNCTION refresh_stock_latest_bar(p_symbol VARCHAR DEFAULT NULL) RETURNS INTEGER AS $$
+DECLARE
+    affected INTEGER;
+BEGIN
+    IF p_symbol IS NULL THEN
+        DELETE FROM stock_latest_bar;
+        INSERT INTO stock_latest_bar (symbol, trade_date, close_price, volume, price_change_pct, updated_at)
+        SELECT si.symbol, lp.trade_date, lp.close_price, lp.volume, lp.price_change_pct, NOW()
+        FROM stock_info si
+        CROSS JOIN LATERAL (
+            SELECT trade_date, close_price, volume, price_change_pct
+            FROM stock_daily_data sd
+            WHERE sd.symbol = si.symbol
+            ORDER BY sd.trade_date DESC
+            LIMIT 1
+        ) lp;
+    ELSE
+        DELETE FROM stock_latest_bar WHERE symbol = p_symbol;
+        INSERT INTO stock_latest_bar (symbol, trade_date, close_price, volume, price_change_pct, updated_at)
+        SELECT symbol, trade_date, close_price, volume, price_change_pct, NOW()
+        FROM stock_daily_data
+        WHERE symbol = p_symbol
+        ORDER BY trade_date DESC
+        LIMIT 1;
+    END IF;
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 触发器函数：新增/更新行情时保留日期最新的一条；删除或改动当前最新行时重建该股票
+CREATE OR REPLACE FUNCTION stock_latest_bar_sync() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        IF EXISTS (SELECT 1 FROM stock_latest_bar WHERE symbol = OLD.symbol AND trade_date = OLD.trade_date) THEN
+            PERFORM refresh_stock_latest_bar(OLD.symbol);
+        END IF;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'UPDATE' AND (OLD.symbol <> NEW.symbol OR OLD.trade_date > NEW.trade_date) THEN
+        IF EXISTS (SELECT 1 FROM stock_latest_bar WHERE symbol = OLD.symbol AND trade_date = OLD.trade_date) THEN
+            PERFORM refresh_stock_latest_bar(OLD.symbol);
+        END IF;
+    END IF;
+
+    INSERT INTO stock_latest_bar (symbol, trade_date, close_price, volume, price_change_pct, updated_at)
+    VALUES (NEW.symbol, NEW.trade_date, NEW.close_price, NEW.volume, NEW.price_change_pct, NOW())
+    ON CONFLICT (symbol) DO UPDATE SET
+        trade_date = EXCLUDED.trade_date,
+        close_price = EXCLUDED.close_price,
+        volume = EXCLUDED.volume,
+        price_change_pct = EXCLUDED.price_change_pct,
+        updated_at = EXCLUDED.updated_at
+    WHERE stock_latest_bar.trade_date <= EXCLUDED.trade_date;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 行级触发器（TimescaleDB 超表同样支持，会自动应用到各分块）
+-- 已存在时不重建，避免每次迁移都对行情表及其全部分块加锁
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_trigger
+        WHERE tgname = 'trg_stock_latest_bar' AND tgrelid = 'stock_daily_data'::regclass
+    ) THEN
+        CREATE TRIGGER trg_stock_latest_bar
+            AFTER INSERT OR UPDATE OR DELETE ON stock_daily_data
+            FOR EACH ROW EXECUTE FUNCTION stock_latest_bar_sync();
+    END IF;
+END
+$$;
+
+-- 首次创建时填充（已有数据时跳过）
+SELECT refresh_stock_latest_bar() WHERE NOT EXISTS (SELECT 1 FROM stock_latest_bar);
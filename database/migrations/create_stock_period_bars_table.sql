@@ -0,0 +1,154 @@
+-- 创建 stock_period_bars 表：由 stock_daily_data 汇总的周线（1w）和月线（1M）
+-- 长周期图表和因子按周/月读取时只需读取日线的 1/5 ~ 1/20 行，不再在客户端或脚本中自行汇总。
+-- 使用普通表而非 TimescaleDB 连续聚合，安装与未安装 TimescaleDB 时行为一致；
+-- 与 stock_latest_bar 相同，由 stock_daily_data 上的行级触发器维护（只重算变更行所在的周和月）。
+-- 大批量导入历史行情时可先禁用触发器，导入后全量重建：
+--   ALTER TABLE stock_daily_data DISABLE TRIGGER trg_stock_period_bars;
+--   ...导入...
+--   ALTER TABLE stock_daily_data ENABLE TRIGGER trg_stock_period_bars;
+--   SELECT refresh_stock_period_bars();
+-- （或 python database/migrations/run_migrations.py --refresh-period-bars）
+-- 与 stock_latest_bar 相同，本迁移不在应用启动时执行，由部署时运行 run_migrations.py 完成
+
+CREATE TABLE IF NOT EXISTS stock_period_bars (
+    symbol VARCHAR(20) NOT NULL,
+    period VARCHAR(2) NOT NULL,
+    period_start DATE NOT NULL,
+    trade_date TIMESTAMP NOT NULL,
+    stock_name VARCHAR(100),
+    open_price NUMERIC(10,4),
+    high_price NUMERIC(10,4),
+    low_price NUMERIC(10,4),
+    close_price NUMERIC(10,4),
+    volume BIGINT,
+    turnover NUMERIC(20,2),
+    price_change NUMERIC(10,4),
+    price_change_pct NUMERIC(8,4),
+    premium_rate NUMERIC(8,4),
+    market_code VARCHAR(10),
+    bar_count INTEGER,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (symbol, period, period_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_period_bars_date ON stock_period_bars (symbol, period, trade_date);
+
+-- 添加注释
+COMMENT ON TABLE stock_period_bars IS '周线/月线行情（由 stock_daily_data 汇总，触发器维护）';
+COMMENT ON COLUMN stock_period_bars.symbol IS '股票代码';
+COMMENT ON COLUMN stock_period_bars.period IS '周期：1w 周线 / 1M 月线';
+COMMENT ON COLUMN stock_period_bars.period_start IS '周期开始日期（周一 / 每月1日）';
+COMMENT ON COLUMN stock_period_bars.trade_date IS '周期内最后一个交易日';
+COMMENT ON COLUMN stock_period_bars.open_price IS '周期内第一个交易日的开盘价';
+COMMENT ON COLUMN stock_period_bars.high_price IS '周期内最高价';
+COMMENT ON COLUMN stock_period_bars.low_price IS '周期内最低价';
+COMMENT ON COLUMN stock_period_bars.close_price IS '周期内最后一个交易日的收盘价';
+COMMENT ON COLUMN stock_period_bars.volume IS '周期内成交量合计';
+COMMENT ON COLUMN stock_period_bars.turnover IS '周期内成交额合计';
+COMMENT ON COLUMN stock_period_bars.price_change IS '相对上一周期收盘价的涨跌额';
+COMMENT ON COLUMN stock_period_bars.price_change_pct IS '相对上一周期收盘价的涨跌幅';
+COMMENT ON COLUMN stock_period_bars.bar_count IS '周期内交易日数';
+COMMENT ON COLUMN stock_period_bars.updated_at IS '更新时间';
+
+-- 重建周线/月线：
+--   p_symbol 为空时重建全部股票，否则只重建该股票；
+--   p_day 为空时重建全部周期，否则只重建包含该日期的一周和一个月（触发器使用）。
+-- 上一周期收盘价由周期第一个交易日的 close_price - price_change 得到，每个周期可独立重算。
+CREATE OR REPLACE FUNCTION refresh_stock_period_bars(p_symbol VARCHAR DEFAULT NULL, p_day TIMESTAMP DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    period_code TEXT;
+    unit TEXT;
+    conditions TEXT;
+    range_start TIMESTAMP;
+    range_end TIMESTAMP;
+    inserted INTEGER;
+    affected INTEGER := 0;
+BEGIN
+    FOR period_code, unit IN SELECT * FROM (VALUES ('1w', 'week'), ('1M', 'month')) AS p(code, unit) LOOP
+        conditions := 'TRUE';
+        IF p_symbol IS NOT NULL THEN
+            conditions := conditions || ' AND symbol = $1';
+        END IF;
+        IF p_day IS NOT NULL THEN
+            range_start := date_trunc(unit, p_day);
+            range_end := range_start + ('1 ' || unit)::INTERVAL;
+            conditions := conditions || ' AND trade_date >= $2 AND trade_date < $3';
+        END IF;
+
+        EXECUTE format(
+            'DELETE FROM stock_period_bars WHERE period = %L AND %s',
+            period_code, replace(conditions, 'trade_date', 'period_start')
+        ) USING p_symbol, range_start, range_end;
+
+        EXECUTE format($sql$
+            INSERT INTO stock_period_bars (
+                symbol, period, period_start, trade_date, stock_name,
+                open_price, high_price, low_price, close_price, volume, turnover,
+                price_change, price_change_pct, premium_rate, market_code, bar_count, updated_at
+            )
+            SELECT symbol, %L, period_start, trade_date, stock_name,
+                   open_price, high_price, low_price, close_price, volume, turnover,
+                   close_price - prev_close,
+                   ROUND((close_price - prev_close) / NULLIF(prev_close, 0) * 100, 4),
+                   premium_rate, market_code, bar_count, NOW()
+            FROM (
+                SELECT symbol,
+                       date_trunc(%L, trade_date)::date AS period_start,
+                       MAX(trade_date) AS trade_date,
+                       (array_agg(stock_name ORDER BY trade_date DESC))[1] AS stock_name,
+                       (array_agg(open_price ORDER BY trade_date))[1] AS open_price,
+                       MAX(high_price) AS high_price,
+                       MIN(low_price) AS low_price,
+                       (array_agg(close_price ORDER BY trade_date DESC))[1] AS close_price,
+                       SUM(volume) AS volume,
+                       SUM(turnover) AS turnover,
+                       (array_agg(close_price - price_change ORDER BY trade_date))[1] AS prev_close,
+                       (array_agg(premium_rate ORDER BY trade_date DESC))[1] AS premium_rate,
+                       (array_agg(market_code ORDER BY trade_date DESC))[1] AS market_code,
+                       COUNT(*) AS bar_count
+                FROM stock_daily_data
+                WHERE %s
+                GROUP BY symbol, date_trunc(%L, trade_date)
+            ) bars
+            $sql$, period_code, unit, conditions, unit
+        ) USING p_symbol, range_start, range_end;
+
+        GET DIAGNOSTICS inserted = ROW_COUNT;
+        affected := affected + inserted;
+    END LOOP;
+    RETURN affected;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 触发器函数：重算变更前后的行所在的周和月
+CREATE OR REPLACE FUNCTION stock_period_bars_sync() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM refresh_stock_period_bars(OLD.symbol, OLD.trade_date);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE'
+            AND (OLD.symbol, OLD.trade_date) IS DISTINCT FROM (NEW.symbol, NEW.trade_date)) THEN
+        PERFORM refresh_stock_period_bars(NEW.symbol, NEW.trade_date);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 行级触发器（TimescaleDB 超表同样支持，会自动应用到各分块）
+-- 已存在时不重建，避免每次迁移都对行情表及其全部分块加锁
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_trigger
+        WHERE tgname = 'trg_stock_period_bars' AND tgrelid = 'stock_daily_data'::regclass
+    ) THEN
+        CREATE TRIGGER trg_stock_period_bars
+            AFTER INSERT OR UPDATE OR DELETE ON stock_daily_data
+            FOR EACH ROW EXECUTE FUNCTION stock_period_bars_sync();
+    END IF;
+END
+$$;
+
+-- 首次创建时填充（已有数据时跳过）
+SELECT refresh_stock_period_bars() WHERE NOT EXISTS (SELECT 1 FROM stock_period_bars);
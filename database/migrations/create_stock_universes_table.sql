@@ -0,0 +1,39 @@
+-- 创建股票范围（自选股/股票池）表
+-- 静态范围保存股票列表，规则范围保存筛选条件；成员列表预先计算并缓存，
+-- stock_info 变化后（members_version 不一致）自动重新计算
+
+CREATE TABLE IF NOT EXISTS stock_universes (
+    -- 主键
+    id SERIAL PRIMARY KEY,
+    
+    -- 范围名称与描述
+    name VARCHAR(100) NOT NULL,
+    description TEXT,
+    
+    -- 范围类型：static / rule
+    kind VARCHAR(10) NOT NULL,
+    
+    -- 定义：静态股票列表 或 筛选规则
+    symbols JSONB,
+    rules JSONB,
+    
+    -- 预计算的成员列表
+    members JSONB,
+    members_version VARCHAR(100),
+    members_refreshed_at TIMESTAMP,
+    
+    -- 时间戳
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+-- 创建索引
+CREATE INDEX IF NOT EXISTS idx_stock_universes_name ON stock_universes(name);
+
+-- 添加注释
+COMMENT ON TABLE stock_universes IS '服务端保存的股票范围';
+COMMENT ON COLUMN stock_universes.kind IS '范围类型（static/rule）';
+COMMENT ON COLUMN stock_universes.symbols IS '静态范围的股票列表';
+COMMENT ON COLUMN stock_universes.rules IS '规则范围的筛选条件';
+COMMENT ON COLUMN stock_universes.members IS '预计算的成员股票列表';
+COMMENT ON COLUMN stock_universes.members_version IS '计算成员时的 stock_info 数据版本';
@@ -1,13 +1,20 @@
 """
 数据库迁移脚本
 
-自动创建 custom_scripts 表（如果不存在）
+自动创建 custom_scripts、calculation_tasks、stock_universes、stock_latest_bar、stock_period_bars 等表（如果不存在）
+
+应用启动时只执行 run_app_migrations；stock_daily_data 上的触发器和首次回填需在部署时执行：
+    python database/migrations/run_migrations.py
 """
 
+import re
+import sys
 import logging
 from sqlalchemy import inspect, text
 from database.connection import db_manager, Base
 from app.models.custom_script import CustomScript
+from app.models.calculation_task import CalculationTask
+from app.models.stock_universe import StockUniverse
 
 logger = logging.getLogger(__name__)
 
@@ -22,55 +29,279 @@ def check_table_exists(table_name: str) -> bool:
 
 def create_custom_scripts_table():
     """创建 custom_scripts 表"""
+    return create_table_from_sql(
+        'custom_scripts',
+        'database/migrations/create_custom_scripts_table.sql',
+        CustomScript
+    )
+
+
+def create_calculation_tasks_table():
+    """创建 calculation_tasks 任务队列表"""
+    return create_table_from_sql(
+        'calculation_tasks',
+        'database/migrations/create_calculation_tasks_table.sql',
+        CalculationTask
+    )
+
+
+def create_stock_universes_table():
+    """创建 stock_universes 股票范围表"""
+    return create_table_from_sql(
+        'stock_universes',
+        'database/migrations/create_stock_universes_table.sql',
+        StockUniverse
+    )
+
+
+def add_custom_scripts_cost_estimate_column():
+    """custom_scripts 增加 cost_estimate 列（已存在时跳过）"""
+    return run_sql_file('database/migrations/add_custom_scripts_cost_estimate.sql')
+
+
+def check_trigger_exists(trigger_name: str, table_name: str = 'stock_daily_data') -> bool:
+    """检查表上的触发器是否存在（表不存在时返回False）"""
+    with db_manager.get_session() as session:
+        return session.execute(text("""
+            SELECT EXISTS (
+                SELECT 1 FROM pg_trigger
+                WHERE tgname = :trigger_name AND tgrelid = to_regclass(:table_name)
+            )
+        """), {'trigger_name': trigger_name, 'table_name': table_name}).scalar()
+
+
+def create_stock_latest_bar_table():
+    """创建 stock_latest_bar 表及其维护触发器（可重复执行，触发器已存在时不重建，表为空时填充）"""
+    return run_sql_file('database/migrations/create_stock_latest_bar_table.sql')
+
+
+def refresh_stock_latest_bar() -> bool:
+    """全量重建 stock_latest_bar（批量导入或修复行情数据后执行）"""
+    try:
+        with db_manager.get_session() as session:
+            count = session.execute(text("SELECT refresh_stock_latest_bar()")).scalar()
+            session.commit()
+        logger.info(f"✅ stock_latest_bar 重建完成: {count} 只股票")
+        return True
+    except Exception as e:
+        logger.error(f"❌ stock_latest_bar 重建失败: {e}")
+        return False
+
+
+def create_stock_period_bars_table():
+    """创建 stock_period_bars 周线/月线表及其维护触发器（可重复执行，触发器已存在时不重建，表为空时填充）"""
+    return run_sql_file('database/migrations/create_stock_period_bars_table.sql')
+
+
+def refresh_stock_period_bars() -> bool:
+    """全量重建 stock_period_bars（批量导入或修复行情数据后执行）"""
+    try:
+        with db_manager.get_session() as session:
+            count = session.execute(text("SELECT refresh_stock_period_bars()")).scalar()
+            session.commit()
+        logger.info(f"✅ stock_period_bars 重建完成: {count} 条周线/月线")
+        return True
+    except Exception as e:
+        logger.error(f"❌ stock_period_bars 重建失败: {e}")
+        return False
+
+
+# 行情表上的触发器迁移：触发器名 → 迁移函数
+# 创建触发器会锁住 stock_daily_data（阻塞同步服务写入），首次执行还要全量回填，
+# 只在部署时执行 run_migrations.py，不在应用启动时执行
+MARKET_DATA_TRIGGERS = {
+    'trg_stock_latest_bar': create_stock_latest_bar_table,
+    'trg_stock_period_bars': create_stock_period_bars_table
+}
+
+
+class MarketDataTablesMissing(RuntimeError):
+    """行情派生表（stock_latest_bar、stock_period_bars）或其触发器尚未创建"""
+
+
+def run_app_migrations() -> bool:
+    """
+    应用启动时执行的迁移：只创建应用自己的表
+
+    每个工作进程启动时都会执行，必须轻量且可并发。行情派生表及其触发器只在部署时创建，
+    确认缺失时抛出 MarketDataTablesMissing 使应用启动失败（/list、/query 等接口依赖这些表）；
+    无法检查（如数据库暂时不可用）时只记录警告。
+
+    Raises:
+        MarketDataTablesMissing: 行情表触发器不存在
+    """
+    results = [
+        create_custom_scripts_table(),
+        add_custom_scripts_cost_estimate_column(),
+        create_calculation_tasks_table(),
+        create_stock_universes_table()
+    ]
+
+    missing = []
+    for trigger_name in MARKET_DATA_TRIGGERS:
+        try:
+            if not check_trigger_exists(trigger_name):
+                missing.append(trigger_name)
+        except Exception as e:
+            logger.warning(f"⚠️ 检查触发器 {trigger_name} 失败: {e}")
+
+    if missing:
+        raise MarketDataTablesMissing(
+            f"行情表触发器不存在: {', '.join(missing)}，请先执行 python database/migrations/run_migrations.py"
+        )
+
+    return all(results)
+
+
+def run_all_migrations() -> bool:
+    """运行所有迁移（部署时执行，包括行情表触发器和首次回填）"""
+    results = [
+        create_custom_scripts_table(),
+        add_custom_scripts_cost_estimate_column(),
+        create_calculation_tasks_table(),
+        create_stock_universes_table()
+    ]
+    results += [migration() for migration in MARKET_DATA_TRIGGERS.values()]
+    return all(results)
+
+
+def split_sql_statements(sql_content: str) -> list:
+    """
+    按分号拆分 SQL 语句
+    
+    忽略 -- 注释、字符串和 $$ / $tag$ 引用块（函数体）中的分号。
+    """
+    statements = []
+    current = []
+    i = 0
+    length = len(sql_content)
+    while i < length:
+        char = sql_content[i]
+        if sql_content.startswith('--', i):
+            end = sql_content.find('\n', i)
+            i = length if end == -1 else end
+            continue
+        if char == "'":
+            end = i + 1
+            while True:
+                end = sql_content.find("'", end)
+                if end == -1:
+                    end = length
+                    break
+                if sql_content.startswith("''", end):
+                    end += 2
+                    continue
+                break
+            current.append(sql_content[i:end + 1])
+            i = end + 1
+            continue
+        if char == '$':
+            match = re.match(r'\$[A-Za-z_]*\$', sql_content[i:])
+            if match:
+                tag = match.group(0)
+                end = sql_content.find(tag, i + len(tag))
+                end = length if end == -1 else end + len(tag)
+                current.append(sql_content[i:end])
+                i = end
+                continue
+        if char == ';':
+            statement = ''.join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    
+    statement = ''.join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def run_sql_file(sql_file: str) -> bool:
+    """
+    执行迁移 SQL 文件（语句需可重复执行，如 ADD COLUMN IF NOT EXISTS）
+    
+    在事务级咨询锁内执行：多个进程同时执行同一迁移时依次进行，
+    避免并发 DDL 冲突（tuple concurrently updated、死锁）和重复回填。
+    
+    Args:
+        sql_file: SQL 文件路径
+    """
+    try:
+        with open(sql_file, 'r', encoding='utf-8') as f:
+            sql_content = f.read()
+        
+        with db_manager.get_session() as session:
+            session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {'name': sql_file})
+            for stmt in split_sql_statements(sql_content):
+                session.execute(text(stmt))
+            session.commit()
+        
+        logger.info(f"✅ 迁移执行成功: {sql_file}")
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ 迁移执行失败: {sql_file}, 错误: {e}")
+        return False
+
+
+def create_table_from_sql(table_name: str, sql_file: str, model) -> bool:
+    """
+    执行 SQL 文件创建表，SQL 文件缺失时使用 SQLAlchemy 模型建表
+    
+    Args:
+        table_name: 表名
+        sql_file: 建表 SQL 文件路径
+        model: 对应的 SQLAlchemy 模型
+    """
     try:
         # 检查表是否已存在
-        if check_table_exists('custom_scripts'):
-            logger.info("✅ custom_scripts 表已存在，跳过创建")
+        if check_table_exists(table_name):
+            logger.info(f"✅ {table_name} 表已存在，跳过创建")
             return True
         
-        logger.info("🔄 开始创建 custom_scripts 表...")
+        logger.info(f"🔄 开始创建 {table_name} 表...")
         
         # 读取 SQL 文件
-        sql_file = 'database/migrations/create_custom_scripts_table.sql'
-        
         try:
             with open(sql_file, 'r', encoding='utf-8') as f:
                 sql_content = f.read()
         except FileNotFoundError:
             logger.warning(f"SQL文件未找到: {sql_file}")
             # 使用 SQLAlchemy 直接创建表
-            return create_table_via_sqlalchemy()
+            return create_table_via_sqlalchemy(model)
         
         # 执行 SQL
         with db_manager.get_session() as session:
             # 分割SQL语句并执行
-            statements = [s.strip() for s in sql_content.split(';') if s.strip()]
-            for stmt in statements:
-                if stmt:
-                    session.execute(text(stmt))
+            for stmt in split_sql_statements(sql_content):
+                session.execute(text(stmt))
             session.commit()
         
-        logger.info("✅ custom_scripts 表创建成功")
+        logger.info(f"✅ {table_name} 表创建成功")
         return True
         
     except Exception as e:
-        logger.error(f"❌ 创建 custom_scripts 表失败: {e}")
+        logger.error(f"❌ 创建 {table_name} 表失败: {e}")
         return False
 
 
-def create_table_via_sqlalchemy():
+def create_table_via_sqlalchemy(model=CustomScript):
     """使用 SQLAlchemy 创建表（备用方法）"""
+    table_name = model.__tablename__
     try:
-        logger.info("🔄 使用 SQLAlchemy 创建 custom_scripts 表...")
+        logger.info(f"🔄 使用 SQLAlchemy 创建 {table_name} 表...")
         
         # 创建表
-        CustomScript.__table__.create(db_manager.engine, checkfirst=True)
+        model.__table__.create(db_manager.engine, checkfirst=True)
         
-        logger.info("✅ custom_scripts 表创建成功（通过SQLAlchemy）")
+        logger.info(f"✅ {table_name} 表创建成功（通过SQLAlchemy）")
         return True
         
     except Exception as e:
-        logger.error(f"❌ 创建 custom_scripts 表失败: {e}")
+        logger.error(f"❌ 创建 {table_name} 表失败: {e}")
         return False
 
 
@@ -81,8 +312,14 @@ if __name__ == '__main__':
     # 设置日志
     setup_logging()
     
-    # 创建表
-    success = create_custom_scripts_table()
+    # --refresh-latest-bar / --refresh-period-bars：只全量重建 stock_latest_bar / stock_period_bars
+    if '--refresh-latest-bar' in sys.argv[1:]:
+        success = refresh_stock_latest_bar()
+    elif '--refresh-period-bars' in sys.argv[1:]:
+        success = refresh_stock_period_bars()
+    else:
+        # 创建表
+        success = run_all_migrations()
     
     if success:
         print("✅ 数据库迁移完成")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+离线批量执行脚本计算
+
+在服务进程之外对全市场（或指定范围）股票执行脚本，
+使用全部CPU核心并行计算，结果写入 CSV 或 Parquet 文件。
+中断后使用相同参数重新运行即可从已完成的分块继续。
+
+用法：
+    python run_batch.py --script-id 1 -o results.csv
+    python run_batch.py --script-file momentum.py --universe-id 3 -o momentum.parquet
+    python run_batch.py --script-id 1 --prefilter '{"min_volume": 100000}' -n 16 -o results.csv
+"""
+
+import sys
+import json
+import logging
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+# 逐只股票的脚本执行日志过多，批量计算时只保留警告
+logging.getLogger('app.services.sandbox_executor').setLevel(logging.WARNING)
+
+
+def load_script(args) -> str:
+    """从数据库或文件加载脚本代码"""
+    if args.script_file:
+        with open(args.script_file, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    from app.models.custom_script import CustomScriptService
+    saved_script = CustomScriptService.get_by_id(args.script_id)
+    if not saved_script:
+        raise ValueError(f"脚本ID {args.script_id} 不存在")
+    logger.info(f"加载保存的脚本: ID={args.script_id}, name={saved_script.name}")
+    return saved_script.code
+
+
+def resolve_symbols(args) -> list:
+    """解析股票范围：指定列表 / 保存的股票范围 / 全部活跃股票（可预筛选）"""
+    if args.symbols:
+        return [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+
+    if args.universe_id is not None:
+        from app.models.stock_universe import StockUniverseService
+        universe = StockUniverseService.get_by_id(args.universe_id)
+        if not universe:
+            raise ValueError(f"股票范围ID {args.universe_id} 不存在")
+        return universe['members']
+
+    from app.services.calculation_service import CalculationService
+    from app.services.universe_filter import UniverseFilter
+    prefilter = UniverseFilter.from_dict(json.loads(args.prefilter)) if args.prefilter else None
+    return CalculationService().resolve_symbols([], prefilter)
+
+
+def main():
+    """主启动函数"""
+    parser = argparse.ArgumentParser(description="离线批量执行脚本计算")
+    script_group = parser.add_mutually_exclusive_group(required=True)
+    script_group.add_argument('--script-id', type=int, help="保存的脚本ID")
+    script_group.add_argument('--script-file', help="脚本文件路径")
+    symbol_group = parser.add_mutually_exclusive_group()
+    symbol_group.add_argument('--symbols', help="逗号分隔的股票代码（默认全部活跃股票）")
+    symbol_group.add_argument('--universe-id', type=int, help="保存的股票范围ID")
+    symbol_group.add_argument('--prefilter', help="全部活跃股票的筛选条件（JSON，格式同 /execute 的 prefilter）")
+    parser.add_argument('-o', '--output', required=True, help="输出文件（.csv 或 .parquet）")
+    parser.add_argument('-n', '--workers', type=int, default=None, help="进程数（默认CPU核心数）")
+    parser.add_argument('--chunk-size', type=int, default=200, help="每个分块的股票数（默认200）")
+    parser.add_argument('--restart', action='store_true', help="丢弃已有中间结果重新计算")
+    parser.add_argument('--keep-parts', action='store_true', help="完成后保留中间结果目录")
+    args = parser.parse_args()
+
+    try:
+        from app.services.sandbox_executor import SandboxExecutor
+        from app.services.batch_runner import BatchRunner
+
+        script = load_script(args)
+        is_valid, syntax_error = SandboxExecutor().validate_syntax(script)
+        if not is_valid:
+            raise ValueError(f"脚本语法错误: {syntax_error}")
+
+        symbols = resolve_symbols(args)
+        if not symbols:
+            raise ValueError("没有需要计算的股票")
+
+        logger.info(f"🚀 开始批量计算: {len(symbols)} 只股票，输出 {args.output}")
+        runner = BatchRunner(
+            script, symbols, args.output,
+            workers=args.workers,
+            chunk_size=args.chunk_size
+        )
+        runner.run(restart=args.restart, keep_parts=args.keep_parts)
+
+    except KeyboardInterrupt:
+        logger.warning("⚠️  已中断，使用相同参数重新运行即可继续")
+        sys.exit(130)
+    except ImportError as e:
+        logger.error(f"❌ 导入错误: {e}")
+        logger.error("请确保已安装所有依赖包: pip install -r requirements.txt")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"❌ 批量计算失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
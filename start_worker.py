@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+启动后台脚本计算进程
+
+计算进程从 calculation_tasks 队列抢占任务并写回结果，
+Web进程只负责入队（/execute 的 async 模式）和读取结果（/tasks/<id>）。
+
+用法：
+    python start_worker.py            # 启动1个计算进程
+    python start_worker.py -n 8       # 启动8个计算进程
+"""
+
+import os
+import sys
+import signal
+import logging
+import argparse
+import multiprocessing
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def run_worker():
+    """在当前进程中运行计算进程主循环"""
+    from app.services.calculation_worker import CalculationWorker
+
+    worker = CalculationWorker()
+
+    # SIGTERM/SIGINT：完成当前任务后退出
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+
+    worker.run_forever()
+
+
+def main():
+    """主启动函数"""
+    parser = argparse.ArgumentParser(description="启动后台脚本计算进程")
+    parser.add_argument('-n', '--workers', type=int, default=1, help="计算进程数量（默认1）")
+    args = parser.parse_args()
+
+    try:
+        logger.info(f"🚀 启动 {args.workers} 个脚本计算进程...")
+        logger.info("⚠️  停止: 发送 SIGTERM/Ctrl+C，计算进程会在当前任务完成后退出")
+
+        if args.workers <= 1:
+            run_worker()
+            return
+
+        processes = [
+            multiprocessing.Process(target=run_worker, name=f"calculation-worker-{i}")
+            for i in range(args.workers)
+        ]
+        for process in processes:
+            process.start()
+
+        # 主进程忽略信号，由子进程各自处理后退出
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda signum, frame: [
+            os.kill(p.pid, signal.SIGTERM) for p in processes if p.is_alive()
+        ])
+
+        for process in processes:
+            process.join()
+
+    except ImportError as e:
+        logger.error(f"❌ 导入错误: {e}")
+        logger.error("请确保已安装所有依赖包: pip install -r requirements.txt")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"❌ 启动失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
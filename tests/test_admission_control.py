@@ -0,0 +1,89 @@
+"""
+准入控制测试
+
+验证请求成本估算、重请求并发上限和跨进程槽位
+"""
+
+import pytest
+from config.settings import AdmissionConfig
+from app.services.admission_control import (
+    AdmissionController,
+    AdmissionRejected,
+    estimate_script_lookback
+)
+
+
+def make_controller(tmp_path, **overrides):
+    """创建使用临时锁目录的准入控制器"""
+    settings = {
+        'admission_enabled': True,
+        'admission_heavy_cost_threshold': 1000,
+        'admission_heavy_slots_per_process': 2,
+        'admission_heavy_slots_global': 1,
+        'admission_lock_dir': str(tmp_path),
+        'admission_retry_after_seconds': 7
+    }
+    settings.update(overrides)
+    return AdmissionController(AdmissionConfig(**settings))
+
+
+class TestAdmissionControl:
+    """准入控制测试类"""
+
+    def test_lookback_estimation(self):
+        """测试脚本回看天数估算"""
+        assert estimate_script_lookback("result = row['close_price']") == 1
+        assert estimate_script_lookback("h = get_history(row['symbol'], 68)\nresult = 1") == 68
+
+        script = "TOTAL_DAYS = 120\nh = get_history(row['symbol'], days=TOTAL_DAYS)\nresult = 1"
+        assert estimate_script_lookback(script) == 120
+
+        script = "h = get_history(row['symbol'], n)\nresult = 1"
+        assert estimate_script_lookback(script, default_days=250) == 250
+
+    def test_light_requests_always_admitted(self, tmp_path):
+        """测试轻量请求不占用槽位"""
+        controller = make_controller(tmp_path)
+        tickets = [controller.acquire(10) for _ in range(20)]
+        assert all(not t.heavy for t in tickets)
+        assert controller.stats()['heavy_in_flight'] == 0
+
+    def test_global_slot_limit(self, tmp_path):
+        """测试跨进程重请求上限并返回Retry-After"""
+        controller = make_controller(tmp_path)
+        ticket = controller.acquire(5000)
+        assert ticket.heavy
+
+        # 模拟另一个进程：独立的控制器共享同一锁目录
+        other = make_controller(tmp_path)
+        with pytest.raises(AdmissionRejected) as exc_info:
+            other.acquire(5000)
+        assert exc_info.value.retry_after == 7
+
+        controller.release(ticket)
+        with other.admit(5000) as second:
+            assert second.heavy
+
+    def test_process_slot_limit(self, tmp_path):
+        """测试单进程重请求上限"""
+        controller = make_controller(
+            tmp_path,
+            admission_heavy_slots_per_process=1,
+            admission_heavy_slots_global=4
+        )
+        with controller.admit(5000):
+            with pytest.raises(AdmissionRejected):
+                controller.acquire(5000)
+
+        stats = controller.stats()
+        assert stats['heavy_in_flight'] == 0
+        assert stats['rejected_total'] == 1
+
+    def test_forced_heavy(self, tmp_path):
+        """测试低成本请求指定按重请求处理时占用槽位（分布式计算的协调者）"""
+        controller = make_controller(tmp_path)
+        with controller.admit(10, heavy=True) as ticket:
+            assert ticket.heavy
+            with pytest.raises(AdmissionRejected):
+                make_controller(tmp_path).acquire(10, heavy=True)
+        assert not controller.acquire(10).heavy
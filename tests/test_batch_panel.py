@@ -0,0 +1,52 @@
+"""
+多股票面板对齐测试
+
+验证按交易日期对齐、前向填充和字段参数解析
+"""
+
+import pytest
+
+from app.services.batch_panel import build_panel, parse_fields, parse_fill, FILL_FORWARD
+
+ROWS = [
+    ('SH.600000', '2025-07-09', 10.0, 100),
+    ('SZ.000001', '2025-07-09', 20.0, 200),
+    ('SZ.000001', '2025-07-10', 21.0, 210),
+    ('SH.600000', '2025-07-11', 11.0, 110),
+]
+
+
+class TestBatchPanel:
+    """面板对齐测试类"""
+
+    def test_aligned_columns(self):
+        """测试日期只出现一次，各股票数组与日期一一对应"""
+        panel = build_panel(ROWS, ['SZ.000001', 'SH.600000', 'BJ.830001'], ['close_price', 'volume'])
+
+        assert panel['dates'] == ['2025-07-09', '2025-07-10', '2025-07-11']
+        assert panel['fields']['close_price']['SH.600000'] == [10.0, None, 11.0]
+        assert panel['fields']['volume']['SZ.000001'] == [200, 210, None]
+        assert panel['fields']['close_price']['BJ.830001'] == [None, None, None]
+        assert panel['missing'] == ['BJ.830001']
+
+    def test_forward_fill(self):
+        """测试前向填充沿用上一个交易日的值，开始日期之前的最近一行作为初始值"""
+        rows = [('SZ.000001', '2025-07-09', 20.0, 200)] + ROWS[2:]
+        seed = [('SH.600000', '2025-07-08', 9.5, 95)]
+
+        panel = build_panel(rows, ['SH.600000', 'SZ.000001'], ['close_price', 'volume'], FILL_FORWARD, seed)
+
+        assert panel['fields']['close_price']['SH.600000'] == [9.5, 9.5, 11.0]
+        assert panel['fields']['volume']['SZ.000001'] == [200, 210, 210]
+
+    def test_parse_params(self):
+        """测试字段和填充方式参数"""
+        assert parse_fields(None) == ['close_price']
+        assert parse_fields('volume,close_price,volume') == ['volume', 'close_price']
+        assert parse_fill(None) is None
+        assert parse_fill('ffill') == FILL_FORWARD
+
+        with pytest.raises(ValueError):
+            parse_fields(['close_price; DROP TABLE x'])
+        with pytest.raises(ValueError):
+            parse_fill('bfill')
@@ -0,0 +1,86 @@
+"""
+离线批量计算测试
+
+验证分块结果的保存、续传和输出
+"""
+
+import csv
+import pytest
+from app.services.batch_runner import BatchRunner
+
+SYMBOLS = [f"SH.{600000 + i}" for i in range(10)]
+
+calls = []
+
+
+def fake_chunk(task):
+    """模拟分块计算：记录调用，股票 SH.600007 计算失败"""
+    chunk_index, script, symbols = task
+    calls.append(chunk_index)
+    return chunk_index, [
+        {'symbol': s, 'value': None if s == 'SH.600007' else i, 'error': 'boom' if s == 'SH.600007' else None}
+        for i, s in enumerate(symbols)
+    ]
+
+
+def failing_chunk(task):
+    """模拟第3个分块计算时进程崩溃"""
+    if task[0] == 2:
+        raise RuntimeError("worker crashed")
+    return fake_chunk(task)
+
+
+class TestBatchRunner:
+    """离线批量计算测试类"""
+
+    def setup_method(self):
+        calls.clear()
+
+    def test_writes_csv(self, tmp_path):
+        """测试结果按股票顺序写入CSV并清理中间结果"""
+        output = tmp_path / 'out.csv'
+        runner = BatchRunner('result = 1', SYMBOLS, str(output), workers=1, chunk_size=4, chunk_func=fake_chunk)
+
+        summary = runner.run()
+
+        with open(output, encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        assert [row['symbol'] for row in rows] == SYMBOLS
+        assert summary['total'] == 10 and summary['failed'] == 1
+        assert not runner.parts_dir.exists()
+
+    def test_resume_skips_completed_chunks(self, tmp_path):
+        """测试失败后重新运行只计算未完成的分块"""
+        output = tmp_path / 'out.csv'
+
+        with pytest.raises(RuntimeError):
+            BatchRunner('result = 1', SYMBOLS, str(output), workers=1, chunk_size=3,
+                        chunk_func=failing_chunk).run()
+        assert calls == [0, 1]
+
+        calls.clear()
+        summary = BatchRunner('result = 1', SYMBOLS, str(output), workers=1, chunk_size=3,
+                              chunk_func=fake_chunk).run()
+
+        assert calls == [2, 3]
+        assert summary['total'] == 10
+
+    def test_rejects_mismatched_parts(self, tmp_path):
+        """测试参数变化后拒绝复用中间结果"""
+        output = tmp_path / 'out.csv'
+        with pytest.raises(RuntimeError):
+            BatchRunner('result = 1', SYMBOLS, str(output), workers=1, chunk_size=3,
+                        chunk_func=failing_chunk).run()
+
+        with pytest.raises(ValueError):
+            BatchRunner('result = 2', SYMBOLS, str(output), workers=1, chunk_size=3,
+                        chunk_func=fake_chunk).run()
+
+        summary = BatchRunner('result = 2', SYMBOLS, str(output), workers=1, chunk_size=3,
+                              chunk_func=fake_chunk).run(restart=True)
+        assert summary['total'] == 10
+
+    def test_unsupported_format(self, tmp_path):
+        """测试不支持的输出格式"""
+        with pytest.raises(ValueError):
+            BatchRunner('result = 1', SYMBOLS, str(tmp_path / 'out.xlsx'))
@@ -0,0 +1,148 @@
+"""
+计算任务队列测试
+
+验证任务抢占、结果写回、心跳超时回收以及计算进程处理任务时的状态变化。
+需要可连接的 PostgreSQL（在临时 schema 中建表，结束后删除），数据库不可用时跳过。
+"""
+
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from config.settings import WorkerConfig, db_config
+from database.connection import db_manager
+from database.migrations.run_migrations import split_sql_statements
+from app.models.calculation_task import (
+    CalculationTaskService,
+    TASK_FAILED,
+    TASK_PENDING,
+    TASK_RUNNING,
+    TASK_SUCCEEDED
+)
+from app.services.calculation_worker import CalculationWorker
+
+MIGRATION = os.path.join(os.path.dirname(__file__), '..', 'database', 'migrations',
+                         'create_calculation_tasks_table.sql')
+
+
+@pytest.fixture
+def queue_db(monkeypatch):
+    """在临时 schema 中创建 calculation_tasks，并让 db_manager 使用该 schema"""
+    schema = f"test_queue_{os.getpid()}"
+    engine = create_engine(db_config.database_url, connect_args={'options': f'-csearch_path={schema}'})
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {schema}"))
+            with open(MIGRATION, encoding='utf-8') as f:
+                for statement in split_sql_statements(f.read()):
+                    conn.execute(text(statement))
+    except Exception as e:
+        engine.dispose()
+        pytest.skip(f"数据库不可用: {e}")
+
+    monkeypatch.setattr(db_manager, 'engine', engine)
+    monkeypatch.setattr(db_manager, 'SessionLocal', sessionmaker(bind=engine))
+    monkeypatch.setattr(db_manager, 'replicas', [])
+    yield engine
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+    engine.dispose()
+
+
+def task_row(engine, task_id):
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT status, worker_id, attempts, result, error, finished_at FROM calculation_tasks WHERE id = :id"
+        ), {'id': task_id}).mappings().one()
+
+
+def make_worker(execute):
+    worker = CalculationWorker('worker-1', WorkerConfig(worker_stale_timeout_seconds=60, worker_max_attempts=2))
+    worker._execute = execute
+    return worker
+
+
+class TestCalculationQueue:
+    """任务队列状态变化测试类"""
+
+    def test_claim_in_order(self, queue_db):
+        """测试按入队顺序抢占，抢占后为 running 且尝试次数加一，队列为空时返回None"""
+        first = CalculationTaskService.enqueue({'script': 'result = 1'})
+        second = CalculationTaskService.enqueue({'script': 'result = 2'})
+
+        assert CalculationTaskService.claim_next('worker-1') == {'id': first['id'], 'payload': {'script': 'result = 1'}}
+        assert CalculationTaskService.claim_next('worker-2')['id'] == second['id']
+        assert CalculationTaskService.claim_next('worker-3') is None
+
+        row = task_row(queue_db, first['id'])
+        assert (row['status'], row['worker_id'], row['attempts']) == (TASK_RUNNING, 'worker-1', 1)
+
+    def test_timestamps_use_database_clock(self, queue_db):
+        """测试创建、开始和心跳时间取同一个时钟（数据库），排队时长不为负"""
+        task_id = CalculationTaskService.enqueue({'script': 'result = 1'})['id']
+        CalculationTaskService.claim_next('worker-1')
+
+        with queue_db.connect() as conn:
+            row = conn.execute(text(
+                "SELECT created_at, started_at, heartbeat_at, LOCALTIMESTAMP AS now FROM calculation_tasks WHERE id = :id"
+            ), {'id': task_id}).mappings().one()
+        assert row['created_at'] <= row['started_at'] == row['heartbeat_at'] <= row['now']
+
+    def test_finish_only_by_owner(self, queue_db):
+        """测试只有持有任务的计算进程能写回结果"""
+        task_id = CalculationTaskService.enqueue({'script': 'result = 1'})['id']
+        CalculationTaskService.claim_next('worker-1')
+
+        CalculationTaskService.complete(task_id, 'worker-2', {'results': []})
+        assert task_row(queue_db, task_id)['status'] == TASK_RUNNING
+
+        CalculationTaskService.complete(task_id, 'worker-1', {'results': [1]})
+        row = task_row(queue_db, task_id)
+        assert row['status'] == TASK_SUCCEEDED and row['result'] == {'results': [1]}
+        assert row['finished_at'] is not None
+
+        # 已完成的任务不能再被标记为失败
+        CalculationTaskService.fail(task_id, 'worker-1', '重复写回')
+        assert task_row(queue_db, task_id)['status'] == TASK_SUCCEEDED
+
+    def test_requeue_stale(self, queue_db):
+        """测试心跳超时的任务未超过最大尝试次数时重新入队，否则标记为失败"""
+        retry_id = CalculationTaskService.enqueue({'script': 'result = 1'})['id']
+        exhausted_id = CalculationTaskService.enqueue({'script': 'result = 2'})['id']
+        alive_id = CalculationTaskService.enqueue({'script': 'result = 3'})['id']
+        for _ in range(3):
+            CalculationTaskService.claim_next('worker-1')
+        with queue_db.begin() as conn:
+            conn.execute(text("UPDATE calculation_tasks SET attempts = 2 WHERE id = :id"), {'id': exhausted_id})
+            conn.execute(text(
+                "UPDATE calculation_tasks SET heartbeat_at = CURRENT_TIMESTAMP - INTERVAL '10 minutes' WHERE id <> :id"
+            ), {'id': alive_id})
+
+        assert CalculationTaskService.requeue_stale(60, 2) == 2
+
+        retry = task_row(queue_db, retry_id)
+        assert (retry['status'], retry['worker_id']) == (TASK_PENDING, None)
+        exhausted = task_row(queue_db, exhausted_id)
+        assert exhausted['status'] == TASK_FAILED and exhausted['finished_at'] is not None
+        assert task_row(queue_db, alive_id)['status'] == TASK_RUNNING
+
+    def test_worker_run_once(self, queue_db):
+        """测试计算进程执行成功时写回结果、执行出错时标记失败、队列为空时返回False"""
+        ok_id = CalculationTaskService.enqueue({'script': 'result = 1'})['id']
+        worker = make_worker(lambda payload: {'results': [{'symbol': 'SH.600519', 'result': 1}]})
+        assert worker.run_once() is True
+        assert task_row(queue_db, ok_id)['status'] == TASK_SUCCEEDED
+
+        def broken(payload):
+            raise ValueError("数据库中没有活跃股票")
+
+        failed_id = CalculationTaskService.enqueue({'script': 'result = 1'})['id']
+        assert make_worker(broken).run_once() is True
+        row = task_row(queue_db, failed_id)
+        assert row['status'] == TASK_FAILED and row['error'] == "数据库中没有活跃股票"
+
+        assert worker.run_once() is False
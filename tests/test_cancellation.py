@@ -0,0 +1,67 @@
+"""
+请求取消测试
+
+验证客户端断开检测和取消令牌
+"""
+
+import socket
+import pytest
+from app.utils.cancellation import (
+    CancellationToken,
+    RequestCancelled,
+    cancellation_scope,
+    client_disconnected,
+    current_token
+)
+
+
+class FakeConnection:
+    """模拟 psycopg2 连接"""
+
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TestCancellation:
+    """请求取消测试类"""
+
+    def test_client_disconnected(self):
+        """测试通过socket探测客户端断开"""
+        server, client = socket.socketpair()
+        try:
+            assert client_disconnected(server) is False
+
+            # 客户端发送了数据（如下一个请求）不视为断开
+            client.sendall(b'x')
+            assert client_disconnected(server) is False
+            server.recv(1)
+
+            client.close()
+            assert client_disconnected(server) is True
+        finally:
+            server.close()
+
+    def test_cancel_interrupts_registered_connections(self):
+        """测试取消时中断正在执行的数据库语句"""
+        token = CancellationToken()
+        active, finished = FakeConnection(), FakeConnection()
+        token.register_connection(active)
+        token.register_connection(finished)
+        token.unregister_connection(finished)
+
+        token.cancel("客户端已断开连接")
+
+        assert active.cancelled
+        assert not finished.cancelled
+        with pytest.raises(RequestCancelled):
+            token.raise_if_cancelled()
+
+    def test_scope_sets_current_token(self):
+        """测试取消作用域绑定当前线程令牌"""
+        assert current_token() is None
+        with cancellation_scope() as token:
+            assert current_token() is token
+        assert current_token() is None
@@ -0,0 +1,81 @@
+"""
+列式响应格式协商测试
+
+验证 Accept 协商、未安装 pyarrow 时的回退以及 Arrow IPC 响应内容
+"""
+
+import json
+
+import pytest
+from flask import Flask
+
+from app.utils import columnar
+from app.utils.columnar import (
+    ARROW_STREAM_MIMETYPE,
+    FORMAT_ARROW,
+    FORMAT_JSON,
+    NotAcceptable,
+    negotiate_format
+)
+
+app = Flask(__name__)
+
+
+def negotiate(accept=None):
+    headers = {'Accept': accept} if accept else {}
+    with app.test_request_context('/', headers=headers):
+        return negotiate_format()
+
+
+class TestNegotiation:
+    """Accept 协商测试类"""
+
+    def test_json_by_default(self, monkeypatch):
+        """测试未指定或同等优先时返回 JSON"""
+        monkeypatch.setattr(columnar, 'arrow_available', lambda: True)
+
+        assert negotiate() == FORMAT_JSON
+        assert negotiate('*/*') == FORMAT_JSON
+        assert negotiate(f'application/json, {ARROW_STREAM_MIMETYPE}') == FORMAT_JSON
+        assert negotiate(ARROW_STREAM_MIMETYPE) == FORMAT_ARROW
+        assert negotiate(f'{ARROW_STREAM_MIMETYPE}, application/json;q=0.5') == FORMAT_ARROW
+
+    def test_without_pyarrow(self, monkeypatch):
+        """测试未安装 pyarrow 时回退到 JSON，只接受 Arrow 时拒绝"""
+        monkeypatch.setattr(columnar, 'arrow_available', lambda: False)
+
+        assert negotiate(f'{ARROW_STREAM_MIMETYPE}, application/json;q=0.5') == FORMAT_JSON
+        with pytest.raises(NotAcceptable):
+            negotiate(ARROW_STREAM_MIMETYPE)
+
+
+class TestArrowResponse:
+    """Arrow 响应测试类"""
+
+    def test_roundtrip(self):
+        """测试列、类型和响应元数据"""
+        pa = pytest.importorskip('pyarrow')
+
+        with app.test_request_context('/'):
+            response, code = columnar.create_arrow_response(
+                {'symbol': ['SH.600000', 'SZ.000001'], 'volume': [None, 5],
+                 'value': columnar.value_array([1, None])},
+                {'volume': 'int64'},
+                message="查询成功",
+                total=2,
+                has_more=False
+            )
+
+        table = pa.ipc.open_stream(response.get_data()).read_all()
+        assert code == 200 and response.mimetype == ARROW_STREAM_MIMETYPE
+        assert table.schema.field('volume').type == pa.int64()
+        assert table.column('value').to_pylist() == [1.0, None]
+        assert json.loads(table.schema.metadata[b'response'])['total'] == 2
+
+    def test_value_array_mixed(self):
+        """测试脚本结果含非数值时转为字符串列"""
+        pa = pytest.importorskip('pyarrow')
+
+        array = columnar.value_array([1.5, 'up', {'a': 1}, None])
+        assert array.type == pa.string()
+        assert array.to_pylist() == ['1.5', 'up', '{"a": 1}', None]
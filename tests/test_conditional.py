@@ -0,0 +1,66 @@
+"""
+条件请求测试
+
+使用模拟的数据版本，验证 ETag / Last-Modified、304 响应和跳过条件
+"""
+
+from datetime import datetime
+
+from flask import Flask, jsonify
+
+from app.services.data_freshness import data_freshness_tracker
+from app.utils.conditional import conditional_get
+
+
+def make_client(monkeypatch, version='v1'):
+    state = {'version': version, 'calls': 0}
+    monkeypatch.setattr(
+        data_freshness_tracker, 'version',
+        lambda sources: (state['version'], datetime(2025, 7, 11, 15, 0, 0))
+    )
+
+    app = Flask(__name__)
+
+    @app.route('/data')
+    @conditional_get(sources=('market',), skip_params=('deadline_ms',))
+    def data():
+        state['calls'] += 1
+        return jsonify({'value': 1})
+
+    return app.test_client(), state
+
+
+class TestConditionalGet:
+    """条件请求测试类"""
+
+    def test_not_modified(self, monkeypatch):
+        """测试 ETag 一致时返回304且不执行接口"""
+        client, state = make_client(monkeypatch)
+
+        response = client.get('/data')
+        etag = response.headers['ETag']
+        assert response.status_code == 200 and response.headers['Cache-Control'] == 'no-cache'
+
+        response = client.get('/data', headers={'If-None-Match': etag})
+        assert response.status_code == 304 and response.headers['ETag'] == etag
+        assert state['calls'] == 1
+
+        response = client.get('/data', headers={'If-Modified-Since': 'Fri, 11 Jul 2025 15:00:00 GMT'})
+        assert response.status_code == 304
+
+    def test_changes_with_version_and_params(self, monkeypatch):
+        """测试数据版本、查询参数或 Accept 变化时 ETag 变化"""
+        client, state = make_client(monkeypatch)
+        etag = client.get('/data').headers['ETag']
+
+        assert client.get('/data?limit=5').headers['ETag'] != etag
+        assert client.get('/data', headers={'Accept': 'text/csv'}).headers['ETag'] != etag
+
+        state['version'] = 'v2'
+        assert client.get('/data', headers={'If-None-Match': etag}).status_code == 200
+
+    def test_skip_params(self, monkeypatch):
+        """测试带跳过参数的请求不返回 ETag"""
+        client, _ = make_client(monkeypatch)
+
+        assert 'ETag' not in client.get('/data?deadline_ms=100').headers
@@ -0,0 +1,69 @@
+"""
+截止时间与续传令牌测试
+
+验证 deadline_ms 的取值范围、续传令牌的签名校验和请求指纹匹配
+"""
+
+import pytest
+
+from config.settings import REQUEST_TIMEOUT
+from app.utils.continuation import (
+    _serializer,
+    make_continuation_token,
+    parse_continuation_token,
+    parse_deadline_ms,
+    request_fingerprint
+)
+
+
+class TestDeadline:
+    """deadline_ms 解析测试类"""
+
+    def test_valid(self):
+        """测试未提供时为None，范围内的整数原样返回"""
+        assert parse_deadline_ms(None) is None
+        assert parse_deadline_ms('') is None
+        assert parse_deadline_ms('1') == 1
+        assert parse_deadline_ms(REQUEST_TIMEOUT * 1000) == REQUEST_TIMEOUT * 1000
+
+    @pytest.mark.parametrize('value', ['0', '-5', REQUEST_TIMEOUT * 1000 + 1, 'abc', '1.5'])
+    def test_rejects_out_of_range(self, value):
+        """测试非正数、超过请求超时上限和非整数被拒绝"""
+        with pytest.raises(ValueError):
+            parse_deadline_ms(value)
+
+
+class TestContinuationToken:
+    """续传令牌测试类"""
+
+    def test_roundtrip(self):
+        """测试令牌解析出续传位置，未提供令牌时从头开始"""
+        fingerprint = request_fingerprint('result = 1', ['SH.600519', 'SZ.000001'])
+
+        assert parse_continuation_token(make_continuation_token(120, fingerprint), fingerprint) == 120
+        assert parse_continuation_token(None, fingerprint) == 0
+        assert parse_continuation_token('', fingerprint) == 0
+
+    def test_fingerprint_mismatch(self):
+        """测试脚本或股票范围变化后令牌不能续传"""
+        token = make_continuation_token(120, request_fingerprint('result = 1', ['SH.600519']))
+
+        with pytest.raises(ValueError, match='不匹配'):
+            parse_continuation_token(token, request_fingerprint('result = 2', ['SH.600519']))
+        with pytest.raises(ValueError, match='不匹配'):
+            parse_continuation_token(token, request_fingerprint('result = 1', ['SZ.000001']))
+
+    def test_rejects_tampered(self):
+        """测试篡改签名和签名有效但续传位置非法的令牌被拒绝"""
+        fingerprint = request_fingerprint('result = 1')
+        token = make_continuation_token(120, fingerprint)
+
+        with pytest.raises(ValueError, match='无效'):
+            parse_continuation_token(token[:-2] + ('aa' if not token.endswith('aa') else 'bb'), fingerprint)
+        with pytest.raises(ValueError, match='无效'):
+            parse_continuation_token('not-a-token', fingerprint)
+
+        for offset in (-1, '5', None):
+            forged = _serializer.dumps({'offset': offset, 'fp': fingerprint})
+            with pytest.raises(ValueError, match='无效'):
+                parse_continuation_token(forged, fingerprint)
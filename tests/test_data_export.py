@@ -0,0 +1,78 @@
+"""
+行情数据导出编码测试
+
+验证逐批编码的 CSV / Parquet 与一次性编码的结果一致，以及导出成本估算和时间上限
+"""
+
+import io
+from datetime import date
+
+import pytest
+
+from app.services.data_export import (
+    EXPORT_HISTORY_DAYS,
+    ExportTimeout,
+    estimate_export_cost,
+    iter_csv,
+    iter_parquet,
+    iter_with_time_limit,
+    parse_export_params
+)
+
+COLUMNS = ['trade_date', 'symbol', 'close_price', 'volume']
+CHUNKS = [
+    [(date(2025, 7, 10), 'SH.600000', 10.5, 100), (date(2025, 7, 11), 'SH.600000', None, 120)],
+    [(date(2025, 7, 11), 'SZ.000001', 20.0, 200)],
+]
+
+
+class TestDataExport:
+    """导出编码测试类"""
+
+    def test_csv_chunks(self):
+        """测试每批一个CSV块，首块带列名"""
+        parts = list(iter_csv(iter(CHUNKS), COLUMNS))
+
+        assert len(parts) == 2
+        assert b''.join(parts).decode().splitlines() == [
+            'trade_date,symbol,close_price,volume',
+            '2025-07-10,SH.600000,10.5,100',
+            '2025-07-11,SH.600000,,120',
+            '2025-07-11,SZ.000001,20.0,200',
+        ]
+
+    def test_parquet_row_groups(self):
+        """测试每批一个行组，拼接后是完整的Parquet文件"""
+        pq = pytest.importorskip('pyarrow.parquet')
+
+        data = b''.join(iter_parquet(iter(CHUNKS), COLUMNS))
+        parquet_file = pq.ParquetFile(io.BytesIO(data))
+
+        assert parquet_file.num_row_groups == 2
+        table = parquet_file.read()
+        assert table.column('volume').to_pylist() == [100, 120, 200]
+        assert table.column('trade_date').to_pylist()[0] == date(2025, 7, 10)
+
+    def test_params(self):
+        """测试导出参数默认值和校验"""
+        fmt, fields = parse_export_params(None, None)
+        assert fmt == 'csv' and 'close_price' in fields and 'volume' in fields
+
+        with pytest.raises(ValueError):
+            parse_export_params('xlsx', None)
+
+    def test_cost_estimate(self):
+        """测试导出成本：不指定股票时为None（按重请求处理），否则为股票数 × 天数"""
+        assert estimate_export_cost(None, '2025-01-01', '2025-01-31') is None
+        assert estimate_export_cost(['SH.600000', 'SZ.000001'], '2025-01-01', '2025-01-31') == 62
+        assert estimate_export_cost(['SH.600000'], None, '2025-01-31') == EXPORT_HISTORY_DAYS
+
+    def test_time_limit(self):
+        """测试累计耗时超过上限时中断导出"""
+        ticks = iter([0, 1, 2, 100])
+        chunks = iter_with_time_limit(iter(CHUNKS * 2), 10, clock=lambda: next(ticks))
+
+        assert next(chunks) == CHUNKS[0]
+        assert next(chunks) == CHUNKS[1]
+        with pytest.raises(ExportTimeout):
+            next(chunks)
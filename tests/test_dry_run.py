@@ -0,0 +1,55 @@
+"""
+抽样试运行测试
+
+验证分层抽样、分位数和外推结果
+"""
+
+from collections import Counter
+from app.services.dry_run import DryRunEstimator, percentile, stratified_sample, stratum_of
+
+SYMBOLS = (
+    [f"SH.{600000 + i}" for i in range(60)]
+    + [f"SH.{688000 + i}" for i in range(20)]
+    + [f"SZ.{300000 + i}" for i in range(20)]
+)
+
+
+class FakeRows:
+    """模拟最新行情来源"""
+
+    def get_latest_stock_rows(self, symbols):
+        return {s: {'symbol': s, 'close_price': 1.0} for s in symbols}
+
+
+class TestDryRun:
+    """抽样试运行测试类"""
+
+    def test_stratified_sample(self):
+        """测试各板块按比例分配样本，相同种子结果相同"""
+        sample = stratified_sample(SYMBOLS, 10, seed=7)
+
+        assert Counter(stratum_of(s) for s in sample) == {'SH.60': 6, 'SH.68': 2, 'SZ.30': 2}
+        assert sample == stratified_sample(SYMBOLS, 10, seed=7)
+        assert sample == sorted(sample, key=SYMBOLS.index)
+        assert stratified_sample(SYMBOLS[:5], 10) == SYMBOLS[:5]
+
+    def test_percentile(self):
+        """测试最近秩法分位数"""
+        values = [float(v) for v in range(1, 101)]
+
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 50) == 0.0
+
+    def test_extrapolation(self):
+        """测试读取行数按样本均值外推到全量"""
+        estimator = DryRunEstimator(history_provider=lambda symbol, days: [{'close_price': 1.0}] * days)
+        script = "h = get_history(row['symbol'], 9)\nresult = len(h)"
+
+        data = estimator.run(script, SYMBOLS, 10, seed=1, data_source=FakeRows())
+
+        estimate = data['estimate']
+        assert all(item['value'] == 9 for item in data['results'])
+        assert estimate['sample_size'] == 10 and estimate['universe_size'] == 100
+        assert estimate['db_rows'] == {'sample': 100, 'per_symbol': 10.0, 'estimated_total': 1000}
+        assert estimate['recommendation'] == 'interactive'
@@ -0,0 +1,93 @@
+"""
+响应编码与压缩测试
+
+验证 FastJSONProvider 与 Flask 默认序列化结果一致（orjson / 标准库），以及 gzip 压缩的协商和跳过条件
+"""
+
+import gzip
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from flask import Flask, Response, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+from app.utils.encoding import FastJSONProvider, compress_response
+
+
+PAYLOAD = {
+    'message': '查询成功',
+    'data': [{'symbol': 'SH.600519', 'close_price': 1500.5, 'volume': 12345, 'premium_rate': None}],
+    'trade_date': date(2025, 7, 11),
+    'synced_at': datetime(2025, 7, 11, 15, 30, 0),
+    'amount': Decimal('12.3400'),
+    'has_more': False
+}
+
+
+def make_client(min_bytes=100):
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+
+    @app.route('/data')
+    def data():
+        return jsonify({'rows': ['行情'] * 200})
+
+    @app.route('/small')
+    def small():
+        return jsonify({'value': 1})
+
+    @app.route('/stream')
+    def stream():
+        return Response((b'x' * 1000 for _ in range(3)), mimetype='text/csv')
+
+    app.after_request(lambda response: compress_response(response, min_bytes))
+    return app.test_client()
+
+
+class TestFastJSONProvider:
+    """JSON 编码测试类"""
+
+    @pytest.mark.parametrize('encoder', ['auto', 'stdlib'])
+    def test_matches_flask_default(self, encoder):
+        """测试解析结果与 Flask 默认序列化一致，输出紧凑、中文不转义、键有序"""
+        app = Flask(__name__)
+        provider = FastJSONProvider(app, encoder=encoder)
+        body = provider.encode(PAYLOAD)
+
+        assert json.loads(body) == json.loads(DefaultJSONProvider(app).dumps(PAYLOAD))
+        text = body.decode('utf-8')
+        assert '查询成功' in text and ': ' not in text
+        assert text.index('"amount"') < text.index('"data"') < text.index('"message"')
+
+    def test_stdlib_fallback_for_big_int(self):
+        """测试 orjson 不支持的超大整数回退到标准库"""
+        provider = FastJSONProvider(Flask(__name__))
+        assert json.loads(provider.encode({'value': 2 ** 70})) == {'value': 2 ** 70}
+
+    def test_invalid_encoder(self):
+        """测试不支持的编码器"""
+        with pytest.raises(ValueError):
+            FastJSONProvider(Flask(__name__), encoder='ujson')
+
+
+class TestCompression:
+    """响应压缩测试类"""
+
+    def test_gzip_negotiated(self):
+        """测试客户端接受 gzip 时压缩超过阈值的响应"""
+        response = make_client().get('/data', headers={'Accept-Encoding': 'gzip, deflate'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert json.loads(gzip.decompress(response.data)) == {'rows': ['行情'] * 200}
+
+    def test_skipped(self):
+        """测试未声明 gzip、低于阈值和流式响应不压缩"""
+        assert 'Content-Encoding' not in make_client().get('/data').headers
+        assert 'Content-Encoding' not in make_client().get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+
+        response = make_client().get('/stream', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+        assert response.data == b'x' * 3000
+
@@ -0,0 +1,111 @@
+"""
+股票列表快照测试
+
+使用模拟的数据服务，验证内存中的筛选、分页和按数据版本重建
+"""
+
+from types import SimpleNamespace
+from app.services.listing_snapshot import ListingSnapshotCache
+
+
+def make_row(symbol, market_code, is_etf=False, is_active='Y'):
+    return {
+        'symbol': symbol, 'stock_name': symbol, 'market_code': market_code,
+        'is_active': is_active, 'is_etf': is_etf, 'last_sync_date': None,
+        'close_price': 10.0, 'price_change_pct': 1.0, 'volume': 100, 'latest_trade_date': '2025-07-11'
+    }
+
+
+class FakeDataService:
+    """模拟数据服务：记录快照构建次数，可修改版本"""
+
+    def __init__(self):
+        self.version = 'v1'
+        self.loads = 0
+        self.rows = [
+            make_row('SH.510300', 'SH', is_etf=True),
+            make_row('SH.600000', 'SH'),
+            make_row('SH.600001', 'SH', is_active='N'),
+            make_row('SZ.000001', 'SZ'),
+            make_row('SZ.300001', 'SZ'),
+        ]
+
+    def get_listing_version(self):
+        return self.version
+
+    def get_listing_rows(self):
+        self.loads += 1
+        return [dict(row) for row in self.rows]
+
+
+def make_cache(service, check_interval=0, enabled=True):
+    config = SimpleNamespace(
+        listing_snapshot_enabled=enabled,
+        listing_snapshot_check_interval_seconds=check_interval,
+        listing_snapshot_max_age_seconds=300
+    )
+    return ListingSnapshotCache(config, data_service=service)
+
+
+class TestListingSnapshot:
+    """股票列表快照测试类"""
+
+    def test_filters_and_pagination(self):
+        """测试市场/ETF/是否活跃筛选、股票范围限定和分页"""
+        cache = make_cache(FakeDataService())
+
+        result = cache.list_stocks(market_codes=['SZ'], is_active='Y', is_etf=None, limit=10, offset=0)
+        assert [row['symbol'] for row in result['data']] == ['SZ.000001', 'SZ.300001']
+
+        result = cache.list_stocks(market_codes=None, is_active='Y', is_etf=False, limit=2, offset=1)
+        assert [row['symbol'] for row in result['data']] == ['SZ.000001', 'SZ.300001']
+        assert result['total'] == 3 and result['count'] == 2
+
+        result = cache.list_stocks(is_active='N', limit=10, offset=0)
+        assert [row['symbol'] for row in result['data']] == ['SH.600001']
+
+        result = cache.list_stocks(is_active='Y', limit=10, offset=0, symbols=['SZ.300001', 'SH.510300', 'XX.1'])
+        assert [row['symbol'] for row in result['data']] == ['SH.510300', 'SZ.300001']
+
+    def test_rows_are_copies(self):
+        """测试调用方修改返回行不影响快照"""
+        cache = make_cache(FakeDataService())
+
+        cache.list_stocks(limit=10, offset=0)['data'][0]['script_results'] = {'1': 1.0}
+
+        assert 'script_results' not in cache.list_stocks(limit=10, offset=0)['data'][0]
+
+    def test_rebuild_on_version_change(self):
+        """测试版本不变时复用快照，版本变化后重建"""
+        service = FakeDataService()
+        cache = make_cache(service)
+
+        cache.list_stocks(limit=10, offset=0)
+        cache.list_stocks(limit=10, offset=0)
+        assert service.loads == 1
+
+        service.rows.append(make_row('SZ.300002', 'SZ'))
+        service.version = 'v2'
+        result = cache.list_stocks(market_codes=['SZ'], limit=10, offset=0)
+
+        assert service.loads == 2
+        assert result['total'] == 3
+
+    def test_check_interval(self):
+        """测试检查间隔内不访问数据库"""
+        service = FakeDataService()
+        cache = make_cache(service, check_interval=60)
+
+        cache.list_stocks(limit=10, offset=0)
+        service.version = 'v2'
+        cache.list_stocks(limit=10, offset=0)
+
+        assert service.loads == 1
+
+    def test_disabled_or_failed(self):
+        """测试未启用或构建失败时返回None（回退到数据库查询）"""
+        assert make_cache(FakeDataService(), enabled=False).list_stocks(limit=10, offset=0) is None
+
+        service = FakeDataService()
+        service.get_listing_rows = lambda: 1 / 0
+        assert make_cache(service).list_stocks(limit=10, offset=0) is None
@@ -0,0 +1,86 @@
+"""
+监控指标测试
+
+验证请求耗时按路由模板记录、连接池借出/溢出/超时统计和 /api/metrics 输出（需安装 prometheus_client）
+"""
+
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+pytest.importorskip('prometheus_client')
+from prometheus_client import REGISTRY
+
+from app.routes.health import health_bp
+from app.utils.metrics import instrument_engine, install_metrics, observe_cache
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def make_client():
+    app = Flask(__name__)
+    install_metrics(app)
+    app.register_blueprint(health_bp, url_prefix='/api')
+
+    @app.route('/items/<int:item_id>')
+    def item(item_id):
+        return jsonify({'id': item_id})
+
+    return app.test_client()
+
+
+class TestMetrics:
+    """监控指标测试类"""
+
+    def test_request_duration_by_route(self):
+        """测试请求耗时按路由模板和状态码记录，未匹配的路径归为 unmatched"""
+        labels = {'method': 'GET', 'endpoint': '/items/<int:item_id>', 'status': '200'}
+        before = sample('qtfund_http_request_duration_seconds_count', **labels)
+        unmatched = sample('qtfund_http_request_duration_seconds_count',
+                           method='GET', endpoint='unmatched', status='404')
+
+        client = make_client()
+        client.get('/items/1')
+        client.get('/items/2')
+        client.get('/missing')
+
+        assert sample('qtfund_http_request_duration_seconds_count', **labels) == before + 2
+        assert sample('qtfund_http_request_duration_seconds_count',
+                      method='GET', endpoint='unmatched', status='404') == unmatched + 1
+        assert sample('qtfund_http_requests_in_flight') == 0
+
+    def test_pool_metrics(self, tmp_path):
+        """测试连接池借出数、溢出数和获取连接超时次数"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool,
+                               pool_size=1, max_overflow=1, pool_timeout=0.05)
+        instrument_engine(engine, 'test')
+
+        first, second = engine.connect(), engine.connect()
+        assert sample('qtfund_db_pool_checked_out', pool='test') == 2
+        assert sample('qtfund_db_pool_overflow', pool='test') == 1
+
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        assert sample('qtfund_db_pool_timeouts_total', pool='test') == 1
+        assert sample('qtfund_db_pool_wait_seconds_count', pool='test') == 3
+
+        first.close()
+        second.close()
+        assert sample('qtfund_db_pool_checked_out', pool='test') == 0
+        assert sample('qtfund_db_pool_overflow', pool='test') == 0
+
+    def test_metrics_endpoint(self):
+        """测试 /api/metrics 以 Prometheus 文本格式输出"""
+        observe_cache('listing_snapshot', True)
+
+        response = make_client().get('/api/metrics')
+
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain')
+        body = response.get_data(as_text=True)
+        assert 'qtfund_cache_requests_total{cache="listing_snapshot",result="hit"}' in body
+        assert 'qtfund_http_request_duration_seconds_bucket' in body
@@ -0,0 +1,88 @@
+"""
+数据库迁移测试
+
+验证迁移 SQL 文件的语句拆分，以及应用启动时缺少行情表触发器的处理
+"""
+
+from pathlib import Path
+
+import pytest
+
+from database.migrations.run_migrations import split_sql_statements
+
+MIGRATIONS_DIR = Path(__file__).parent.parent / 'database' / 'migrations'
+
+
+class TestSplitSqlStatements:
+    """SQL 语句拆分测试类"""
+
+    def test_ignores_semicolons_in_strings_and_comments(self):
+        """测试字符串和注释中的分号不拆分"""
+        sql = "SELECT 'a;b';\n-- 注释; 不是语句\nSELECT 'it''s;';\nSELECT 1"
+
+        assert split_sql_statements(sql) == ["SELECT 'a;b'", "SELECT 'it''s;'", "SELECT 1"]
+
+    def test_keeps_function_body(self):
+        """测试 $$ 函数体作为一条语句"""
+        sql = (
+            "CREATE FUNCTION f() RETURNS INTEGER AS $$\nBEGIN\n    RETURN 1;\nEND;\n$$ LANGUAGE plpgsql;\n"
+            "CREATE FUNCTION g() RETURNS TEXT AS $body$ SELECT ';' $body$ LANGUAGE sql;"
+        )
+
+        statements = split_sql_statements(sql)
+
+        assert len(statements) == 2
+        assert statements[0].endswith("$$ LANGUAGE plpgsql")
+        assert "RETURN 1;" in statements[0]
+
+    def test_latest_bar_migration(self):
+        """测试 stock_latest_bar 迁移文件的拆分结果"""
+        sql = (MIGRATIONS_DIR / 'create_stock_latest_bar_table.sql').read_text(encoding='utf-8')
+        statements = split_sql_statements(sql)
+
+        assert statements[0].startswith('CREATE TABLE IF NOT EXISTS stock_latest_bar')
+        assert sum(s.startswith('CREATE OR REPLACE FUNCTION') for s in statements) == 2
+        assert statements[-1].startswith('SELECT refresh_stock_latest_bar()')
+        # 触发器只在不存在时创建，不再每次删除重建
+        assert not any(s.startswith('DROP TRIGGER') for s in statements)
+        assert any(s.startswith('DO $$') and 'CREATE TRIGGER trg_stock_latest_bar' in s for s in statements)
+
+    def test_period_bars_migration(self):
+        """测试 stock_period_bars 迁移文件的拆分结果（函数体内嵌 $sql$ 字符串）"""
+        sql = (MIGRATIONS_DIR / 'create_stock_period_bars_table.sql').read_text(encoding='utf-8')
+        statements = split_sql_statements(sql)
+
+        assert statements[0].startswith('CREATE TABLE IF NOT EXISTS stock_period_bars')
+        refresh = next(s for s in statements if s.startswith('CREATE OR REPLACE FUNCTION refresh_stock_period_bars'))
+        assert '$sql$' in refresh and refresh.endswith('$$ LANGUAGE plpgsql')
+        assert statements[-1].startswith('SELECT refresh_stock_period_bars()')
+        assert not any(s.startswith('DROP TRIGGER') for s in statements)
+        assert any(s.startswith('DO $$') and 'CREATE TRIGGER trg_stock_period_bars' in s for s in statements)
+
+
+class TestRunAppMigrations:
+    """应用启动迁移测试类"""
+
+    def _patch(self, monkeypatch, check):
+        from database.migrations import run_migrations
+        for name in ('create_custom_scripts_table', 'add_custom_scripts_cost_estimate_column',
+                     'create_calculation_tasks_table', 'create_stock_universes_table'):
+            monkeypatch.setattr(run_migrations, name, lambda: True)
+        monkeypatch.setattr(run_migrations, 'check_trigger_exists', check)
+        return run_migrations
+
+    def test_missing_market_data_trigger_fails(self, monkeypatch):
+        """测试行情表触发器缺失时启动失败，错误信息列出缺失的触发器"""
+        run_migrations = self._patch(monkeypatch, lambda name: name != 'trg_stock_latest_bar')
+
+        with pytest.raises(run_migrations.MarketDataTablesMissing, match='trg_stock_latest_bar'):
+            run_migrations.run_app_migrations()
+
+    def test_check_error_only_warns(self, monkeypatch):
+        """测试无法检查触发器（数据库不可用）时不阻止启动"""
+        def unavailable(name):
+            raise ConnectionError("数据库不可用")
+
+        run_migrations = self._patch(monkeypatch, unavailable)
+
+        assert run_migrations.run_app_migrations() is True
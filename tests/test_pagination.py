@@ -0,0 +1,78 @@
+"""
+游标分页测试
+
+验证游标签名校验、include_total 解析和快照上的游标翻页
+"""
+
+import pytest
+
+from app.utils.pagination import (
+    TOTAL_ESTIMATE,
+    TOTAL_EXACT,
+    TOTAL_NONE,
+    make_cursor,
+    parse_cursor,
+    parse_include_total
+)
+from tests.test_listing_snapshot import FakeDataService, make_cache, make_row
+
+
+class TestCursor:
+    """分页游标测试类"""
+
+    def test_roundtrip(self):
+        """测试游标生成后可以解析出排序键"""
+        assert parse_cursor(make_cursor('list', 'SZ.000001'), 'list') == 'SZ.000001'
+        assert parse_cursor(None, 'list') is None
+        assert parse_cursor('', 'list') is None
+
+    def test_rejects_invalid(self):
+        """测试篡改的游标和其他接口的游标被拒绝"""
+        token = make_cursor('list', 'SZ.000001')
+
+        with pytest.raises(ValueError):
+            parse_cursor(token[:-2] + 'xx', 'list')
+        with pytest.raises(ValueError):
+            parse_cursor(token, 'query')
+
+    def test_include_total(self):
+        """测试 include_total 参数解析"""
+        assert parse_include_total(None) == TOTAL_NONE
+        assert parse_include_total('false') == TOTAL_NONE
+        assert parse_include_total('true') == TOTAL_EXACT
+        assert parse_include_total(True) == TOTAL_EXACT
+        assert parse_include_total('Estimate') == TOTAL_ESTIMATE
+
+        with pytest.raises(ValueError):
+            parse_include_total('sometimes')
+
+
+class TestSnapshotKeyset:
+    """快照游标翻页测试类"""
+
+    def test_pages_cover_all_rows(self):
+        """测试按 next_key 逐页读取的结果与一次读取全部相同"""
+        cache = make_cache(FakeDataService())
+        expected = [row['symbol'] for row in cache.list_stocks(limit=100)['data']]
+
+        symbols, after = [], None
+        while True:
+            result = cache.list_stocks(limit=2, after=after)
+            symbols.extend(row['symbol'] for row in result['data'])
+            if not result['has_more']:
+                break
+            after = result['next_key']
+
+        assert symbols == expected
+        assert result['next_key'] is None
+
+    def test_after_missing_symbol(self):
+        """测试游标股票已不在结果中时按代码顺序继续"""
+        service = FakeDataService()
+        service.rows.append(make_row('SZ.000002', 'SZ', is_active='N'))
+        service.rows.sort(key=lambda row: row['symbol'])
+        cache = make_cache(service)
+
+        # SZ.000002 不是活跃股票；SH.600002 不存在
+        assert [row['symbol'] for row in cache.list_stocks(limit=10, after='SZ.000002')['data']] == ['SZ.300001']
+        assert [row['symbol'] for row in cache.list_stocks(limit=10, after='SH.600002')['data']] == ['SZ.000001', 'SZ.300001']
@@ -0,0 +1,67 @@
+"""
+语句超时测试
+
+验证超时作用域的嵌套、超时错误的识别以及接口超时时返回 504
+"""
+
+from flask import Flask, jsonify
+
+from app.utils import cancellation
+from app.utils.cancellation import CancellationToken
+from database.connection import current_timeout_scope, db_manager, is_statement_timeout
+from app.utils.query_timeout import with_statement_timeout
+
+
+class FakeQueryCanceled(Exception):
+    pgcode = '57014'
+
+
+class FakeDBAPIError(Exception):
+    def __init__(self, orig):
+        super().__init__(str(orig))
+        self.orig = orig
+
+
+def make_client(timed_out: bool, status: int = 500):
+    app = Flask(__name__)
+
+    @app.route('/data')
+    @with_statement_timeout('query')
+    def data():
+        current_timeout_scope().timed_out = timed_out
+        return jsonify({'code': status}), status
+
+    return app.test_client()
+
+
+class TestStatementTimeout:
+    """语句超时测试类"""
+
+    def test_nested_scopes(self):
+        """测试作用域嵌套时内层覆盖外层，退出后恢复"""
+        assert current_timeout_scope() is None
+        with db_manager.statement_timeout(1000) as outer:
+            with db_manager.statement_timeout(200):
+                assert current_timeout_scope().timeout_ms == 200
+            assert current_timeout_scope() is outer
+        assert current_timeout_scope() is None
+
+    def test_is_statement_timeout(self, monkeypatch):
+        """测试按错误码识别超时（与错误信息的语言无关），取消令牌已取消时的 57014 不算超时"""
+        assert is_statement_timeout(FakeDBAPIError(FakeQueryCanceled('canceling statement due to statement timeout')))
+        assert is_statement_timeout(FakeDBAPIError(FakeQueryCanceled('错误:  由于语句执行超时, 正在取消查询')))
+        assert not is_statement_timeout(ValueError('canceling statement due to statement timeout'))
+
+        token = CancellationToken()
+        monkeypatch.setattr(cancellation._local, 'token', token, raising=False)
+        assert is_statement_timeout(FakeDBAPIError(FakeQueryCanceled('canceling statement due to user request')))
+        token.cancel('客户端已断开')
+        assert not is_statement_timeout(FakeDBAPIError(FakeQueryCanceled('canceling statement due to user request')))
+
+    def test_gateway_timeout(self):
+        """测试查询超时导致的失败返回 504，未超时或成功的响应不变"""
+        response = make_client(timed_out=True).get('/data')
+        assert response.status_code == 504 and response.get_json()['message'] == '查询超时'
+
+        assert make_client(timed_out=False).get('/data').status_code == 500
+        assert make_client(timed_out=True, status=200).get('/data').status_code == 200
@@ -0,0 +1,66 @@
+"""
+只读副本路由测试
+
+使用模拟的副本检查结果，验证轮询、延迟过大时跳过和回退到主库
+"""
+
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from database.connection import DatabaseManager, Replica, db_manager
+from app.services.data_freshness import DataFreshnessTracker
+
+
+def make_manager(monkeypatch, lags):
+    """lags: 副本名 → 复制延迟（None 表示不可连接）"""
+    manager = DatabaseManager()
+    manager.replicas = [Replica(name, engine=None) for name in lags]
+
+    def check(replica):
+        lag = lags[replica.name]
+        replica.lag_seconds = lag
+        replica.healthy = lag is not None and lag <= 30
+
+    monkeypatch.setattr(manager, '_check_replica', check)
+    return manager
+
+
+class TestReplicaRouting:
+    """副本选择测试类"""
+
+    def test_round_robin_over_healthy(self, monkeypatch):
+        """测试在健康副本间轮询，跳过不可连接和延迟过大的副本"""
+        manager = make_manager(monkeypatch, {'r1': 0.5, 'r2': None, 'r3': 120.0, 'r4': 2.0})
+
+        chosen = [manager.choose_replica().name for _ in range(4)]
+
+        assert sorted(chosen) == ['r1', 'r1', 'r4', 'r4']
+        assert chosen[0] != chosen[1]
+        assert [status['healthy'] for status in manager.replica_status()] == [True, False, False, True]
+
+    def test_fallback_to_primary(self, monkeypatch):
+        """测试没有可用副本时使用主库"""
+        manager = make_manager(monkeypatch, {'r1': None, 'r2': 90.0})
+
+        assert manager.choose_replica() is None
+        assert manager.read_engine() is manager.engine
+
+    def test_freshness_versions(self, monkeypatch):
+        """测试脚本和股票范围的数据版本读取主库（修改后 invalidate 能立即看到新版本），行情版本可读副本"""
+        queries = []
+
+        @contextmanager
+        def get_session(read_only=False, timeout_ms=None):
+            def execute(query):
+                queries.append((read_only, str(query)))
+                row = (None,) * 5 if 'stock_daily_data' in str(query) else (2, None)
+                return SimpleNamespace(fetchone=lambda: row)
+            yield SimpleNamespace(execute=execute)
+
+        monkeypatch.setattr(db_manager, 'get_session', get_session)
+        tracker = DataFreshnessTracker(SimpleNamespace(http_cache_check_interval_seconds=0))
+        tracker.version(('market', 'scripts', 'universes'))
+
+        read_only = {table: flag for flag, sql in queries
+                     for table in ('stock_daily_data', 'custom_scripts', 'stock_universes') if table in sql}
+        assert read_only == {'stock_daily_data': True, 'custom_scripts': False, 'stock_universes': False}
@@ -0,0 +1,113 @@
+"""
+分布式计算测试
+
+使用模拟的对等实例验证分片、合并顺序、失败重试和取消后停止重试
+"""
+
+import pytest
+from types import SimpleNamespace
+from app.services.scatter_gather import ScatterGatherCoordinator, ShardFailed, shard_index
+from app.utils.cancellation import CancellationToken, RequestCancelled
+
+PEERS = ['http://peer-a', 'http://peer-b', 'http://peer-c']
+SYMBOLS = [f"SZ.{i:06d}" for i in range(30)]
+
+
+def make_config(retries=1):
+    return SimpleNamespace(cluster_min_symbols=10, cluster_shard_timeout_seconds=5, cluster_shard_retries=retries)
+
+
+class FakePeers:
+    """模拟对等实例：记录请求，指定实例不可用或少返回一条结果"""
+
+    def __init__(self, down=(), short=()):
+        self.down = set(down)
+        self.short = set(short)
+        self.calls = []
+
+    def __call__(self, url, payload, timeout):
+        peer = url.split('/api/')[0]
+        self.calls.append(peer)
+        if peer in self.down:
+            raise ConnectionError("connection refused")
+        drop = 1 if peer in self.short else 0
+        if payload['kind'] == 'execute':
+            symbols = payload['symbols'][drop:]
+            return {'results': [{'symbol': s, 'value': peer, 'error': None} for s in symbols]}
+        return {'script_results': [{'1': stock['symbol']} for stock in payload['stocks'][drop:]]}
+
+
+class TestScatterGather:
+    """分布式计算测试类"""
+
+    def test_results_keep_input_order(self):
+        """测试各分片结果按原始顺序合并，同一股票总在同一实例计算"""
+        peers = FakePeers()
+        coordinator = ScatterGatherCoordinator(PEERS, make_config(), transport=peers)
+
+        data = coordinator.run_script('result = 1', SYMBOLS)
+
+        assert [item['symbol'] for item in data['results']] == SYMBOLS
+        assert all(item['value'] == PEERS[shard_index(item['symbol'], 3)] for item in data['results'])
+        assert data['summary'] == {'total': 30, 'successful': 30, 'failed': 0}
+        assert sorted(peers.calls) == PEERS
+
+    def test_failed_shard_retried_on_next_peer(self):
+        """测试实例不可用时分片改由下一个实例计算"""
+        peers = FakePeers(down={'http://peer-b'})
+        coordinator = ScatterGatherCoordinator(PEERS, make_config(), transport=peers)
+
+        data = coordinator.run_script('result = 1', SYMBOLS)
+
+        assert all(item['value'] != 'http://peer-b' for item in data['results'])
+        assert peers.calls.count('http://peer-c') == 2
+
+    def test_all_peers_failed(self):
+        """测试重试次数用尽后抛出 ShardFailed"""
+        peers = FakePeers(down={'http://peer-b', 'http://peer-c'})
+        coordinator = ScatterGatherCoordinator(PEERS, make_config(retries=1), transport=peers)
+
+        with pytest.raises(ShardFailed):
+            coordinator.run_script('result = 1', SYMBOLS)
+
+    def test_cancelled_shard_not_retried(self):
+        """测试请求取消后正在执行的分片不再向其他实例重试"""
+        token = CancellationToken()
+        peers = FakePeers(down=set(PEERS))
+
+        def disconnect_during_call(url, payload, timeout):
+            token.cancel('客户端已断开')
+            return peers(url, payload, timeout)
+
+        coordinator = ScatterGatherCoordinator(PEERS, make_config(retries=2), transport=disconnect_during_call)
+
+        with pytest.raises(RequestCancelled):
+            coordinator._run_shard(0, {'kind': 'execute', 'symbols': SYMBOLS[:3]}, token)
+        assert peers.calls == [PEERS[0]]
+
+    def test_incomplete_shard_rejected(self):
+        """测试结果条数与请求不一致的分片视为失败：换下一个实例重试，用尽后抛出 ShardFailed"""
+        peers = FakePeers(short={'http://peer-a'})
+        data = ScatterGatherCoordinator(PEERS, make_config(), transport=peers).run_script('result = 1', SYMBOLS)
+        assert [item['symbol'] for item in data['results']] == SYMBOLS
+        assert all(item['value'] != 'http://peer-a' for item in data['results'])
+
+        coordinator = ScatterGatherCoordinator(PEERS, make_config(retries=0), transport=FakePeers(short={'http://peer-a'}))
+        with pytest.raises(ShardFailed):
+            coordinator.run_script('result = 1', SYMBOLS)
+        with pytest.raises(ShardFailed):
+            coordinator.run_list_scripts({1: 'result = 1'}, [{'symbol': s} for s in SYMBOLS])
+
+    def test_list_scripts(self):
+        """测试 /list 多脚本结果写回对应股票"""
+        coordinator = ScatterGatherCoordinator(PEERS, make_config(), transport=FakePeers())
+        stocks = [{'symbol': s} for s in SYMBOLS]
+
+        assert coordinator.run_list_scripts({1: 'result = 1'}, stocks) == 30
+        assert all(stock['script_results'] == {'1': stock['symbol']} for stock in stocks)
+
+    def test_should_scatter(self):
+        """测试未配置实例或股票数不足时不分发"""
+        assert not ScatterGatherCoordinator([], make_config()).should_scatter(100)
+        assert not ScatterGatherCoordinator(PEERS, make_config()).should_scatter(5)
+        assert ScatterGatherCoordinator(PEERS, make_config()).should_scatter(10)
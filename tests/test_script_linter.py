@@ -0,0 +1,65 @@
+"""
+脚本性能静态分析测试
+
+验证常见慢写法的检测和成本估算
+"""
+
+from pathlib import Path
+from app.services.script_linter import analyze_script, script_cost_estimate
+
+EXAMPLE_DIR = Path(__file__).parent.parent / 'script_example'
+
+
+def codes(analysis):
+    return [(w.code, w.line) for w in analysis.warnings]
+
+
+class TestScriptLinter:
+    """脚本性能静态分析测试类"""
+
+    def test_example_script(self):
+        """测试示例脚本中的 list(range()) 和滑动窗口重算"""
+        code = (EXAMPLE_DIR / 'momentum_acceleration_score.py').read_text(encoding='utf-8')
+        analysis = analyze_script(code)
+
+        assert {w.code for w in analysis.warnings} == {'PERF003', 'PERF004'}
+        assert analysis.cost_estimate == analysis.lookback_days * 10
+
+    def test_history_in_loop(self):
+        """测试循环中（含循环调用的函数中）调用 get_history"""
+        script = (
+            "def load(symbol):\n"
+            "    return get_history(symbol, 30)\n"
+            "total = 0\n"
+            "for s in ['SH.600000', 'SH.600001']:\n"
+            "    total += len(load(s))\n"
+            "result = total\n"
+        )
+        analysis = analyze_script(script)
+
+        assert codes(analysis) == [('PERF001', 2)]
+        assert analysis.cost_estimate == 30 * 10
+
+    def test_iterating_history_is_not_a_loop_call(self):
+        """测试 for h in get_history(...) 只调用一次，不报告 PERF001"""
+        script = "total = 0\nfor h in get_history(row['symbol'], 20):\n    total += h['close']\nresult = total\n"
+
+        analysis = analyze_script(script)
+
+        assert analysis.warnings == []
+        assert analysis.cost_estimate == 20
+
+    def test_unused_history_days(self):
+        """测试获取的天数多于常量切片实际使用的天数"""
+        script = "N = 34\nhistory = get_history(row['symbol'], 600)\nresult = sum(h['close'] for h in history[:N])\n"
+
+        analysis = analyze_script(script)
+
+        assert codes(analysis) == [('PERF002', 2)]
+        assert '34' in analysis.warnings[0].message
+
+    def test_syntax_error_and_stored_estimate(self):
+        """测试语法错误时不报告警告，已保存的估算值优先"""
+        assert analyze_script("result = (").warnings == []
+        assert script_cost_estimate("result = 1", stored_estimate=42) == 42
+        assert script_cost_estimate("result = 1") == 1
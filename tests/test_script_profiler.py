@@ -0,0 +1,55 @@
+"""
+脚本逐行性能分析测试
+
+使用模拟的行情和历史数据，验证逐行统计和 get_history 耗时归属
+"""
+
+import sys
+from app.services.script_profiler import ScriptProfiler, sample_symbols
+
+SCRIPT = (
+    "history = get_history(row['symbol'], 3)\n"
+    "total = 0\n"
+    "for h in history:\n"
+    "    total = total + h['close_price']\n"
+    "result = total\n"
+)
+
+
+class FakeRows:
+    """模拟最新行情来源"""
+
+    def get_latest_stock_rows(self, symbols):
+        return {s: {'symbol': s, 'close_price': 1.0} for s in symbols if s != 'SH.MISSING'}
+
+
+def fake_history(symbol, days):
+    return [{'close_price': 2.0}] * days
+
+
+class TestScriptProfiler:
+    """脚本逐行性能分析测试类"""
+
+    def test_line_stats(self):
+        """测试每行执行次数、get_history 调用归属到源码行，结束后恢复原跟踪函数"""
+        profiler = ScriptProfiler(history_provider=fake_history)
+        previous_trace = sys.gettrace()
+
+        data = profiler.profile(SCRIPT, ['SH.600000', 'SH.600001', 'SH.MISSING'], data_source=FakeRows())
+
+        assert [item['value'] for item in data['results']] == [6.0, 6.0, None]
+        profile = data['profile']
+        assert profile['executed'] == 2 and profile['history_calls'] == 2
+
+        lines = {item['line']: item for item in profile['lines']}
+        assert lines[1]['history_calls'] == 2 and lines[1]['source'].startswith('history =')
+        assert lines[4]['hits'] == 6
+        assert lines[5]['hits'] == 2
+        assert sys.gettrace() is previous_trace
+
+    def test_sample_symbols(self):
+        """测试等间隔抽样"""
+        symbols = [str(i) for i in range(10)]
+
+        assert sample_symbols(symbols, 20) == symbols
+        assert sample_symbols(symbols, 5) == ['0', '2', '4', '6', '8']
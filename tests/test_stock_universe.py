@@ -0,0 +1,55 @@
+"""
+股票范围成员计算测试
+
+验证规则范围在传入的主库会话中筛选，查询失败时不记录本次更新
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.stock_universe import StockUniverseService, UNIVERSE_RULE
+
+
+class FakeSession:
+    """记录执行的SQL，按需抛出异常"""
+
+    def __init__(self, rows=None, error=None):
+        self.queries = []
+        self.rows = rows or []
+        self.error = error
+
+    def execute(self, query, params=None):
+        self.queries.append((str(query), params))
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(fetchall=lambda: [SimpleNamespace(symbol=symbol) for symbol in self.rows])
+
+
+def rule_universe():
+    return SimpleNamespace(name='银行股', kind=UNIVERSE_RULE, rules={'industry': '银行'},
+                           members=['SH.600000'], members_version='v1', members_refreshed_at=None)
+
+
+class TestRefreshMembers:
+    """成员重新计算测试类"""
+
+    def test_rule_universe_uses_given_session(self):
+        """测试规则范围的筛选在传入的会话中执行"""
+        session = FakeSession(rows=['SH.600036', 'SZ.000001'])
+        universe = rule_universe()
+
+        StockUniverseService._refresh_members(session, universe, 'v2')
+
+        assert 'stock_info' in session.queries[0][0]
+        assert session.queries[0][1]['pf_industries'] == ['银行']
+        assert (universe.members, universe.members_version) == (['SH.600036', 'SZ.000001'], 'v2')
+
+    def test_query_error_not_recorded(self):
+        """测试筛选查询失败时异常向上抛出，成员和版本保持不变"""
+        universe = rule_universe()
+
+        with pytest.raises(RuntimeError):
+            StockUniverseService._refresh_members(FakeSession(error=RuntimeError('连接中断')), universe, 'v2')
+
+        assert (universe.members, universe.members_version) == (['SH.600000'], 'v1')
@@ -0,0 +1,130 @@
+"""
+股票范围面板缓存测试
+
+验证面板按需批量加载、缓存命中与失效
+"""
+
+from types import SimpleNamespace
+from app.services.universe_cache import UniversePanel, UniversePanelCache
+from app.services.universe_filter import UniverseFilter
+
+
+class FakeDataService:
+    """模拟 StockDataService，记录查询次数"""
+
+    def __init__(self):
+        self.panel_calls = []
+        self.single_calls = []
+
+    def get_history_panel(self, symbols, days):
+        self.panel_calls.append(days)
+        return {s: [{'close_price': float(i), 'trade_date': None, 'volume': 0, 'price_change_pct': None}
+                    for i in range(days)] for s in symbols}
+
+    def get_history(self, symbol, days):
+        self.single_calls.append(symbol)
+        return []
+
+    def get_latest_stock_rows(self, symbols):
+        self.single_calls.extend(symbols)
+        return {s: {'symbol': s, 'close_price': 10.0} for s in symbols}
+
+
+class TestUniversePanel:
+    """股票范围面板测试类"""
+
+    def test_history_loaded_once_for_all_members(self):
+        """测试历史数据一次加载全部成员，天数不足时才重新加载"""
+        service = FakeDataService()
+        panel = UniversePanel(1, ['SH.600000', 'SZ.000001'], data_service=service)
+
+        assert len(panel.get_history('SH.600000', 20)) == 20
+        assert len(panel.get_history('SZ.000001', 10)) == 10
+        assert service.panel_calls == [20]
+
+        assert len(panel.get_history('SZ.000001', 60)) == 60
+        assert service.panel_calls == [20, 60]
+
+    def test_returns_copies(self):
+        """测试脚本修改返回数据不影响缓存"""
+        panel = UniversePanel(1, ['SH.600000'], data_service=FakeDataService())
+
+        panel.get_history('SH.600000', 5)[0]['close_price'] = -1
+        panel.get_latest_stock_row('SH.600000')['close_price'] = -1
+
+        assert panel.get_history('SH.600000', 5)[0]['close_price'] == 0.0
+        assert panel.get_latest_stock_row('SH.600000')['close_price'] == 10.0
+
+    def test_failed_load_not_retried(self):
+        """测试批量加载失败后不再为每只股票重试，改为逐只查询，更短的天数仍可重新加载"""
+        service = FakeDataService()
+        panel = UniversePanel(1, ['SH.600000', 'SZ.000001'], data_service=service)
+
+        def timed_out(symbols, days):
+            service.panel_calls.append(days)
+            raise TimeoutError("批量加载超时")
+
+        service.get_history_panel = timed_out
+        panel.get_history('SH.600000', 250)
+        panel.get_history('SZ.000001', 250)
+        panel.get_history('SZ.000001', 300)
+
+        assert service.panel_calls == [250]
+        assert service.single_calls == ['SH.600000', 'SZ.000001', 'SZ.000001']
+
+        panel.get_history('SH.600000', 20)
+        assert service.panel_calls == [250, 20]
+
+    def test_non_member_falls_back(self):
+        """测试非成员股票直接查询"""
+        service = FakeDataService()
+        panel = UniversePanel(1, ['SH.600000'], data_service=service)
+
+        panel.get_history('SH.600519', 5)
+
+        assert service.panel_calls == []
+        assert service.single_calls == ['SH.600519']
+
+
+class TestUniversePanelCache:
+    """面板缓存测试类"""
+
+    def _cache(self, **overrides):
+        config = SimpleNamespace(
+            universe_panel_cache_size=2,
+            universe_panel_max_symbols=3,
+            universe_panel_ttl_seconds=300
+        )
+        for key, value in overrides.items():
+            setattr(config, key, value)
+        return UniversePanelCache(config)
+
+    def test_hit_and_version_invalidation(self):
+        """测试相同版本命中，成员或行情版本变化后重建"""
+        cache = self._cache()
+
+        panel = cache.get(1, 'v1', ['SH.600000'], data_version='2025-07-11')
+        assert cache.get(1, 'v1', ['SH.600000'], data_version='2025-07-11') is panel
+        assert cache.get(1, 'v1', ['SH.600000'], data_version='2025-07-14') is not panel
+        assert cache.stats() == {'panels': 1, 'hits': 1, 'misses': 2}
+
+    def test_lru_and_size_limit(self):
+        """测试LRU淘汰和成员数上限"""
+        cache = self._cache()
+
+        first = cache.get(1, 'v1', ['SH.600000'], data_version='d')
+        cache.get(2, 'v1', ['SH.600000'], data_version='d')
+        cache.get(3, 'v1', ['SH.600000'], data_version='d')
+
+        assert cache.get(1, 'v1', ['SH.600000'], data_version='d') is not first
+        assert cache.get(4, 'v1', ['A', 'B', 'C', 'D'], data_version='d') is None
+
+
+class TestUniverseFilter:
+    """筛选规则测试类"""
+
+    def test_round_trip(self):
+        """测试筛选规则保存后可重新解析"""
+        prefilter = UniverseFilter.from_dict({'industry': '银行', 'min_volume': 100000})
+
+        assert UniverseFilter.from_dict(prefilter.to_dict()) == prefilter
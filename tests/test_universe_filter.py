@@ -0,0 +1,73 @@
+"""
+股票范围筛选条件测试
+
+验证请求参数解析、to_dict / from_dict 往返（任务参数在计算进程中重新解析）和 SQL 条件生成
+"""
+
+import pytest
+
+from app.services.universe_filter import UniverseFilter
+
+
+class TestUniverseFilter:
+    """筛选条件测试类"""
+
+    def test_from_dict(self):
+        """测试参数规范化：市场代码转大写、单个行业转为列表、数值转型"""
+        universe_filter = UniverseFilter.from_dict({
+            'market_codes': 'sh, sz', 'is_etf': False, 'industry': '银行', 'min_volume': 1e5, 'min_close': 3
+        })
+
+        assert universe_filter == UniverseFilter(
+            market_codes=['SH', 'SZ'], is_etf=False, industries=['银行'], min_volume=100000, min_close=3.0
+        )
+        assert UniverseFilter.from_dict(None) is None
+        assert UniverseFilter.from_dict({}) is None
+
+    @pytest.mark.parametrize('data', [
+        {'industries': ['银行']},
+        {'market_codes': ['HK']},
+        {'is_etf': 'N'},
+        {'min_volume': -1},
+        {'min_close': True},
+        ['SH']
+    ])
+    def test_rejects_invalid(self, data):
+        """测试未知字段和非法取值被拒绝"""
+        with pytest.raises(ValueError):
+            UniverseFilter.from_dict(data)
+
+    def test_roundtrip(self):
+        """测试 to_dict 输出可被 from_dict 重新解析（含行业条件）"""
+        universe_filter = UniverseFilter(
+            market_codes=['SH'], is_etf=True, industries=['银行', '证券'], min_volume=1000, min_close=2.5
+        )
+
+        data = universe_filter.to_dict()
+
+        assert data['industry'] == ['银行', '证券'] and 'industries' not in data
+        assert UniverseFilter.from_dict(data) == universe_filter
+        assert UniverseFilter(min_volume=10).to_dict() == {'min_volume': 10}
+
+    def test_to_sql(self):
+        """测试 SQL 条件和绑定参数，成交量/收盘价条件使用最新行情别名"""
+        universe_filter = UniverseFilter(
+            market_codes=['SZ'], is_etf=False, industries=['银行'], min_volume=1000, min_close=2.5
+        )
+
+        conditions, params = universe_filter.to_sql(info_alias='s', price_alias='p')
+
+        assert conditions == [
+            "s.market_code = ANY(:pf_market_codes)",
+            "s.is_etf = :pf_is_etf",
+            "s.industry = ANY(:pf_industries)",
+            "p.volume >= :pf_min_volume",
+            "p.close_price >= :pf_min_close"
+        ]
+        assert params == {
+            'pf_market_codes': ['SZ'], 'pf_is_etf': 'N', 'pf_industries': ['银行'],
+            'pf_min_volume': 1000, 'pf_min_close': 2.5
+        }
+        assert universe_filter.needs_latest_price
+        assert UniverseFilter(is_etf=True).to_sql() == (["si.is_etf = :pf_is_etf"], {'pf_is_etf': 'Y'})
+        assert not UniverseFilter(is_etf=True).needs_latest_price